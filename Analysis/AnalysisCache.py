@@ -0,0 +1,103 @@
+import os
+import threading
+import zipfile
+
+import numpy as np
+
+
+class AnalysisCache:
+    """A persistent on-disk cache of per-track analysis arrays with least-recently-used eviction.
+
+    Each track is stored as one compressed .npz file named after its Spotify track ID. Reading a track refreshes its
+    modification time, and whenever the cache grows beyond max_bytes the least recently used tracks are deleted.
+
+    Args:
+        cache_dir (str): the directory to store cached tracks in (created on first write).
+        max_bytes (int): the maximum total size in bytes of all cached tracks.
+
+    Attributes:
+        cache_dir (str): the directory cached tracks are stored in.
+        lock (threading.Lock): a lock for writing to/evicting from the cache directory.
+        max_bytes (int): the maximum total size in bytes of all cached tracks.
+    """
+
+    def __init__(self, cache_dir=os.path.join(os.path.expanduser("~"), ".cache", "spotify_leds"),
+                 max_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        self.max_bytes = max_bytes
+
+    def load(self, track_id):
+        """Load the cached arrays for a track and mark the track as recently used.
+
+        Args:
+            track_id (str): the Spotify ID of the track.
+
+        Returns:
+            a dict mapping array names to np.ndarray, or None if the track is not cached (or unreadable).
+        """
+        path = self._path_for(track_id)
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError, KeyError, zipfile.BadZipFile):
+            # The entry is corrupt (e.g. truncated); delete it so the track is fetched and cached again
+            with self.lock:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return arrays
+
+    def save(self, track_id, **arrays):
+        """Store arrays for a track, then evict least recently used tracks if the cache is over its size limit.
+
+        Args:
+            track_id (str): the Spotify ID of the track.
+            arrays (np.ndarray): the named arrays to store.
+        """
+        path = self._path_for(track_id)
+        tmp_path = path + ".tmp"
+        with self.lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def contains(self, track_id):
+        """Check if a track is cached (without loading it or marking it as recently used).
+
+        Args:
+            track_id (str): the Spotify ID of the track.
+
+        Returns:
+            True if the track is cached, False otherwise.
+        """
+        return os.path.exists(self._path_for(track_id))
+
+    def _evict(self):
+        """Delete least recently used tracks until the cache fits within max_bytes.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz"):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+
+    def _path_for(self, track_id):
+        return os.path.join(self.cache_dir, "{}.npz".format(os.path.basename(track_id)))
@@ -0,0 +1,22 @@
+class AnalysisSource:
+    """Provides the loudness and pitch data (and rhythm events) of tracks for visualization.
+
+    SpotifyVisualizer (and TrackPrefetcher) read track analysis only through this interface, so data can come from the
+    Spotify audio analysis API (SpotifyAnalysisSource) or be computed locally from audio (WavAnalysisSource).
+
+    Attributes:
+        NAME (str): a short name of the source (e.g. the source label of the analysis_fetch_seconds metric).
+    """
+
+    NAME = "source"
+
+    def analyze(self, track_id):
+        """Get the analysis of a track.
+
+        Args:
+            track_id (str): the Spotify ID of the track.
+
+        Returns:
+            a tuple (segment_table, rhythm_index) of the track's SegmentTable (not padded) and RhythmIndex.
+        """
+        raise NotImplementedError("All analysis sources must have a custom 'analyze' method.")
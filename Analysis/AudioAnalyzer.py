@@ -0,0 +1,145 @@
+import wave
+
+import numpy as np
+
+# Loudness values (in decibels relative to full scale) are clamped to this floor, which is below anything audible
+MIN_LOUDNESS = -60.0
+
+
+class AudioAnalyzer:
+    """Computes loudness and pitch data from raw PCM audio, in the same layout as TrackFrames.
+
+    Audio is cut into overlapping Hann-windowed frames spaced frame_rate seconds apart, and all frames are transformed
+    with a single vectorized real FFT. Each frame yields a loudness value (the RMS level in dBFS) and 12 chroma values:
+    the spectral power of every FFT bin between min_frequency and max_frequency is summed into the pitch class (C, C#,
+    ..., B) of the bin's center frequency, then normalized so the strongest pitch class is 1.0, like Spotify's pitch
+    vectors. The bin to pitch class mapping is a precomputed matrix, so the chroma of a batch of frames is one matrix
+    product.
+
+    Whole files can be analyzed at once (analyze), and live audio can be analyzed block by block as it arrives (push).
+
+    Args:
+        sample_rate (int): the sample rate of the audio in Hz.
+        frame_rate (float): the amount of time in seconds between consecutive frames.
+        window_size (int): the number of samples in each FFT window.
+        min_frequency (float): the lowest frequency in Hz included in the chroma.
+        max_frequency (float): the highest frequency in Hz included in the chroma.
+
+    Attributes:
+        chroma_matrix (np.ndarray): a (window_size // 2 + 1, 12) float32 matrix mapping FFT bin power to pitch classes.
+        frame_rate (float): the amount of time in seconds between consecutive frames.
+        hop (int): the number of samples between the starts of consecutive windows.
+        sample_rate (int): the sample rate of the audio in Hz.
+        tail (np.ndarray): samples received by push() that haven't been covered by a complete window yet.
+        window (np.ndarray): the (window_size,) float32 Hann window.
+        window_size (int): the number of samples in each FFT window.
+    """
+
+    def __init__(self, sample_rate, frame_rate=0.03, window_size=4096, min_frequency=55.0, max_frequency=4200.0):
+        self.frame_rate = frame_rate
+        self.hop = max(1, int(round(frame_rate * sample_rate)))
+        self.sample_rate = sample_rate
+        self.window = np.hanning(window_size).astype(np.float32)
+        self.window_size = window_size
+
+        # Pitch class of every FFT bin (0 is C), from the MIDI note number nearest to the bin's center frequency
+        frequencies = np.fft.rfftfreq(window_size, 1.0 / sample_rate)
+        in_range = (frequencies >= min_frequency) & (frequencies <= max_frequency)
+        with np.errstate(divide="ignore"):
+            notes = np.round(69 + 12 * np.log2(frequencies / 440.0))
+        self.chroma_matrix = np.zeros((len(frequencies), 12), dtype=np.float32)
+        self.chroma_matrix[np.flatnonzero(in_range), notes[in_range].astype(int) % 12] = 1.0
+        self.tail = np.zeros(window_size - min(self.hop, window_size), dtype=np.float32)
+
+    def analyze(self, samples, block_frames=256):
+        """Analyze a whole recording at once.
+
+        Frame i is centered on sample i * hop, so it describes the audio at time i * frame_rate (like TrackFrames).
+
+        Args:
+            samples (np.ndarray): a (num_samples,) array of mono samples in range [-1.0, 1.0].
+            block_frames (int): the number of frames transformed at once (bounds the memory used by the FFT).
+
+        Returns:
+            a (num_frames, 13) float32 array; column 0 holds loudness and columns 1-12 hold pitch strengths.
+        """
+        half_window = self.window_size // 2
+        padded = np.pad(np.asarray(samples, dtype=np.float32), (half_window, half_window))
+        windows = np.lib.stride_tricks.sliding_window_view(padded, self.window_size)[::self.hop]
+        num_frames = len(samples) // self.hop + 1
+        frames = np.empty((num_frames, 13), dtype=np.float32)
+        for start in range(0, num_frames, block_frames):
+            end = min(start + block_frames, num_frames)
+            frames[start:end] = self._analyze_windows(windows[start:end])
+        return frames
+
+    def push(self, block):
+        """Analyze live audio as it arrives.
+
+        Each returned frame describes the window ending at the latest complete hop of audio, so frames are available as
+        soon as their last sample has been received.
+
+        Args:
+            block (np.ndarray): a (num_samples,) array of new mono samples in range [-1.0, 1.0].
+
+        Returns:
+            a (num_new_frames, 13) float32 array of frames completed by the block (possibly empty).
+        """
+        data = np.concatenate([self.tail, np.asarray(block, dtype=np.float32).reshape(-1)])
+        if len(data) < self.window_size:
+            self.tail = data
+            return np.empty((0, 13), dtype=np.float32)
+        windows = np.lib.stride_tricks.sliding_window_view(data, self.window_size)[::self.hop]
+        self.tail = data[len(windows) * self.hop:]
+        return self._analyze_windows(windows)
+
+    def reset(self):
+        """Forget audio received by push() (e.g. when the input stream restarts).
+        """
+        self.tail = np.zeros(self.window_size - min(self.hop, self.window_size), dtype=np.float32)
+
+    @staticmethod
+    def read_wav(path):
+        """Read a PCM WAV file and mix it down to mono.
+
+        Args:
+            path (str): the path to a WAV file with 8, 16 or 32-bit integer samples.
+
+        Returns:
+            a tuple (samples, sample_rate) where samples is a (num_samples,) float32 array in range [-1.0, 1.0].
+
+        Raises:
+            ValueError: if the file's sample format isn't supported.
+        """
+        with wave.open(path, "rb") as f:
+            num_channels, sample_width, sample_rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+            data = f.readframes(f.getnframes())
+        if sample_width == 1:
+            samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128) / 128
+        elif sample_width in (2, 4):
+            dtype = np.int16 if sample_width == 2 else np.int32
+            samples = np.frombuffer(data, dtype=dtype).astype(np.float32) / float(np.iinfo(dtype).max)
+        else:
+            raise ValueError("Unsupported WAV sample width: {} bytes.".format(sample_width))
+        return samples.reshape(-1, num_channels).mean(axis=1), sample_rate
+
+    def _analyze_windows(self, windows):
+        """Compute loudness and chroma for a batch of windows.
+
+        Args:
+            windows (np.ndarray): a (num_frames, window_size) array of raw (unwindowed) samples.
+
+        Returns:
+            a (num_frames, 13) float32 array; column 0 holds loudness and columns 1-12 hold pitch strengths.
+        """
+        frames = np.empty((len(windows), 13), dtype=np.float32)
+        mean_square = np.einsum("ij,ij->i", windows, windows) / self.window_size
+        frames[:, 0] = np.maximum(10 * np.log10(mean_square + 1e-12), MIN_LOUDNESS)
+
+        spectrum = np.fft.rfft(windows * self.window, axis=1)
+        power = (spectrum.real ** 2 + spectrum.imag ** 2).astype(np.float32)
+        chroma = power @ self.chroma_matrix
+        strongest = chroma.max(axis=1, keepdims=True)
+        np.divide(chroma, strongest, out=frames[:, 1:], where=strongest > 0)
+        frames[:, 1:][strongest[:, 0] <= 0] = 0.0
+        return frames
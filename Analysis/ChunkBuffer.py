@@ -0,0 +1,89 @@
+import bisect
+import threading
+
+
+class ChunkBuffer:
+    """A bounded ring buffer of loudness and pitch interpolators, keyed by chunk start time.
+
+    The buffer is published as an immutable snapshot (a tuple of chunks sorted by start time) that is swapped in
+    atomically whenever a chunk is added or evicted. Readers never take a lock; they simply look up chunks in whichever
+    snapshot is current. Since playback moves forward, lookups first check the chunk found by the previous lookup and
+    the chunk after it, so finding the current or next chunk is O(1).
+
+    Args:
+        capacity (int): the maximum number of chunks held by the buffer.
+
+    Attributes:
+        capacity (int): the maximum number of chunks held by the buffer.
+        chunks (tuple): the current snapshot of (chunk_start, chunk_end, interpolator) tuples.
+        cursor (int): the index of the chunk found by the previous lookup (a hint for the next lookup).
+        write_lock (threading.Lock): a lock serializing writers (readers never take it).
+    """
+
+    def __init__(self, capacity=8):
+        self.capacity = capacity
+        self.chunks = ()
+        self.cursor = 0
+        self.write_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def is_full(self):
+        return len(self.chunks) >= self.capacity
+
+    def publish(self, chunk_start, chunk_end, interpolator):
+        """Add a chunk, dropping the oldest chunk if the buffer is full.
+
+        Args:
+            chunk_start (float): the playback position (in seconds) the chunk starts at.
+            chunk_end (float): the playback position (in seconds) the chunk ends at.
+            interpolator (SegmentInterpolator): the loudness and pitch interpolator for the chunk.
+        """
+        with self.write_lock:
+            chunks = self.chunks + ((chunk_start, chunk_end, interpolator),)
+            self.chunks = chunks[-self.capacity:]
+
+    def clear(self):
+        """Drop every chunk (e.g. after seeking back to a position whose chunks were already evicted).
+        """
+        with self.write_lock:
+            self.chunks = ()
+            self.cursor = 0
+
+    def evict_before(self, pos):
+        """Drop chunks that end before a playback position (chunks behind the playhead).
+
+        Args:
+            pos (float): the current playback position (in seconds).
+        """
+        with self.write_lock:
+            chunks = self.chunks
+            index = 0
+            while index < len(chunks) and chunks[index][1] < pos:
+                index += 1
+            if index:
+                self.chunks = chunks[index:]
+                self.cursor = 0
+
+    def find(self, pos):
+        """Find the interpolator for the chunk that has the specified position within its bounds.
+
+        Args:
+            pos (float): the playback position to find an interpolator for.
+
+        Returns:
+            a SegmentInterpolator, or None if no buffered chunk covers pos.
+        """
+        chunks = self.chunks
+        for index in (self.cursor, self.cursor + 1):
+            if index < len(chunks) and chunks[index][0] <= pos <= chunks[index][1]:
+                self.cursor = index
+                return chunks[index][2]
+
+        # Playback jumped (e.g. a seek); fall back to a binary search over chunk start times
+        index = bisect.bisect_right([chunk[0] for chunk in chunks], pos) - 1
+        if index >= 0 and pos <= chunks[index][1]:
+            self.cursor = index
+            return chunks[index][2]
+        return None
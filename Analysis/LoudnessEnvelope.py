@@ -0,0 +1,91 @@
+import numpy as np
+
+
+class LoudnessEnvelope:
+    """The loudness of a track as a piecewise attack/decay envelope, evaluated once for every frame of the track.
+
+    Each audio analysis segment rises from its loudness_start to its loudness_max at loudness_max_time (the attack),
+    then falls to the loudness_start of the next segment (the decay; the Spotify API defines a segment's loudness_end to
+    equal the next segment's loudness_start). The envelope is linear between these breakpoints, so peaks land exactly
+    when the analysis places them and the loudness never overshoots the analysis values. It is sampled on the same time
+    grid as TrackFrames, so looking up the loudness for a playback position is a single index into an array.
+
+    Args:
+        values (np.ndarray): a (num_frames,) array of loudness values (one per frame).
+        frame_rate (float): the amount of time in seconds between consecutive frames.
+
+    Attributes:
+        frame_rate (float): the amount of time in seconds between consecutive frames.
+        values (np.ndarray): the (num_frames,) float32 array of loudness values.
+    """
+
+    KIND = "envelope"
+
+    def __init__(self, values, frame_rate):
+        self.frame_rate = frame_rate
+        self.values = np.ascontiguousarray(values, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.values)
+
+    @classmethod
+    def from_table(cls, table, duration, frame_rate=0.03):
+        """Build the envelope of a segment table and sample it at every frame of the track.
+
+        Args:
+            table (SegmentTable): the track's segments, covering the whole track (see SegmentTable.pad).
+            duration (float): the duration of the track in seconds.
+            frame_rate (float): the amount of time in seconds between consecutive frames.
+
+        Returns:
+            a LoudnessEnvelope holding the loudness for every frame of the track.
+        """
+        times, loudness = LoudnessEnvelope.breakpoints(table)
+        num_frames = int(duration / frame_rate) + 1
+        return cls(np.interp(np.arange(num_frames) * frame_rate, times, loudness), frame_rate)
+
+    @staticmethod
+    def breakpoints(table):
+        """Find the times and loudness values the envelope passes through.
+
+        Tables without peak loudness columns (e.g. loaded from older cache entries) fall back to an envelope through the
+        loudness at the start of each segment.
+
+        Args:
+            table (SegmentTable): the segments to build the envelope of.
+
+        Returns:
+            a tuple of two (2 * num_segments,) arrays: non-decreasing breakpoint times and the loudness at each one.
+        """
+        if table.loudness_max is None or table.loudness_max_time is None:
+            return table.start, table.loudness_start.astype(np.float64)
+
+        # Keep every peak within its own segment, so that breakpoint times never decrease
+        segment_ends = np.append(table.start[1:], np.inf)
+        peak_times = np.minimum(table.start + np.maximum(table.loudness_max_time, 0), segment_ends)
+
+        times = np.empty(2 * len(table), dtype=np.float64)
+        times[0::2] = table.start
+        times[1::2] = peak_times
+        loudness = np.empty(2 * len(table), dtype=np.float64)
+        loudness[0::2] = table.loudness_start
+        loudness[1::2] = table.loudness_max
+        return times, loudness
+
+    def sample(self, pos):
+        """Look up the loudness for a playback position.
+
+        Positions outside of the track are clamped to the first or last frame.
+
+        Args:
+            pos (float): the playback position (offset into the track in seconds).
+
+        Returns:
+            the loudness (in decibels) at the frame closest to pos.
+        """
+        index = int(pos / self.frame_rate + 0.5)
+        if index < 0:
+            index = 0
+        elif index >= len(self.values):
+            index = len(self.values) - 1
+        return self.values[index]
@@ -0,0 +1,145 @@
+import bisect
+import math
+
+import numpy as np
+
+
+class RhythmIndex:
+    """Sorted rhythm events (tatums, beats, bars and sections) of a track with a moving cursor for each kind of event.
+
+    The render loop calls update() with the playback position once per frame. Since playback moves forward, each cursor
+    usually stays put or moves to the next event, so keeping track of the current events is O(1) amortized; a binary
+    search is only needed after seeking. Visualizations can then read cheap rhythm inputs for the current frame, such
+    as the time since the last beat or the phase within the current bar, to lock effects to the music.
+
+    Args:
+        events (dict): maps each kind of event (see KINDS) to a (num_events, 2) array of event start times and durations
+            in seconds, sorted by start time.
+
+    Attributes:
+        cursors (dict): maps each kind of event to the index of the latest event starting at or before pos (-1 if no
+            event has started yet).
+        durations (dict): maps each kind of event to a list of event durations (fast scalar access).
+        events (dict): maps each kind of event to a (num_events, 2) float64 array of start times and durations.
+        pos (float): the playback position of the last update.
+        starts (dict): maps each kind of event to a list of event start times (fast scalar access).
+    """
+
+    KINDS = ("tatums", "beats", "bars", "sections")
+
+    def __init__(self, events):
+        self.cursors = {kind: -1 for kind in RhythmIndex.KINDS}
+        self.events = {
+            kind: np.asarray(events.get(kind, ()), dtype=np.float64).reshape(-1, 2) for kind in RhythmIndex.KINDS
+        }
+        self.durations = {kind: events[:, 1].tolist() for kind, events in self.events.items()}
+        self.pos = -math.inf
+        self.starts = {kind: events[:, 0].tolist() for kind, events in self.events.items()}
+
+    @classmethod
+    def from_analysis(cls, analysis):
+        """Collect the rhythm events of an audio analysis response from the Spotify API.
+
+        Args:
+            analysis (dict): the audio analysis of a track (with "tatums", "beats", "bars" and "sections" lists of
+                dicts with "start" and "duration").
+
+        Returns:
+            a RhythmIndex for the track.
+        """
+        return cls({
+            kind: [(event["start"], event["duration"]) for event in analysis.get(kind, ())] for kind in RhythmIndex.KINDS
+        })
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild a rhythm index from the arrays stored in the analysis cache.
+
+        Args:
+            arrays (dict): a dict with a (num_events, 2) array for each kind of event.
+
+        Returns:
+            a RhythmIndex for the track.
+        """
+        return cls({kind: arrays[kind] for kind in RhythmIndex.KINDS if kind in arrays})
+
+    def to_arrays(self):
+        """Get the events as a dict of arrays (e.g. for the analysis cache).
+
+        Returns:
+            a dict with a (num_events, 2) array of start times and durations for each kind of event.
+        """
+        return dict(self.events)
+
+    def update(self, pos):
+        """Move every cursor to the latest event starting at or before a playback position.
+
+        Args:
+            pos (float): the playback position (offset into the track in seconds).
+        """
+        for kind, starts in self.starts.items():
+            cursor = self.cursors[kind]
+            following = cursor + 1
+            if following < len(starts) and starts[following] <= pos:
+                # Usually the next event just started; if more than one did (e.g. after seeking), search for the latest
+                if following + 1 < len(starts) and starts[following + 1] <= pos:
+                    cursor = bisect.bisect_right(starts, pos) - 1
+                else:
+                    cursor = following
+            elif cursor >= 0 and starts[cursor] > pos:
+                cursor = bisect.bisect_right(starts, pos) - 1
+            self.cursors[kind] = cursor
+        self.pos = pos
+
+    def index(self, kind):
+        """Get the index of the current event.
+
+        Args:
+            kind (str): the kind of event (see KINDS).
+
+        Returns:
+            the index of the latest event starting at or before the playback position (-1 if none has started yet).
+        """
+        return self.cursors[kind]
+
+    def time_since(self, kind):
+        """Get the time since the current event started.
+
+        Args:
+            kind (str): the kind of event (see KINDS).
+
+        Returns:
+            the time in seconds since the latest event started (math.inf if none has started yet).
+        """
+        cursor = self.cursors[kind]
+        return self.pos - self.starts[kind][cursor] if cursor >= 0 else math.inf
+
+    def time_until(self, kind):
+        """Get the time until the next event starts.
+
+        Args:
+            kind (str): the kind of event (see KINDS).
+
+        Returns:
+            the time in seconds until the next event starts (math.inf if there are no more events).
+        """
+        following = self.cursors[kind] + 1
+        starts = self.starts[kind]
+        return starts[following] - self.pos if following < len(starts) else math.inf
+
+    def phase(self, kind):
+        """Get how far playback is through the current event (e.g. the phase within the current bar).
+
+        Args:
+            kind (str): the kind of event (see KINDS).
+
+        Returns:
+            the elapsed fraction of the current event's duration, in range [0.0, 1.0] (0.0 if no event is playing).
+        """
+        cursor = self.cursors[kind]
+        if cursor < 0:
+            return 0.0
+        duration = self.durations[kind][cursor]
+        if duration <= 0:
+            return 0.0
+        return min((self.pos - self.starts[kind][cursor]) / duration, 1.0)
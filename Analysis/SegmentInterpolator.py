@@ -0,0 +1,170 @@
+import bisect
+
+import numpy as np
+
+from Analysis.SegmentTable import SegmentTable
+
+
+class SegmentInterpolator:
+    """Monotone piecewise cubic (PCHIP) interpolation of loudness and pitch data for all channels at once.
+
+    The interpolant is fitted once: for every interval between consecutive segment start times, the 4 coefficients of
+    its cubic polynomial are stored for every channel in one NumPy array. Evaluating all channels at a position is then
+    a binary search for the interval and a Horner evaluation of 13 polynomials at once, without calling into scipy.
+
+    Slopes are chosen with the Fritsch-Carlson method (as in scipy's PchipInterpolator), so the interpolant never
+    overshoots the data: loudness doesn't spike between segments and pitch strengths stay within [0.0, 1.0].
+
+    Args:
+        times (np.ndarray): a (num_points,) array of strictly increasing segment start times (in seconds).
+        values (np.ndarray): a (num_points, num_channels) array of data values at each time.
+
+    Attributes:
+        coefficients (np.ndarray): a (num_points - 1, 4, num_channels) float64 array of polynomial coefficients; the
+            value at time t in interval k is sum(coefficients[k, j] * (t - times[k]) ** j).
+        end (float): the last time covered by the interpolant.
+        start (float): the first time covered by the interpolant.
+        times (np.ndarray): the (num_points,) float64 array of segment start times.
+        time_list (list): segment start times as a Python list (fast scalar binary search).
+    """
+
+    KIND = "pchip"
+
+    def __init__(self, times, values):
+        times = np.asarray(times, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        if len(times) < 2:
+            raise ValueError("At least 2 points are needed to interpolate, got {}.".format(len(times)))
+        widths = np.diff(times)
+        if np.any(widths <= 0):
+            raise ValueError("Segment start times must be strictly increasing.")
+
+        slopes = np.diff(values, axis=0) / widths[:, np.newaxis]
+        derivatives = SegmentInterpolator._pchip_derivatives(widths, slopes)
+
+        # Cubic Hermite polynomial for each interval in terms of the offset into the interval
+        widths = widths[:, np.newaxis]
+        self.coefficients = np.empty((len(widths), 4, values.shape[1]), dtype=np.float64)
+        self.coefficients[:, 0] = values[:-1]
+        self.coefficients[:, 1] = derivatives[:-1]
+        self.coefficients[:, 2] = (3 * slopes - 2 * derivatives[:-1] - derivatives[1:]) / widths
+        self.coefficients[:, 3] = (derivatives[:-1] + derivatives[1:] - 2 * slopes) / widths ** 2
+        self.end = float(times[-1])
+        self.start = float(times[0])
+        self.times = times
+        self.time_list = times.tolist()
+
+    def __call__(self, pos):
+        return self.evaluate(pos)
+
+    @classmethod
+    def from_segments(cls, segments):
+        """Fit an interpolant to the loudness and pitch data of audio analysis segments.
+
+        Args:
+            segments (list): audio analysis segments (dicts with "start", "loudness_start" and "pitches"), sorted by
+                start time.
+
+        Returns:
+            a SegmentInterpolator with 13 channels; channel 0 is loudness and channels 1-12 are pitch strengths.
+        """
+        return cls.from_table(SegmentTable.from_segments(segments))
+
+    @classmethod
+    def from_table(cls, table):
+        """Fit an interpolant to the loudness and pitch columns of a segment table.
+
+        Args:
+            table (SegmentTable): the segments to interpolate (e.g. a chunk of a track's segments).
+
+        Returns:
+            a SegmentInterpolator with 13 channels; channel 0 is loudness and channels 1-12 are pitch strengths.
+        """
+        values = np.empty((len(table), 13), dtype=np.float64)
+        values[:, 0] = table.loudness_start
+        np.maximum(table.pitches, 0, out=values[:, 1:])
+        return cls(table.start, values)
+
+    def evaluate(self, pos):
+        """Evaluate every channel at a single position (fast path for the render loop).
+
+        Args:
+            pos (float): the playback position (offset into the track in seconds).
+
+        Returns:
+            a (num_channels,) float64 array of interpolated values.
+
+        Raises:
+            ValueError: if pos is outside of the interpolated range.
+        """
+        if not self.start <= pos <= self.end:
+            raise ValueError("Position {} is outside of the interpolation range [{}, {}]."
+                             .format(pos, self.start, self.end))
+        index = min(bisect.bisect_right(self.time_list, pos) - 1, len(self.coefficients) - 1)
+        c0, c1, c2, c3 = self.coefficients[index]
+        offset = pos - self.time_list[index]
+        return c0 + offset * (c1 + offset * (c2 + offset * c3))
+
+    def evaluate_many(self, positions):
+        """Evaluate every channel at many positions at once. Positions outside of the range are clamped to it.
+
+        Args:
+            positions (np.ndarray): an array of playback positions (offsets into the track in seconds).
+
+        Returns:
+            a (num_positions, num_channels) float64 array of interpolated values.
+        """
+        positions = np.clip(np.asarray(positions, dtype=np.float64), self.start, self.end)
+        indices = np.clip(np.searchsorted(self.times, positions, side="right") - 1, 0, len(self.coefficients) - 1)
+        offsets = (positions - self.times[indices])[:, np.newaxis]
+        coefficients = self.coefficients[indices]
+        return coefficients[:, 0] + offsets * (coefficients[:, 1] + offsets * (
+            coefficients[:, 2] + offsets * coefficients[:, 3]))
+
+    @staticmethod
+    def _pchip_derivatives(widths, slopes):
+        """Choose the derivative at every point so that the interpolant is monotone between points.
+
+        Args:
+            widths (np.ndarray): a (num_points - 1,) array of interval widths.
+            slopes (np.ndarray): a (num_points - 1, num_channels) array of secant slopes of each interval.
+
+        Returns:
+            a (num_points, num_channels) array of derivatives.
+        """
+        if len(widths) == 1:
+            return np.repeat(slopes, 2, axis=0)
+
+        derivatives = np.zeros((len(widths) + 1, slopes.shape[1]), dtype=np.float64)
+
+        # Interior points: weighted harmonic mean of the neighbouring slopes, or 0 at local extrema
+        w1 = (2 * widths[1:] + widths[:-1])[:, np.newaxis]
+        w2 = (widths[1:] + 2 * widths[:-1])[:, np.newaxis]
+        previous, following = slopes[:-1], slopes[1:]
+        monotone = (np.sign(previous) == np.sign(following)) & (previous != 0) & (following != 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weighted_harmonic_mean = (w1 / previous + w2 / following) / (w1 + w2)
+            derivatives[1:-1] = np.where(monotone, 1.0 / weighted_harmonic_mean, 0.0)
+
+        # End points: a shape-preserving three-point estimate
+        derivatives[0] = SegmentInterpolator._edge_derivative(widths[0], widths[1], slopes[0], slopes[1])
+        derivatives[-1] = SegmentInterpolator._edge_derivative(widths[-1], widths[-2], slopes[-1], slopes[-2])
+        return derivatives
+
+    @staticmethod
+    def _edge_derivative(h0, h1, m0, m1):
+        """Estimate the derivative at an end point from the two intervals next to it.
+
+        Args:
+            h0 (float): the width of the interval at the end point.
+            h1 (float): the width of the interval next to it.
+            m0 (np.ndarray): the secant slopes of the interval at the end point (one for each channel).
+            m1 (np.ndarray): the secant slopes of the interval next to it (one for each channel).
+
+        Returns:
+            an array of derivatives at the end point (one for each channel).
+        """
+        derivative = ((2 * h0 + h1) * m0 - h0 * m1) / (h0 + h1)
+        derivative = np.where(np.sign(derivative) != np.sign(m0), 0.0, derivative)
+        overshoots = (np.sign(m0) != np.sign(m1)) & (np.abs(derivative) > 3 * np.abs(m0))
+        return np.where(overshoots, 3 * m0, derivative)
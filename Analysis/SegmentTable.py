@@ -0,0 +1,176 @@
+import itertools
+
+import numpy as np
+
+
+class SegmentTable:
+    """Audio analysis segments stored column by column in NumPy arrays.
+
+    The list of segment dicts returned by the Spotify API is converted once into one array per field. Ranges of
+    segments (e.g. chunks of track data) are then taken as views by index range (see slice()), so preparing a chunk
+    never rebuilds Python lists or copies the remaining segments.
+
+    Args:
+        start (np.ndarray): a (num_segments,) array of segment start times in seconds.
+        loudness_start (np.ndarray): a (num_segments,) array of loudness values at the start of each segment.
+        pitches (np.ndarray): a (num_segments, 12) array of pitch strengths (one column for each major musical key).
+        timbre (np.ndarray): a (num_segments, 12) array of timbre values (optional).
+        loudness_max (np.ndarray): a (num_segments,) array of the peak loudness of each segment (optional).
+        loudness_max_time (np.ndarray): a (num_segments,) array of the offsets in seconds from the start of each segment
+            to its peak loudness (optional).
+
+    Attributes:
+        loudness_max (np.ndarray): the (num_segments,) float32 array of peak loudness values (None if not parsed).
+        loudness_max_time (np.ndarray): the (num_segments,) float32 array of offsets to the peak loudness (None if not
+            parsed).
+        loudness_start (np.ndarray): the (num_segments,) float32 array of loudness values.
+        pitches (np.ndarray): the (num_segments, 12) float32 array of pitch strengths.
+        start (np.ndarray): the (num_segments,) float64 array of segment start times.
+        timbre (np.ndarray): the (num_segments, 12) float32 array of timbre values (None if not parsed).
+    """
+
+    # Columns that may be missing (e.g. in tables loaded from older cache entries) and their values in padding segments
+    OPTIONAL_COLUMNS = {"loudness_max": -25.0, "loudness_max_time": 0.0, "timbre": 0.0}
+
+    def __init__(self, start, loudness_start, pitches, timbre=None, loudness_max=None, loudness_max_time=None):
+        self.loudness_max = None if loudness_max is None else np.asarray(loudness_max, dtype=np.float32)
+        self.loudness_max_time = None if loudness_max_time is None else np.asarray(loudness_max_time, dtype=np.float32)
+        self.loudness_start = np.asarray(loudness_start, dtype=np.float32)
+        self.pitches = np.asarray(pitches, dtype=np.float32).reshape(-1, 12)
+        self.start = np.asarray(start, dtype=np.float64)
+        self.timbre = None if timbre is None else np.asarray(timbre, dtype=np.float32).reshape(-1, 12)
+
+    def __len__(self):
+        return len(self.start)
+
+    @classmethod
+    def from_segments(cls, segments, include_timbre=False):
+        """Parse audio analysis segments from the Spotify API into columns.
+
+        Each column is filled straight from the segment dicts with np.fromiter, without building intermediate lists.
+
+        Args:
+            segments (list): audio analysis segments (dicts with "start", "loudness_start", "loudness_max",
+                "loudness_max_time" and "pitches", and "timbre" if include_timbre is True), sorted by start time.
+            include_timbre (bool): if True, also parse the timbre of each segment.
+
+        Returns:
+            a SegmentTable holding the segments.
+        """
+        count = len(segments)
+        start = np.fromiter((segment["start"] for segment in segments), dtype=np.float64, count=count)
+        loudness_start = np.fromiter(
+            (segment["loudness_start"] for segment in segments), dtype=np.float32, count=count
+        )
+        loudness_max = np.fromiter((segment["loudness_max"] for segment in segments), dtype=np.float32, count=count)
+        loudness_max_time = np.fromiter(
+            (segment["loudness_max_time"] for segment in segments), dtype=np.float32, count=count
+        )
+        pitches = np.fromiter(
+            itertools.chain.from_iterable(segment["pitches"] for segment in segments), dtype=np.float32, count=12 * count
+        )
+        timbre = None
+        if include_timbre:
+            timbre = np.fromiter(
+                itertools.chain.from_iterable(segment["timbre"] for segment in segments),
+                dtype=np.float32,
+                count=12 * count
+            )
+        return cls(start, loudness_start, pitches, timbre, loudness_max, loudness_max_time)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild a segment table from the arrays stored in the analysis cache.
+
+        Args:
+            arrays (dict): a dict with "start", "loudness_start" and "pitches" arrays (and optionally "loudness_max",
+                "loudness_max_time" and "timbre").
+
+        Returns:
+            a SegmentTable holding the segments.
+        """
+        optional = {name: arrays.get(name) for name in SegmentTable.OPTIONAL_COLUMNS}
+        return cls(arrays["start"], arrays["loudness_start"], arrays["pitches"], **optional)
+
+    def to_arrays(self):
+        """Get the columns as a dict of arrays (e.g. for the analysis cache).
+
+        Returns:
+            a dict with "start", "loudness_start" and "pitches" arrays (and each optional column that was parsed).
+        """
+        arrays = {"start": self.start, "loudness_start": self.loudness_start, "pitches": self.pitches}
+        for name in SegmentTable.OPTIONAL_COLUMNS:
+            if getattr(self, name) is not None:
+                arrays[name] = getattr(self, name)
+        return arrays
+
+    def chunk_end(self, first, chunk_length):
+        """Find where a chunk of track data starting at segment first should end.
+
+        A chunk covers at least chunk_length seconds of segments. Consecutive chunks share their boundary segment, so
+        that every position between the first and last segment is covered by a chunk. If fewer than 2 segments would be
+        left after the chunk, the chunk extends to the last segment instead.
+
+        Args:
+            first (int): the index of the first segment of the chunk.
+            chunk_length (float): the minimum number of seconds of track data in the chunk.
+
+        Returns:
+            the index of the last segment of the chunk (the first segment of the next chunk), or len(self) if the chunk
+            extends to the last segment.
+        """
+        end = int(np.searchsorted(self.start, self.start[first] + chunk_length, side="right"))
+        return end if end < len(self) - 1 else len(self)
+
+    def segment_at(self, pos):
+        """Find the segment playing at a playback position.
+
+        Args:
+            pos (float): the playback position (offset into the track in seconds).
+
+        Returns:
+            the index of the last segment starting at or before pos (0 if pos is before the first segment).
+        """
+        return max(int(np.searchsorted(self.start, pos, side="right")) - 1, 0)
+
+    def pad(self, duration):
+        """Pad the segments with quiet segments so that the data covers the full track length.
+
+        Args:
+            duration (float): the duration of the track in seconds.
+
+        Returns:
+            a new SegmentTable starting before 0 and ending after duration.
+        """
+        def pad_column(column, value):
+            padding = np.full((1,) + column.shape[1:], value)
+            return np.concatenate([padding, column, padding])
+
+        optional = {
+            name: None if getattr(self, name) is None else pad_column(getattr(self, name), value)
+            for name, value in SegmentTable.OPTIONAL_COLUMNS.items()
+        }
+        return SegmentTable(
+            np.concatenate([[-0.1], self.start, [duration + 0.1]]),
+            pad_column(self.loudness_start, -25.0),
+            pad_column(self.pitches, 0.0),
+            **optional
+        )
+
+    def slice(self, first, last):
+        """Take a range of segments without copying any data.
+
+        Args:
+            first (int): the index of the first segment of the range.
+            last (int): the index after the last segment of the range.
+
+        Returns:
+            a SegmentTable whose columns are views into this table's columns.
+        """
+        optional = {
+            name: None if getattr(self, name) is None else getattr(self, name)[first:last]
+            for name in SegmentTable.OPTIONAL_COLUMNS
+        }
+        return SegmentTable(
+            self.start[first:last], self.loudness_start[first:last], self.pitches[first:last], **optional
+        )
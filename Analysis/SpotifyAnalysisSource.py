@@ -0,0 +1,31 @@
+from Analysis.AnalysisSource import AnalysisSource
+from Analysis.RhythmIndex import RhythmIndex
+from Analysis.SegmentTable import SegmentTable
+
+
+class SpotifyAnalysisSource(AnalysisSource):
+    """Reads track analysis from the Spotify audio analysis API.
+
+    Args:
+        sp (Spotify): the Spotify object used to fetch audio analysis.
+
+    Attributes:
+        sp (Spotify): the Spotify object used to fetch audio analysis.
+    """
+
+    NAME = "api"
+
+    def __init__(self, sp):
+        self.sp = sp
+
+    def analyze(self, track_id):
+        """Fetch the audio analysis of a track and parse its segments and rhythm events.
+
+        Args:
+            track_id (str): the Spotify ID of the track.
+
+        Returns:
+            a tuple (segment_table, rhythm_index) of the track's SegmentTable (not padded) and RhythmIndex.
+        """
+        analysis = self.sp.audio_analysis(track_id)
+        return SegmentTable.from_segments(analysis["segments"]), RhythmIndex.from_analysis(analysis)
@@ -0,0 +1,88 @@
+import numpy as np
+
+from Analysis.LoudnessEnvelope import LoudnessEnvelope
+from Analysis.SegmentInterpolator import SegmentInterpolator
+from Analysis.SegmentTable import SegmentTable
+
+
+class TrackFrames:
+    """Loudness and pitch data for a whole track, evaluated once per track on a fixed time grid at the frame rate.
+
+    Instead of evaluating 13 interpolated functions every frame, the interpolants are evaluated once for every frame of
+    the track (vectorized over all 13 channels) and stored in a compact float32 array. Looking up the data for a
+    playback position is then a single index into that array.
+
+    Pitch strengths are interpolated with PCHIP, while loudness follows the attack/decay envelope of the segments (see
+    LoudnessEnvelope), so loudness peaks land on time.
+
+    Args:
+        frames (np.ndarray): a (num_frames, 13) array; column 0 holds loudness and columns 1-12 hold pitch strengths.
+        frame_rate (float): the amount of time in seconds between consecutive frames.
+
+    Attributes:
+        frames (np.ndarray): a (num_frames, 13) float32 array of loudness and pitch values (one row per frame).
+        frame_rate (float): the amount of time in seconds between consecutive frames.
+    """
+
+    # Identifies how frames are computed, so precomputed frames cached by older versions can be told apart
+    KIND = "{}+{}".format(SegmentInterpolator.KIND, LoudnessEnvelope.KIND)
+
+    def __init__(self, frames, frame_rate):
+        self.frames = np.ascontiguousarray(frames, dtype=np.float32)
+        self.frame_rate = frame_rate
+
+    def __len__(self):
+        return len(self.frames)
+
+    @classmethod
+    def from_segments(cls, segments, duration, frame_rate=0.03):
+        """Interpolate segment data from the Spotify API and sample it at every frame of the track.
+
+        Args:
+            segments (list): audio analysis segments (dicts with "start", "loudness_start" and "pitches"), sorted by
+                start time and covering the whole track.
+            duration (float): the duration of the track in seconds.
+            frame_rate (float): the amount of time in seconds between consecutive frames.
+
+        Returns:
+            a TrackFrames object holding loudness and pitch values for every frame of the track.
+        """
+        return cls.from_table(SegmentTable.from_segments(segments), duration, frame_rate)
+
+    @classmethod
+    def from_table(cls, table, duration, frame_rate=0.03):
+        """Interpolate the columns of a segment table and sample them at every frame of the track.
+
+        Args:
+            table (SegmentTable): the track's segments, covering the whole track (see SegmentTable.pad).
+            duration (float): the duration of the track in seconds.
+            frame_rate (float): the amount of time in seconds between consecutive frames.
+
+        Returns:
+            a TrackFrames object holding loudness and pitch values for every frame of the track.
+        """
+        # Fit one interpolant for all 13 channels and evaluate it on the frame grid in a single vectorized call, then
+        # replace the loudness channel with the loudness envelope
+        interpolator = SegmentInterpolator.from_table(table)
+        num_frames = int(duration / frame_rate) + 1
+        frames = interpolator.evaluate_many(np.arange(num_frames) * frame_rate)
+        frames[:, 0] = LoudnessEnvelope.from_table(table, duration, frame_rate).values
+        return cls(frames, frame_rate)
+
+    def sample(self, pos):
+        """Look up the loudness and pitch values for a playback position.
+
+        Positions outside of the track are clamped to the first or last frame.
+
+        Args:
+            pos (float): the playback position (offset into the track in seconds).
+
+        Returns:
+            a (13,) float32 array; element 0 is the loudness and elements 1-12 are the pitch strengths.
+        """
+        index = int(pos / self.frame_rate + 0.5)
+        if index < 0:
+            index = 0
+        elif index >= len(self.frames):
+            index = len(self.frames) - 1
+        return self.frames[index]
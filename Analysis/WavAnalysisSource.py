@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+
+from Analysis.AnalysisSource import AnalysisSource
+from Analysis.AudioAnalyzer import AudioAnalyzer
+from Analysis.RhythmIndex import RhythmIndex
+from Analysis.SegmentTable import SegmentTable
+
+
+class WavAnalysisSource(AnalysisSource):
+    """Computes track analysis locally from WAV files instead of calling the Spotify audio analysis API.
+
+    Each track is read from "<track_id>.wav" in wav_dir and analyzed with an AudioAnalyzer. Every analysis frame becomes
+    one segment (with its peak loudness at its start), so the result feeds the same loudness and pitch consumers as
+    Spotify's analysis. No rhythm events are detected.
+
+    Args:
+        wav_dir (str): the directory holding one WAV file per track, named after the track's Spotify ID.
+        frame_rate (float): the amount of time in seconds between consecutive analysis frames.
+
+    Attributes:
+        frame_rate (float): the amount of time in seconds between consecutive analysis frames.
+        wav_dir (str): the directory holding one WAV file per track.
+    """
+
+    NAME = "wav"
+
+    def __init__(self, wav_dir, frame_rate=0.03):
+        self.frame_rate = frame_rate
+        self.wav_dir = wav_dir
+
+    def analyze(self, track_id):
+        """Analyze the WAV file of a track.
+
+        Args:
+            track_id (str): the Spotify ID of the track.
+
+        Returns:
+            a tuple (segment_table, rhythm_index) of the track's SegmentTable (not padded) and an empty RhythmIndex.
+        """
+        return self.analyze_file(os.path.join(self.wav_dir, "{}.wav".format(track_id))), RhythmIndex({})
+
+    def analyze_file(self, path):
+        """Analyze a WAV file.
+
+        Args:
+            path (str): the path to the WAV file.
+
+        Returns:
+            a SegmentTable with one segment per analysis frame.
+        """
+        samples, sample_rate = AudioAnalyzer.read_wav(path)
+        frames = AudioAnalyzer(sample_rate, self.frame_rate).analyze(samples)
+        return SegmentTable(
+            np.arange(len(frames)) * self.frame_rate,
+            frames[:, 0],
+            frames[:, 1:],
+            loudness_max=frames[:, 0],
+            loudness_max_time=np.zeros(len(frames))
+        )
@@ -0,0 +1,26 @@
+from Animations.Animator import Animator
+from segmented_strip import SegmentedStrip
+
+
+class AnimatorGroup(Animator):
+    """Plays several animations in lockstep, one for each output segment.
+
+    Segments that are views of a SegmentedStrip are pushed to their strip once every animation has drawn its frame.
+
+    Args:
+        animators (list): the animators to play (one for each segment).
+
+    Attributes:
+        animators (list): the animators played by this group (one for each segment).
+    """
+
+    def __init__(self, animators):
+        super().__init__(None, sum(animator.num_pixels for animator in animators), animators[0].frame_rate)
+        self.animators = animators
+
+    def animate(self):
+        """Pushes one frame of every animation in the group.
+        """
+        for animator in self.animators:
+            animator.animate()
+        SegmentedStrip.show_all([animator.strip for animator in self.animators])
@@ -1,3 +1,5 @@
+import numpy as np
+
 from Animations.Animator import Animator
 
 _author_ = "Yusuf Sezer"
@@ -14,7 +16,8 @@ class LoadingAnimator(Animator):
         self.start_pixel = self.start_pixel + max(1, int(self.frame_rate * self.num_pixels))
         end_pixel = self.start_pixel + (self.num_pixels // 10)
 
-        self.strip.fill(0, self.num_pixels, 0, 0, 0, 0) # Clear strip
-        for idx in range(self.start_pixel, end_pixel):
-            self.strip.set_pixel(idx % self.num_pixels, 255, 255, 255, 100)
+        # Build the whole frame (strip cleared except for the loading bar) and push it in one bulk call
+        frame = np.zeros((self.num_pixels, 4), dtype=np.uint8)
+        frame[np.arange(self.start_pixel, end_pixel) % self.num_pixels] = (255, 255, 255, 100)
+        self.strip.set_frame(frame)
         self.strip.show()
@@ -1,5 +1,11 @@
+import numpy as np
+
+from Visualizations.Palette import Palette
 from Visualizations.Visualizer import Visualizer
 
+# The background color fades towards this color (red) when the track gets loud
+LOUD_COLOR = (120, 0, 0)
+
 
 class LoudnessLengthEdgeFadeVisualizer(Visualizer):
 
@@ -7,27 +13,56 @@ class LoudnessLengthEdgeFadeVisualizer(Visualizer):
         """Displays a visual on the LED strip based on the loudness and pitch data at current playback position.
 
         Args:
-            strip (strip obj): light strip or visualization including 'set_pixel' and 'fill'.
-            num_pixels (int): the number of LEDs on the strip.
             loudness_func (interp1d): interpolated loudness function.
             pitch_funcs (list): a list of interpolated pitch functions (one pitch function for each major musical key).
             pos (float): the current playback position (offset into the track in seconds).
         """
+        self.visualize_sample(loudness_func(pos), [pitch_func(pos) for pitch_func in pitch_funcs], pos)
 
-        # Get normalized loudness value for current playback position
-        norm_loudness = Visualizer.normalize_loudness(loudness_func(pos))
+    def visualize_sample(self, loudness, pitches, pos):
+        """Displays a visual on the LED strip from loudness and pitch values that were already evaluated.
+
+        Args:
+            loudness (float): the loudness value at the current playback position.
+            pitches (list): a list of 12 pitch strengths (one for each major musical key) at the current position.
+            pos (float): the current playback position (offset into the track in seconds).
+        """
+        frame, brightness = self.render_frame(loudness, pitches)
+        self._push_frame(frame, brightness)
 
+    def render_frame(self, loudness, pitches):
+        """Builds a whole frame of the visualization with NumPy broadcasting instead of per-pixel Python calls.
+
+        The lit part of the strip grows from the center based on loudness and is segmented into 12 zones (1 for each
+        of the pitch keys). Each zone is colored based on the corresponding pitch strength and fades back towards the
+        background color near its ends. Pixels outside of the lit part of the strip are turned off.
+
+        Args:
+            loudness (float): the loudness value at the current playback position.
+            pitches (list): a list of 12 pitch strengths (one for each major musical key) at the current position.
+
+        Returns:
+            a tuple (frame, brightness) where frame is a (num_pixels, 3) uint8 array of RGB values and brightness is a
+            (num_pixels,) uint8 array of brightness values in range [0, 100].
+
+        Raises:
+            ValueError: if the primary or secondary color hasn't been set.
+        """
+        if self.fade_palettes is None:
+            raise ValueError("The primary and secondary colors must be set before rendering, got {} and {}."
+                             .format(self.primary_color, self.secondary_color))
+
+        # Get normalized loudness value for current playback position
+        norm_loudness = Visualizer.normalize_loudness(loudness)
 
         #Full strip fill threshold
         color_threshold = 0.75
         length_threshold = 0.85
         # Fading background color to (RED, hardcoded) if over 0.75
-        start_color = self.primary_color # (0, 0, 255)
+        background_step = 0
         if norm_loudness > color_threshold:
-            start_color = LoudnessLengthEdgeFadeVisualizer\
-                .apply_gradient_fade((120, 0, 0), (norm_loudness-color_threshold)/(1-color_threshold), start_color)
-
-        # print("%f: %f" % (pos, norm_loudness))
+            background_step = self.background_palette.index((norm_loudness-color_threshold)/(1-color_threshold))
+        start_color = self.background_palette.colors[background_step]
 
         # Determine how many pixels to light (growing from the center of the strip) based on normalized loudness
         mid = self.num_pixels // 2
@@ -36,60 +71,56 @@ class LoudnessLengthEdgeFadeVisualizer(Visualizer):
         upper = mid + round(length / 2)
         brightness = 100
 
-        # Set middle pixel to start_color (when an odd number of pixels are lit, segments don't cover the middle pixel)
-        start_r, start_g, start_b = start_color
-        self.strip.set_pixel(mid, start_r, start_g, start_b, brightness)
-
-        # Segment strip into 12 zones (1 for each of the pitch keys) and set color based on corresponding pitch strength
-        for i in range(0, 12):
-            pitch_strength = pitch_funcs[i](pos)
-            start = lower + (i * length // 12) if i in range(6) else upper - ((11 - i + 1) * length // 12)
-            end = lower + ((i + 1) * length // 12) if i in range(6) else upper - ((11 - i) * length // 12)
-            segment_len = end - start
-            segment_mid = start + (segment_len // 2)
-
-            # Get the appropriate color based on the current pitch zone and pitch strength
-            zone_r, zone_g, zone_b = self._calculate_zone_color(pitch_strength, start_color, self.secondary_color)
-
-            # Fade the strength of the RGB values near the ends of the zone to produce a nice gradient effect
-            for j in range(start, end + 1):
-                color_strength = (1.0 + (j - start)) / (1.0 + (segment_mid - start))
-                if color_strength > 1.0:
-                    color_strength = 2.0 - color_strength
-                faded_r, faded_g, faded_b = LoudnessLengthEdgeFadeVisualizer\
-                    .apply_gradient_fade((zone_r, zone_g, zone_b), color_strength, start_color)
-                self.strip.set_pixel(j, faded_r, faded_g, faded_b, brightness)
-
-        # Make sure to turn off pixels that are not in use and push visualization to the strip
-        self.strip.fill(0, lower, 0, 0, 0, 0)
-        self.strip.fill(upper, self.num_pixels, 0, 0, 0, 0)
-        self.strip.show()
-
-    def _calculate_zone_color(self, pitch_strength, start_color, end_color):
-        """Calculate the color to visualize based on the pitch/zone index and corresponding pitch strength.
-
-        The visualizer divides the lit portion of the strip into 12 equal-length zones, one for each of the 12 major
-        pitch keys. This function calculates what color should be displayed in the zone specified by zone_index if the
-        corresponding pitch has strength pitch_strength (0.0 corresponds to lowest strength, 1.0 corresponds to maximum
-        strength).
-
-        Args:
-            pitch_strength (float): a value representing how strong or present the pitch is (normalized to [0.0, 1.0]).
+        # Segment strip into 12 zones (zones 0-5 grow up from lower, zones 6-11 grow down from upper)
+        zones = np.arange(12)
+        starts = np.where(zones < 6, lower + zones * length // 12, upper - (12 - zones) * length // 12)
+        ends = np.where(zones < 6, lower + (zones + 1) * length // 12, upper - (11 - zones) * length // 12)
+        segment_mids = starts + (ends - starts) // 2
+
+        # Zones share their boundary pixels; later zones are drawn over earlier ones, so the last covering zone wins
+        pixels = np.arange(self.num_pixels)
+        covered = (pixels >= starts[:, np.newaxis]) & (pixels <= ends[:, np.newaxis])
+        owner = 11 - np.argmax(covered[::-1], axis=0)
+        lit = covered.any(axis=0)
+
+        # Fade the strength of the RGB values near the ends of each zone to produce a nice gradient effect
+        zone_starts = starts[owner]
+        color_strengths = (1.0 + (pixels - zone_starts)) / (1.0 + (segment_mids[owner] - zone_starts))
+        color_strengths = np.where(color_strengths > 1.0, 2.0 - color_strengths, color_strengths)
+
+        # Each zone's color is start_color blended towards the secondary color by the zone's pitch strength, and each
+        # pixel is faded from start_color towards its zone's color, so both blends combine into one strength that is
+        # looked up on the precomputed gradient from this frame's background color
+        pitch_strengths = np.clip(np.asarray(pitches, dtype=np.float64), 0.0, 1.0)
+        faded = self.fade_palettes[background_step].lookup(color_strengths * pitch_strengths[owner])
 
-        Returns:
-            a 3-tuple of ints representing the RGB value that should be displayed in the zone specified by zone_index.
+        # Set middle pixel to start_color (when an odd number of pixels are lit, segments don't cover the middle pixel)
+        frame = np.zeros((self.num_pixels, 3), dtype=np.uint8)
+        if 0 <= mid < self.num_pixels:
+            frame[mid] = start_color
+        frame[lit] = faded[lit]
+
+        # Make sure to turn off pixels that are not in use (both ends of the unused ranges are inclusive)
+        frame[:max(lower + 1, 0)] = 0
+        frame[max(upper, 0):] = 0
+        brightness_values = np.zeros(self.num_pixels, dtype=np.uint8)
+        brightness_values[max(lower + 1, 0):max(upper, 0)] = brightness
+        return frame, brightness_values
+
+    def _build_palettes(self):
+        """Precompute the gradients blended while rendering frames.
+
+        The background color fades from the primary color towards LOUD_COLOR as the track gets loud, and lit pixels
+        blend from the background color towards the secondary color. Both blends only depend on the configured colors,
+        so there is one gradient to the secondary color for every step of the background fade, and each frame picks the
+        gradient for its background step.
         """
-        if pitch_strength < 0.0:
-            pitch_strength = 0.0
-        elif pitch_strength > 1.0:
-            pitch_strength = 1.0
-
-        start_r, start_g, start_b = start_color
-        end_r, end_g, end_b = end_color
-        r_diff, g_diff, b_diff = end_r - start_r, end_g - start_g, end_b - start_b
-
-        r = start_r + int(pitch_strength * r_diff)
-        g = start_g + int(pitch_strength * g_diff)
-        b = start_b + int(pitch_strength * b_diff)
-
-        return r, g, b
+        if self.primary_color is None or self.secondary_color is None:
+            self.background_palette = self.fade_palettes = None
+            return
+        self.background_palette = Palette(self.primary_color, LOUD_COLOR)
+        palettes = {}
+        for color in self.background_palette.colors:
+            if color not in palettes:
+                palettes[color] = Palette(color, self.secondary_color)
+        self.fade_palettes = [palettes[color] for color in self.background_palette.colors]
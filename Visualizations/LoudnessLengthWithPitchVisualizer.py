@@ -1,3 +1,4 @@
+from Visualizations.Palette import Palette
 from Visualizations.Visualizer import Visualizer
 
 
@@ -12,6 +13,9 @@ class LoudnessLengthWithPitchVisualizer(Visualizer):
                     pitch_funcs (list): a list of interpolated pitch functions (one pitch function for each major musical key).
                     pos (float): the current playback position (offset into the track in seconds).
         """
+        if self.zone_palettes is None:
+            raise ValueError("The primary and secondary colors must be set before rendering, got {} and {}."
+                             .format(self.primary_color, self.secondary_color))
 
         start_color = self.primary_color
 
@@ -49,54 +53,48 @@ class LoudnessLengthWithPitchVisualizer(Visualizer):
 
         # Segment strip into 12 zones (1 for each of the pitch keys) and set color based on corresponding pitch strength
         for i in range(0, 12):
-            pitch_strength = pitch_funcs[i](pos)
+            pitch_strength = min(max(pitch_funcs[i](pos), 0.0), 1.0)
             start = lower + (i * length // 12) if i in range(6) else upper - ((11 - i + 1) * length // 12)
             end = lower + ((i + 1) * length // 12) if i in range(6) else upper - ((11 - i) * length // 12)
             segment_len = end - start
             segment_mid = start + (segment_len // 2)
 
-            # Get the appropriate color based on the current pitch zone and pitch strength
-            zone_r, zone_g, zone_b = LoudnessLengthWithPitchVisualizer\
-                ._calculate_zone_color(pitch_strength, i, start_color, end_colors)
+            # The zone's color is start_color blended towards the zone's end color by the pitch strength
+            palette = self.zone_palettes[i]
 
-            # Fade the strength of the RGB values near the ends of the zone to produce a nice gradient effect
+            # Fade the strength of the RGB values near the ends of the zone to produce a nice gradient effect (both
+            # blends combine into one strength that is looked up on the zone's precomputed gradient)
             for j in range(start, end + 1):
                 color_strength = (1.0 + (j - start)) / (1.0 + (segment_mid - start))
                 if color_strength > 1.0:
                     color_strength = 2.0 - color_strength
-                faded_r, faded_g, faded_b = LoudnessLengthWithPitchVisualizer\
-                    .apply_gradient_fade((zone_r, zone_g, zone_b), color_strength, start_color)
-                strip.set_pixel(j, faded_r, faded_g, faded_b, brightness)
+                faded_r, faded_g, faded_b = palette.color(pitch_strength * color_strength)
+                self.strip.set_pixel(j, faded_r, faded_g, faded_b, brightness)
 
         # Make sure to turn off pixels that are not in use and push visualization to the strip
         self.strip.fill(0, lower, 0, 0, 0, 0)
         self.strip.fill(upper, self.num_pixels, 0, 0, 0, 0)
         self.strip.show()
 
-    def _calculate_zone_color(self, pitch_strength, zone_index):
-        """Calculate the color to visualize based on the pitch/zone index and corresponding pitch strength.
+    def _build_palettes(self):
+        """Precompute the gradient of colors to visualize in each zone.
+
         The visualizer divides the lit portion of the strip into 12 equal-length zones, one for each of the 12 major
-        pitch keys. This function calculates what color should be displayed in the zone specified by zone_index if the
-        corresponding pitch has strength pitch_strength (0.0 corresponds to lowest strength, 1.0 corresponds to maximum
+        pitch keys. Each zone fades from the primary color (lowest pitch strength) to its end color (maximum pitch
         strength).
-        Args:
-            pitch_strength (float): a value representing how strong or present the pitch is (normalized to [0.0, 1.0]).
-            zone_index (int): an index in range [0, 11] corresponding to the zone/pitch key.
-            start_color (int tuple): Represents an RGB value representing the background color of the strip.
-            end_colors (dict): A dictionary of values for each zone. Defined in visualize.
-        Returns:
-            a 3-tuple of ints representing the RGB value that should be displayed in the zone specified by zone_index.
         """
-        if pitch_strength < 0.0:
-            pitch_strength = 0.0
-        elif pitch_strength > 1.0:
-            pitch_strength = 1.0
-
-        start_r, start_g, start_b = self.primary_color, end_g, end_b = self.secondary_color[zone_index]
-        r_diff, g_diff, b_diff = end_r - start_r, end_g - start_g, end_b - start_b
-
-        r = start_r + int(pitch_strength * r_diff)
-        g = start_g + int(pitch_strength * g_diff)
-        b = start_b + int(pitch_strength * b_diff)
-
-        return r, g, b
+        if self.primary_color is None or self.secondary_color is None:
+            self.zone_palettes = None
+            return
+
+        # The secondary color is either one end color for all zones or a dict/list of end colors (one for each zone)
+        palettes = {}
+        self.zone_palettes = []
+        for zone_index in range(12):
+            end_color = self.secondary_color
+            if not isinstance(end_color[0], int):
+                end_color = end_color[zone_index]
+            end_color = tuple(end_color)
+            if end_color not in palettes:
+                palettes[end_color] = Palette(self.primary_color, end_color)
+            self.zone_palettes.append(palettes[end_color])
@@ -0,0 +1,117 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from segmented_strip import SegmentedStrip, StripSegment
+from Visualizations.Visualizer import Visualizer
+
+
+class MultiSegmentVisualizer(Visualizer):
+    """A visualizer that drives several output segments (strips or parts of strips) from one stream of track data.
+
+    Each segment has its own visualizer, pixel count and colors, but all of them are fed the same loudness and pitch
+    values for the same playback position, so adding segments doesn't add Spotify API calls or interpolation work. When
+    there is more than one segment, segments are rendered concurrently on a thread pool, which overlaps rendering with
+    blocking writes to strips that aren't wrapped in an output stage. Segments that are views of a SegmentedStrip are
+    pushed to their strip once every segment has been drawn. Since all segments are drawn in the same frame, they share
+    one frame rate.
+
+    Args:
+        visualizers (list): the visualizers to drive (one for each segment).
+        frame_rate (float): the amount of time in seconds between each frame of every segment (defaults to the frame
+            rate the segment visualizers share).
+        parallel (bool): if True, render segments concurrently on a thread pool.
+
+    Raises:
+        ValueError: if the segment visualizers have different frame rates.
+
+    Attributes:
+        executor (ThreadPoolExecutor): the thread pool segments are rendered on (None if segments render in sequence).
+        visualizers (list): the visualizers driven by this visualizer (one for each segment).
+    """
+
+    def __init__(self, visualizers, frame_rate=None, parallel=True):
+        frame_rates = sorted({visualizer.frame_rate for visualizer in visualizers})
+        if len(frame_rates) > 1:
+            raise ValueError("Segment visualizers must share one frame rate, got {}.".format(frame_rates))
+        super().__init__(
+            None,
+            sum(visualizer.num_pixels for visualizer in visualizers),
+            visualizers[0].primary_color,
+            visualizers[0].secondary_color,
+            frame_rate or visualizers[0].frame_rate
+        )
+        self.executor = None
+        if parallel and len(visualizers) > 1:
+            self.executor = ThreadPoolExecutor(max_workers=len(visualizers), thread_name_prefix="[SEGMENT]")
+        self.visualizers = visualizers
+
+    def visualize(self, loudness_func, pitch_funcs, pos):
+        """Displays a visual on every segment based on the loudness and pitch data at current playback position.
+
+        The interpolated functions are evaluated once and the values are shared by all segments.
+
+        Args:
+            loudness_func (interp1d): interpolated loudness function.
+            pitch_funcs (list): a list of interpolated pitch functions (one pitch function for each major musical key).
+            pos (float): the current playback position (offset into the track in seconds).
+        """
+        self.visualize_sample(loudness_func(pos), [pitch_func(pos) for pitch_func in pitch_funcs], pos)
+
+    def visualize_sample(self, loudness, pitches, pos):
+        """Displays a visual on every segment from loudness and pitch values that were already evaluated.
+
+        Args:
+            loudness (float): the loudness value at the current playback position.
+            pitches (list): a list of 12 pitch strengths (one for each major musical key) at the current position.
+            pos (float): the current playback position (offset into the track in seconds).
+        """
+        self._for_each(lambda visualizer: visualizer.visualize_sample(loudness, pitches, pos))
+
+    def get_visualization_device(self):
+        return self.visualizers[0].get_visualization_device()
+
+    def get_visualization_devices(self):
+        """Get the output devices written to by the segments (the strip behind segments that share a strip).
+
+        Returns:
+            a list of distinct output devices.
+        """
+        devices = []
+        for visualizer in self.visualizers:
+            device = visualizer.get_visualization_device()
+            if isinstance(device, StripSegment):
+                device = device.parent.strip
+            if all(device is not seen for seen in devices):
+                devices.append(device)
+        return devices
+
+    def reset(self):
+        self._for_each(lambda visualizer: visualizer.reset())
+
+    def set_rhythm(self, rhythm):
+        self.rhythm = rhythm
+        for visualizer in self.visualizers:
+            visualizer.set_rhythm(rhythm)
+
+    def set_primary_color(self, color):
+        self.primary_color = color
+        for visualizer in self.visualizers:
+            visualizer.set_primary_color(color)
+
+    def set_secondary_color(self, color):
+        self.secondary_color = color
+        for visualizer in self.visualizers:
+            visualizer.set_secondary_color(color)
+
+    def _for_each(self, draw):
+        """Draw on every segment (concurrently if a thread pool is used) and push segments that share a strip.
+
+        Args:
+            draw (function): a function taking a segment's visualizer that draws one frame on the segment.
+        """
+        if self.executor:
+            # Consume the results so exceptions raised while drawing a segment propagate to the caller
+            list(self.executor.map(draw, self.visualizers))
+        else:
+            for visualizer in self.visualizers:
+                draw(visualizer)
+        SegmentedStrip.show_all([visualizer.get_visualization_device() for visualizer in self.visualizers])
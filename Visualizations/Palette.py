@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class Palette:
+    """A precomputed lookup table of colors along the gradient from a start color to an end color.
+
+    Blending two colors (see Visualizer.apply_gradient_fade) costs a subtraction and a multiplication per channel. The
+    colors visualizers blend only change when the primary/secondary colors change, so the gradient is quantized into a
+    fixed number of steps once, and looking up a blended color (or a whole frame of them) is a single table index.
+    Strengths are truncated to the step below them, and visualizations fold two blends (e.g. a zone color and a fade
+    towards its edges) into one strength instead of rounding after each blend, so looked up colors can differ from the
+    per-pixel blends of apply_gradient_fade by up to 2 RGB units per channel with the default 256 steps. Frames are
+    therefore close to, but no longer exactly equal to, the output of the original per-pixel rendering loops.
+
+    Args:
+        start_color (int tuple): an RGB value for the color at strength 0.0.
+        end_color (int tuple): an RGB value for the color at strength 1.0.
+        steps (int): the number of colors in the table.
+
+    Attributes:
+        colors (list): the table as a list of int tuples, for fast scalar lookups from Python code.
+        end_color (int tuple): the RGB value for the color at strength 1.0.
+        start_color (int tuple): the RGB value for the color at strength 0.0.
+        steps (int): the number of colors in the table.
+        table (np.ndarray): a (steps, 3) uint8 array of colors; entry k is the blend at strength k / (steps - 1).
+    """
+
+    def __init__(self, start_color, end_color, steps=256):
+        self.end_color = tuple(end_color)
+        self.start_color = tuple(start_color)
+        self.steps = steps
+        start_rgb = np.array(start_color, dtype=np.int64)
+        strengths = np.arange(steps) / (steps - 1)
+        blended = start_rgb + np.trunc(strengths[:, np.newaxis] * (np.array(end_color) - start_rgb)).astype(np.int64)
+        self.table = blended.astype(np.uint8)
+        self.colors = [tuple(color) for color in self.table.tolist()]
+
+    def color(self, strength):
+        """Look up the blended color for one strength value.
+
+        Args:
+            strength (float): how far along the gradient the color is (clamped to [0.0, 1.0]).
+
+        Returns:
+            a 3-tuple of ints representing the blended RGB value.
+        """
+        return self.colors[self.index(strength)]
+
+    def index(self, strength):
+        """Find the step of the table holding the blended color for one strength value.
+
+        Args:
+            strength (float): how far along the gradient the color is (clamped to [0.0, 1.0]).
+
+        Returns:
+            the index (in range [0, steps - 1]) of the blended color in table and colors.
+        """
+        return int(min(max(strength, 0.0), 1.0) * (self.steps - 1))
+
+    def lookup(self, strengths, out=None):
+        """Look up the blended colors for an array of strength values.
+
+        Args:
+            strengths (np.ndarray): an array of strength values (clamped to [0.0, 1.0]).
+            out (np.ndarray): a uint8 array of shape strengths.shape + (3,) to write the colors into (optional).
+
+        Returns:
+            a uint8 array of shape strengths.shape + (3,) holding the blended RGB values.
+        """
+        indices = (np.clip(strengths, 0.0, 1.0) * (self.steps - 1)).astype(np.intp)
+        return np.take(self.table, indices, axis=0, out=out)
@@ -1,14 +1,34 @@
+import time
+
+from utils.metrics import Metrics
+
+
 class Visualizer:
 
-    def __init__(self, strip, num_pixels, primary_color=(0, 0, 255), secondary_color=(255, 211, 62)):
+    def __init__(self, strip, num_pixels, primary_color=(0, 0, 255), secondary_color=(255, 211, 62), frame_rate=0.03):
         self.strip = strip
         self.num_pixels = num_pixels
+        self.frame_rate = frame_rate
         self.primary_color = primary_color
         self.secondary_color = secondary_color
+        self.rhythm = None
+        self._build_palettes()
 
     def visualize(self):
         raise NotImplementedError("All visualizations must have a custom 'visualize' method.")
 
+    def visualize_sample(self, loudness, pitches, pos):
+        """Displays a visual on the LED strip from loudness and pitch values that were already evaluated.
+
+        Visualizations that only implement 'visualize' are fed constant functions of the passed values.
+
+        Args:
+            loudness (float): the loudness value at the current playback position.
+            pitches (list): a list of 12 pitch strengths (one for each major musical key) at the current position.
+            pos (float): the current playback position (offset into the track in seconds).
+        """
+        self.visualize(lambda _: loudness, [lambda _, pitch=pitch: pitch for pitch in pitches], pos)
+
     @staticmethod
     def normalize_loudness(loudness, range_min=-54.0, range_max=-4.0):
         """Normalize a loudness value to the range specified.
@@ -52,15 +72,58 @@ class Visualizer:
 
         return faded_r, faded_g, faded_b
 
+    def _push_frame(self, frame, brightness):
+        """Write a whole frame to the strip in one bulk call and push it to the strip.
+
+        Args:
+            frame (np.ndarray): a (num_pixels, 3) uint8 array of RGB values.
+            brightness (np.ndarray): a (num_pixels,) array of brightness values in range [0, 100].
+        """
+        start = time.perf_counter()
+        self.strip.set_frame(frame, brightness)
+        self.strip.show()
+        Metrics().observe("strip_push_seconds", time.perf_counter() - start)
+
     def get_visualization_device(self):
         return self.strip
 
+    def get_visualization_devices(self):
+        """Get every output device this visualizer writes to.
+
+        Returns:
+            a list of output devices.
+        """
+        return [self.strip]
+
     def reset(self):
         self.strip.fill(0, self.num_pixels, 0, 0, 0, 0)
         self.strip.show()
 
+    def set_rhythm(self, rhythm):
+        """Provide the rhythm events of the track being visualized.
+
+        The rhythm index is updated to the current playback position before each frame is visualized, so visualizations
+        can read beat, bar, tatum and section timing (e.g. self.rhythm.phase("bars")) without any searching.
+
+        Args:
+            rhythm (RhythmIndex): the rhythm events of the track (None if they aren't available).
+        """
+        self.rhythm = rhythm
+
     def set_primary_color(self, color):
-        self.primary_color = color
+        if color != self.primary_color:
+            self.primary_color = color
+            self._build_palettes()
 
     def set_secondary_color(self, color):
-        self.secondary_color = color
+        if color != self.secondary_color:
+            self.secondary_color = color
+            self._build_palettes()
+
+    def _build_palettes(self):
+        """Precompute the color gradients the visualization blends along (see Palette).
+
+        Called when the visualizer is created and whenever the primary or secondary color changes, so rendering a frame
+        only indexes into tables that are already built. Visualizations that blend colors override this; by default no
+        gradients are needed.
+        """
@@ -0,0 +1,48 @@
+import numpy as np
+
+from utils.frame_utils import as_frame
+
+
+class APA102Strip:
+    """An adapter that adds the bulk frame API (set_frame) to the apa102.APA102 driver.
+
+    The driver only exposes per-pixel calls, so pushing a whole frame costs one Python call per pixel. When the driver
+    exposes its raw LED buffer (leds) and color order map (rgb), the adapter writes the whole frame into that buffer at
+    once; otherwise it falls back to calling set_pixel for every pixel. Every other attribute is forwarded to the
+    wrapped driver, so the adapter can be used anywhere the driver is expected.
+
+    Args:
+        driver (apa102.APA102): the driver object for the physical LED strip.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.num_pixels = driver.num_led
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+    def set_frame(self, frame, brightness=100):
+        """Set every pixel of the strip at once from a whole frame.
+
+        Args:
+            frame (np.ndarray or bytes): a (num_pixels, 3) RGB array, a (num_pixels, 4) RGB + brightness array, or a
+                contiguous buffer of RGB triplets.
+            brightness (int or np.ndarray): a brightness value in range [0, 100] for every pixel, or an array of
+                brightness values (one for each pixel).
+        """
+        rgb, brightness = as_frame(frame, brightness)
+        count = min(len(rgb), self.num_pixels)
+        if not hasattr(self.driver, "leds") or not hasattr(self.driver, "rgb"):
+            for i, ((r, g, b), pixel_brightness) in enumerate(zip(rgb[:count].tolist(), brightness[:count].tolist())):
+                self.driver.set_pixel(i, r, g, b, pixel_brightness)
+            return
+
+        # Build the raw LED frames (brightness byte followed by the color bytes in the driver's order) in one pass
+        buffer = np.empty((count, 4), dtype=np.uint8)
+        global_brightness = self.driver.global_brightness
+        pixel_brightness = np.ceil(brightness[:count].astype(np.float64) * global_brightness / 100.0).astype(np.uint8)
+        buffer[:, 0] = (pixel_brightness & 0b00011111) | self.driver.LED_START
+        for channel in range(3):
+            buffer[:, self.driver.rgb[channel]] = rgb[:count, channel]
+        self.driver.leds[:4 * count] = buffer.ravel().tolist()
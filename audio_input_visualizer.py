@@ -0,0 +1,177 @@
+import argparse
+import queue
+import threading
+import time
+
+from Analysis.AudioAnalyzer import AudioAnalyzer
+from utils.frame_scheduler import FrameScheduler
+from utils.metrics import Metrics
+from Visualizations.LoudnessLengthEdgeFadeVisualizer import LoudnessLengthEdgeFadeVisualizer
+from Visualizations.LoudnessLengthWithPitchVisualizer import LoudnessLengthWithPitchVisualizer
+
+VISUALIZERS = {
+    "LoudnessLengthEdgeFadeVisualizer": LoudnessLengthEdgeFadeVisualizer,
+    "LoudnessLengthWithPitchVisualizer": LoudnessLengthWithPitchVisualizer,
+}
+
+
+class AudioInputVisualizer:
+    """Visualizes audio analyzed locally in real time, without the Spotify API or playback polling.
+
+    Audio comes from an audio input device (e.g. a microphone or line in, read with sounddevice) or from a WAV file
+    played back in real time. Each hop of audio is analyzed with an AudioAnalyzer as soon as it arrives, and the newest
+    frame is passed to the visualizer; if rendering falls behind the audio, older frames are skipped so the lights stay
+    in time with the music.
+
+    Args:
+        visualizer (Visualizer): the visualization to drive.
+        sample_rate (int): the sample rate in Hz to record audio input at.
+        device (int or str): the audio input device to record from (None for the default input device).
+
+    Attributes:
+        device (int or str): the audio input device to record from.
+        dropped_frames (int): the number of analyzed frames that were skipped because rendering fell behind.
+        rendered_frames (int): the number of frames passed to the visualizer.
+        sample_rate (int): the sample rate in Hz to record audio input at.
+        should_stop (threading.Event): set to make the visualization loop exit.
+        visualizer (Visualizer): the visualization to drive.
+    """
+
+    def __init__(self, visualizer, sample_rate=44100, device=None):
+        self.device = device
+        self.dropped_frames = 0
+        self.rendered_frames = 0
+        self.sample_rate = sample_rate
+        self.should_stop = threading.Event()
+        self.visualizer = visualizer
+
+    def run_input(self):
+        """Visualize audio from the input device until stop() is called.
+        """
+        # sounddevice needs PortAudio, which is only required when visualizing live audio input
+        import sounddevice
+
+        analyzer = AudioAnalyzer(self.sample_rate, self.visualizer.frame_rate)
+        blocks = queue.Queue(maxsize=64)
+
+        def on_audio(data, num_samples, time_info, status):
+            try:
+                blocks.put_nowait(data[:, 0].copy())
+            except queue.Full:
+                pass
+
+        with sounddevice.InputStream(samplerate=self.sample_rate, channels=1, dtype="float32", device=self.device,
+                                     blocksize=analyzer.hop, callback=on_audio):
+            pos = 0.0
+            while not self.should_stop.is_set():
+                try:
+                    block = blocks.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                pos += len(block) / self.sample_rate
+                self._render(analyzer, block, pos)
+
+    def run_wav(self, path, realtime=True):
+        """Visualize a WAV file, block by block as if it was live audio input.
+
+        Args:
+            path (str): the path to the WAV file.
+            realtime (bool): if True, feed audio at the speed it would play at; otherwise, as fast as possible (useful
+                for testing offline whether analysis and rendering keep up with real time).
+
+        Returns:
+            a dict with the number of analyzed frames, the processing time in seconds and the real time factor (audio
+            duration divided by processing time).
+        """
+        samples, sample_rate = AudioAnalyzer.read_wav(path)
+        analyzer = AudioAnalyzer(sample_rate, self.visualizer.frame_rate)
+        scheduler = FrameScheduler(analyzer.hop / sample_rate)
+        start = time.perf_counter()
+        for offset in range(0, len(samples), analyzer.hop):
+            if self.should_stop.is_set():
+                break
+            if realtime:
+                scheduler.wait_for_next_frame()
+            block = samples[offset:offset + analyzer.hop]
+            self._render(analyzer, block, (offset + len(block)) / sample_rate)
+        total_time = time.perf_counter() - start
+        return {
+            "frames": self.rendered_frames + self.dropped_frames,
+            "total_s": total_time,
+            "realtime_factor": len(samples) / sample_rate / total_time,
+        }
+
+    def stop(self):
+        """Signal the visualization loop to exit.
+        """
+        self.should_stop.set()
+
+    def _render(self, analyzer, block, pos):
+        """Analyze a block of audio and visualize the newest frame it completes.
+
+        Args:
+            analyzer (AudioAnalyzer): the analyzer holding the audio received so far.
+            block (np.ndarray): the new mono samples.
+            pos (float): the time in seconds at the end of the block.
+        """
+        with Metrics().timed("audio_analysis_seconds"):
+            frames = analyzer.push(block)
+        if not len(frames):
+            return
+        start = time.perf_counter()
+        frame = frames[-1]
+        self.visualizer.visualize_sample(frame[0], frame[1:], pos)
+        Metrics().observe("frame_seconds", time.perf_counter() - start)
+        self.dropped_frames += len(frames) - 1
+        self.rendered_frames += 1
+
+
+if __name__ == "__main__":
+    """ Local audio visualizer.
+
+    Visualizes live audio input (or a WAV file) without a Spotify account. With --offline, a WAV file is analyzed and
+    rendered onto a headless strip as fast as possible, and the real time factor is reported (it must stay above 1.0 for
+    the device to keep up with live audio).
+
+    Usage:
+        python3 audio_input_visualizer.py --dev
+        python3 audio_input_visualizer.py --wav track.wav --offline
+    """
+    parser = argparse.ArgumentParser(description="Visualize locally analyzed audio from an input device or WAV file.")
+    parser.add_argument("--wav", help="visualize this WAV file instead of the audio input device")
+    parser.add_argument("--device", help="the audio input device to record from")
+    parser.add_argument("--sample-rate", type=int, default=44100, help="the sample rate to record audio input at")
+    parser.add_argument("--visualizer", choices=sorted(VISUALIZERS), default="LoudnessLengthEdgeFadeVisualizer",
+                        help="the visualizer to drive")
+    parser.add_argument("--pixels", type=int, default=240, help="number of pixels on the strip")
+    parser.add_argument("--dev", action="store_true", help="display the visualization on the virtual strip")
+    parser.add_argument("--offline", action="store_true", help="render a WAV file onto a headless strip as fast as "
+                                                               "possible and report the real time factor")
+    args = parser.parse_args()
+    if args.offline and not args.wav:
+        parser.error("--offline requires --wav")
+
+    if args.offline:
+        from recording_led_strip import RecordingLEDStrip
+        strip = RecordingLEDStrip(args.pixels)
+    elif args.dev:
+        from virtual_led_strip import VirtualLEDStrip
+        strip = VirtualLEDStrip()
+    else:
+        from apa102_strip import APA102Strip
+        from driver import apa102
+        strip = APA102Strip(apa102.APA102(num_led=args.pixels, global_brightness=23, mosi=10, sclk=11, order='rgb'))
+
+    audio_visualizer = AudioInputVisualizer(VISUALIZERS[args.visualizer](strip, args.pixels), args.sample_rate,
+                                            args.device)
+    if args.offline:
+        report = audio_visualizer.run_wav(args.wav, realtime=False)
+        print("Frames: {frames}, total: {total_s:.3f}s ({realtime_factor:.1f}x real time).".format(**report))
+    elif args.dev:
+        target = audio_visualizer.run_wav if args.wav else audio_visualizer.run_input
+        threading.Thread(target=target, args=(args.wav,) if args.wav else (), name="audio_thread", daemon=True).start()
+        strip.start_visualization()
+    elif args.wav:
+        audio_visualizer.run_wav(args.wav)
+    else:
+        audio_visualizer.run_input()
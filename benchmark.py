@@ -0,0 +1,124 @@
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from Analysis.SegmentTable import SegmentTable
+from Analysis.TrackFrames import TrackFrames
+from recording_led_strip import RecordingLEDStrip
+from Visualizations.LoudnessLengthEdgeFadeVisualizer import LoudnessLengthEdgeFadeVisualizer
+from Visualizations.LoudnessLengthWithPitchVisualizer import LoudnessLengthWithPitchVisualizer
+
+__author__ = "Yusuf Sezer"
+
+VISUALIZERS = {
+    "LoudnessLengthEdgeFadeVisualizer": LoudnessLengthEdgeFadeVisualizer,
+    "LoudnessLengthWithPitchVisualizer": LoudnessLengthWithPitchVisualizer,
+}
+
+
+def load_track_frames(analysis_path, frame_rate):
+    """Load a saved audio analysis response and precompute loudness and pitch data for every frame of the track.
+
+    Args:
+        analysis_path (str): the path to a JSON file holding a response of the Spotify audio analysis endpoint.
+        frame_rate (float): the amount of time in seconds between each frame.
+
+    Returns:
+        a TrackFrames object for the whole track.
+    """
+    with open(analysis_path) as f:
+        analysis = json.load(f)
+    segments = analysis["segments"]
+    duration = analysis.get("track", {}).get("duration") or segments[-1]["start"] + segments[-1]["duration"]
+    return TrackFrames.from_table(SegmentTable.from_segments(segments).pad(duration), duration, frame_rate)
+
+
+def run_benchmark(visualizer_class, track_frames, num_pixels=240, measure_allocations=True):
+    """Render every frame of a track through a visualizer onto a headless strip, timing each frame.
+
+    Args:
+        visualizer_class (type): the Visualizer subclass to benchmark.
+        track_frames (TrackFrames): loudness and pitch data for every frame of the track.
+        num_pixels (int): the number of pixels on the (headless) strip.
+        measure_allocations (bool): if True, render the track a second time under tracemalloc to measure allocations.
+
+    Returns:
+        a tuple (frames, report) where frames is a (num_frames, num_pixels, 3) uint8 array of rendered frames and
+        report is a dict of timing (and allocation) statistics.
+    """
+    strip = RecordingLEDStrip(num_pixels, max_frames=len(track_frames))
+    visualizer = visualizer_class(strip, num_pixels, frame_rate=track_frames.frame_rate)
+    render_times = np.empty(len(track_frames))
+    start = time.perf_counter()
+    for i, sample in enumerate(track_frames.frames):
+        frame_start = time.perf_counter()
+        visualizer.visualize_sample(sample[0], sample[1:], i * track_frames.frame_rate)
+        render_times[i] = time.perf_counter() - frame_start
+    total_time = time.perf_counter() - start
+
+    report = {
+        "frames": len(track_frames),
+        "total_s": total_time,
+        "fps": len(track_frames) / total_time,
+        "realtime_factor": len(track_frames) * track_frames.frame_rate / total_time,
+        "mean_ms": 1000 * render_times.mean(),
+        "p50_ms": 1000 * np.percentile(render_times, 50),
+        "p95_ms": 1000 * np.percentile(render_times, 95),
+        "p99_ms": 1000 * np.percentile(render_times, 99),
+        "max_ms": 1000 * render_times.max(),
+    }
+
+    # Allocation tracking slows rendering down, so allocations are measured in a separate pass (which re-records the
+    # same frames into the already allocated storage)
+    if measure_allocations:
+        strip.num_frames = 0
+        peaks = np.empty(len(track_frames))
+        tracemalloc.start()
+        for i, sample in enumerate(track_frames.frames):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            visualizer.visualize_sample(sample[0], sample[1:], i * track_frames.frame_rate)
+            peaks[i] = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+        report["alloc_mean_kib"] = peaks.mean() / 1024
+        report["alloc_max_kib"] = peaks.max() / 1024
+
+    return strip.recorded_frames(), report
+
+
+if __name__ == "__main__":
+    """ Headless benchmark harness for visualizers.
+
+    Renders every frame of a track (from a saved audio analysis JSON) through a visualizer without a Spotify session,
+    GUI or hardware strip, and reports per-frame render time, throughput and allocations.
+
+    Usage:
+        python3 benchmark.py analysis.json
+        python3 benchmark.py analysis.json --visualizer LoudnessLengthWithPitchVisualizer --output frames.npy
+    """
+    parser = argparse.ArgumentParser(description="Benchmark visualizers on a saved Spotify audio analysis.")
+    parser.add_argument("analysis", help="path to a saved audio analysis JSON response")
+    parser.add_argument("--visualizer", choices=sorted(VISUALIZERS), action="append",
+                        help="visualizer(s) to benchmark (defaults to all)")
+    parser.add_argument("--pixels", type=int, default=240, help="number of pixels on the strip")
+    parser.add_argument("--frame-rate", type=float, default=0.03, help="seconds between frames")
+    parser.add_argument("--output", help="save the rendered frames to this .npy file (first visualizer only)")
+    parser.add_argument("--no-alloc", action="store_true", help="skip the allocation measurement pass")
+    args = parser.parse_args()
+
+    track_frames = load_track_frames(args.analysis, args.frame_rate)
+    for index, name in enumerate(args.visualizer or sorted(VISUALIZERS)):
+        frames, report = run_benchmark(VISUALIZERS[name], track_frames, args.pixels, not args.no_alloc)
+        print("--------------------{}--------------------".format(name))
+        print("Frames: {frames}, total: {total_s:.3f}s, throughput: {fps:.1f} FPS ({realtime_factor:.1f}x real time)."
+              .format(**report))
+        print("Render time mean/p50/p95/p99/max: {mean_ms:.3f}/{p50_ms:.3f}/{p95_ms:.3f}/{p99_ms:.3f}/{max_ms:.3f} ms."
+              .format(**report))
+        if "alloc_mean_kib" in report:
+            print("Allocated per frame mean/max: {alloc_mean_kib:.1f}/{alloc_max_kib:.1f} KiB.".format(**report))
+        if args.output and index == 0:
+            np.save(args.output, frames)
+            print("Saved rendered frames to {}.".format(args.output))
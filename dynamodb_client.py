@@ -1,4 +1,4 @@
-import boto3 as AWS
+import threading
 
 from credentials import AWS_ACCESS_KEY, AWS_SECRET_KEY, USER, TABLE_NAME
 
@@ -7,6 +7,8 @@ class _DynamoDBClient():
     """
 
     def __init__(self):
+        # boto3 takes seconds to import on a Pi, so it is only imported once the client is first needed
+        import boto3 as AWS
         self.client = AWS.client(
             'dynamodb',
             region_name='us-east-1',
@@ -20,8 +22,24 @@ class _DynamoDBClient():
             }
         }
 
-    def get_record(self):
-        return self.client.get_item(TableName=self.table_name, Key=self.key)['Item']
+    def get_record(self, attributes=None):
+        """Get the user's settings record.
+
+        Args:
+            attributes (list): the names of the top-level attributes to read
+                (reads the whole record if None). This only shrinks the
+                response; DynamoDB charges read capacity for the size of the
+                whole item whichever attributes are read.
+        """
+        if not attributes:
+            return self.client.get_item(TableName=self.table_name, Key=self.key)['Item']
+        names = {'#a{}'.format(i): attribute for i, attribute in enumerate(attributes)}
+        return self.client.get_item(
+            TableName=self.table_name,
+            Key=self.key,
+            ProjectionExpression=', '.join(names),
+            ExpressionAttributeNames=names
+        )['Item']
 
     def update_restart_flag(self):
         updates = {
@@ -38,11 +56,17 @@ class _DynamoDBClient():
             AttributeUpdates=updates
         )
 
-_dynamoDBClient = _DynamoDBClient()
+_dynamoDBClient = None
+_dynamoDBClientLock = threading.Lock()
 def DynamoDBClient():
     """A method to effectively make DynamoDBClient a singleton class.
 
     We want DynamodDBClient to be a singleton because we can use the same client
-    for all DynamoDB operations.
+    for all DynamoDB operations. The client is created on first use rather than
+    at import time, so importing this module is cheap.
     """
+    global _dynamoDBClient
+    with _dynamoDBClientLock:
+        if _dynamoDBClient is None:
+            _dynamoDBClient = _DynamoDBClient()
     return _dynamoDBClient
@@ -1,24 +1,107 @@
+# Startup times are measured from when the startup timer is first imported, so import it before anything else
+from utils.startup_timer import StartupTimer
+
+import importlib
 import sys
 import threading
 import time
 
+from Animations.AnimatorGroup import AnimatorGroup
 from Animations.LoadingAnimator import LoadingAnimator
-from credentials import AWS_ACCESS_KEY, AWS_SECRET_KEY, USER
-from dynamodb_client import DynamoDBClient
+from segmented_strip import SegmentedStrip
+from settings_manager import DynamoDBSettingsBackend, SettingsEvent, SettingsManager
 from spotify_visualizer import SpotifyVisualizer
+from track_preprocessor import TrackPreprocessor
+from utils.metrics import Metrics
 from Visualizations.LoudnessLengthEdgeFadeVisualizer import LoudnessLengthEdgeFadeVisualizer
+from Visualizations.MultiSegmentVisualizer import MultiSegmentVisualizer
+
+# The physical LED strips: keyword arguments for apa102.APA102 (e.g. a different SPI bus/device for each strip), or a
+# "host" (and optional "port") for a strip on a remote LED node that frames are streamed to over UDP
+STRIPS = [
+    {"num_led": 240, "mosi": 10, "sclk": 11},
+]
+
+# The output segments. Each segment is a contiguous range of pixels on one of the strips above, with its own visualizer
+# and (optionally) its own colors; segments without a primary color follow the base color from the settings. All
+# segments are fed from the same playback clock and track data. In developer mode, the strips are laid out one after
+# another on the virtual strip.
+SEGMENTS = [
+    {"strip": 0, "offset": 0, "num_pixels": 240, "visualizer": LoudnessLengthEdgeFadeVisualizer},
+]
+
+# The local port pipeline metrics are served on in the Prometheus text format (None to disable)
+METRICS_PORT = 9105
+
+
+def _init_strips(dev_mode):
+    """Create the output device for each strip in STRIPS.
+
+    Args:
+        dev_mode (boolean): if True, each strip is a view into the virtual strip instead of a physical strip.
 
-def _init_visualizer(dev_mode, n_pixels, base_color):
+    Returns:
+        a list of output devices (one for each strip).
+    """
     if dev_mode:
         from virtual_led_strip import VirtualLEDStrip
-        visualization_device = VirtualLEDStrip()
-    else:
+        virtual_strip = SegmentedStrip(VirtualLEDStrip(), VirtualLEDStrip().frame_buffer.num_pixels)
+        offsets = [sum(strip["num_led"] for strip in STRIPS[:i]) for i in range(len(STRIPS))]
+        return [virtual_strip.segment(offset, strip["num_led"]) for offset, strip in zip(offsets, STRIPS)]
+
+    devices = []
+    for strip_settings in STRIPS:
+        if "host" in strip_settings:
+            from network_led_strip import DEFAULT_PORT, NetworkLEDStrip
+            port = strip_settings.get("port", DEFAULT_PORT)
+            devices.append(NetworkLEDStrip(strip_settings["host"], port, strip_settings["num_led"]))
+            continue
+
+        from apa102_strip import APA102Strip
         from driver import apa102
-        visualization_device = apa102.APA102(num_led=n_pixels, global_brightness=23, mosi=10, sclk=11, order='rgb')
+        from output_stage import StripOutputStage
+        strip = APA102Strip(apa102.APA102(global_brightness=23, order='rgb', **strip_settings))
+        # Write frames to the strip on a dedicated thread so SPI transfers overlap with rendering the next frame
+        device = StripOutputStage(strip, strip_settings["num_led"])
+        device.start()
+        devices.append(device)
+    return devices
+
+
+def _init_visualizer(dev_mode, base_color):
+    strips = _init_strips(dev_mode)
+    segmented_strips = {}
+    visualizers, loading_animators = [], []
+    for segment in SEGMENTS:
+        strip, n_pixels = strips[segment["strip"]], STRIPS[segment["strip"]]["num_led"]
+        # A segment spanning a whole strip draws straight to the strip; otherwise it draws into its part of the strip
+        visualization_device = strip
+        if segment["offset"] != 0 or segment["num_pixels"] != n_pixels:
+            if segment["strip"] not in segmented_strips:
+                segmented_strips[segment["strip"]] = SegmentedStrip(strip, n_pixels)
+            visualization_device = segmented_strips[segment["strip"]].segment(segment["offset"], segment["num_pixels"])
+
+        visualizer = segment["visualizer"](
+            visualization_device, segment["num_pixels"], segment.get("primary_color", base_color)
+        )
+        if "secondary_color" in segment:
+            visualizer.set_secondary_color(segment["secondary_color"])
+        visualizers.append(visualizer)
+        loading_animators.append(LoadingAnimator(visualization_device, segment["num_pixels"]))
+
+    return (MultiSegmentVisualizer(visualizers), AnimatorGroup(loading_animators))
+
+
+def _play_startup_animation(loading_animator):
+    """Play the loading animation until the visualizer starts drawing. Called asynchronously (startup animation thread).
 
-    visualizer = LoudnessLengthEdgeFadeVisualizer(visualization_device, n_pixels, base_color)
-    loading_animator = LoadingAnimator(visualization_device, n_pixels)
-    return (visualizer, loading_animator)
+    Args:
+        loading_animator (Animator): the loading animation to play.
+    """
+    while not StartupTimer().has("visualization started"):
+        loading_animator.animate()
+        StartupTimer().mark("lights on")
+        time.sleep(loading_animator.frame_rate)
 
 
 def manage(dev_mode):
@@ -33,43 +116,78 @@ def manage(dev_mode):
     pi or a developer's machine.
 
     """
-    dynamoDBClient = DynamoDBClient()
-    base_color = None # We always want to update the lights on first start.
+    # Light up the strip before doing anything slow (importing boto3 and spotipy, fetching settings, authorizing)
+    visualizer, loading_animator = _init_visualizer(dev_mode, None)
+    threading.Thread(
+        target=_play_startup_animation, args=(loading_animator,), name="startup_animation_thread", daemon=True
+    ).start()
+
+    if METRICS_PORT:
+        try:
+            Metrics().start_http_server(METRICS_PORT)
+        except OSError as e:
+            print("Unable to serve metrics on port {}: {}".format(METRICS_PORT, e))
+
+    # Import spotipy in the background while boto3 is imported and the settings are fetched. No module imports spotipy
+    # at module level, so this is where it is first loaded; SpotifyVisualizer.authorize() then finds it already imported
+    threading.Thread(target=importlib.import_module, args=("spotipy",), name="import_thread", daemon=True).start()
+
+    # Track frames are computed in a worker process (shared by every run of the visualizer); start it while waiting
+    preprocessor = TrackPreprocessor()
+    preprocessor.start()
+
+    state = {"base_color": None, "visualizer": visualizer}
+    restart_requested = threading.Event()
+
+    def on_color_changed(base_color):
+        state["base_color"] = base_color
+        for segment_visualizer, segment in zip(state["visualizer"].visualizers, SEGMENTS):
+            if "primary_color" not in segment:
+                segment_visualizer.set_primary_color(base_color)
+
+    def on_git_target_changed(git_target):
+        print("Software version set to branch {} and commit {} (applied on next update).".format(*git_target))
+
+    # Settings changes are dispatched as events by the settings manager (polled on its own thread); cached settings are
+    # applied right away so the visualizer can start before the first settings request completes
+    settings_manager = SettingsManager(DynamoDBSettingsBackend())
+    settings_manager.subscribe(SettingsEvent.COLOR, on_color_changed)
+    settings_manager.subscribe(SettingsEvent.RESTART, lambda _: restart_requested.set())
+    settings_manager.subscribe(SettingsEvent.GIT_TARGET, on_git_target_changed)
+    if settings_manager.load_cached():
+        StartupTimer().mark("cached settings loaded")
+    threading.Thread(target=settings_manager.run, name="settings_thread", daemon=True).start()
+
     visualizer_thread = None
-    n_pixels = 240
-    visualizer = None
     spotify_visualizer = None
-
     while True:
-        record = dynamoDBClient.get_record()
-
-        settings = record['settings']['M']
-        base_color_r = int(settings['baseColorRedValue']['N'])
-        base_color_g = int(settings['baseColorGreenValue']['N'])
-        base_color_b = int(settings['baseColorBlueValue']['N'])
-        new_base_color = (base_color_r, base_color_g, base_color_b)
-        if new_base_color != base_color:
-            if visualizer:
-                visualizer.set_primary_color(new_base_color)
-            base_color = new_base_color
-
-        if bool(record['shouldRestart']['BOOL']):
+        if restart_requested.is_set():
             if spotify_visualizer:
                 spotify_visualizer.terminate_visualizer()
                 while visualizer_thread.is_alive():
                     print("Waiting for visualizer to terminate...")
                     time.sleep(1)
-            dynamoDBClient.update_restart_flag()
+            settings_manager.clear_restart()
+            restart_requested.clear()
 
         # If the animation has not been instantiated or the thread has
         # completed (i.e. we killed it), we need to reinstantiate and restart.
-        if not visualizer_thread or not visualizer_thread.is_alive():
-            visualizer, loading_animator = _init_visualizer(developer_mode, n_pixels, base_color)
-            spotify_visualizer = SpotifyVisualizer(visualizer, loading_animator)
+        # The visualizer can't start until the base color is known.
+        base_color = state["base_color"]
+        if base_color is not None and (not visualizer_thread or not visualizer_thread.is_alive()):
+            StartupTimer().mark("settings loaded")
+            # The visualizer created at startup is used for the first run; after a restart, rebuild it from scratch
+            if visualizer_thread:
+                for device in state["visualizer"].get_visualization_devices():
+                    if hasattr(device, "stop"):
+                        device.stop()
+                state["visualizer"], loading_animator = _init_visualizer(dev_mode, base_color)
+            spotify_visualizer = SpotifyVisualizer(state["visualizer"], loading_animator, preprocessor=preprocessor)
             visualizer_thread = threading.Thread(target=spotify_visualizer.launch_visualizer, name="visualizer_thread")
             visualizer_thread.start()
 
-        time.sleep(5)
+        # Wake up as soon as a restart is requested
+        restart_requested.wait(timeout=1)
 
 if __name__ == "__main__":
     """ The outmost layer of the system.
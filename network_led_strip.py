@@ -0,0 +1,269 @@
+import argparse
+import socket
+import struct
+import time
+
+import numpy as np
+
+from utils.frame_utils import as_frame
+from utils.print_utils import make_error_text
+
+# Packet header: magic, sequence number, send timestamp (seconds since the epoch), index of the first pixel in the
+# packet, number of pixels in the packet, number of pixels in the whole frame. The header is followed by 4 bytes
+# (R, G, B, brightness) for each pixel in the packet.
+PACKET_HEADER = struct.Struct("!4sIdHHH")
+PACKET_MAGIC = b"SLED"
+BYTES_PER_PIXEL = 4
+DEFAULT_PORT = 5568
+# Keep packets within a typical Ethernet MTU (1500 bytes - 20 bytes IPv4 header - 8 bytes UDP header)
+MAX_PIXELS_PER_PACKET = (1472 - PACKET_HEADER.size) // BYTES_PER_PIXEL
+
+
+class NetworkLEDStrip:
+    """An LED strip backend that streams frames over UDP to a remote LED controller.
+
+    This class implements the strip behaviors expected by SpotifyVisualizer (set_pixel, fill, set_frame and show).
+    Pixels are drawn into a local frame, and show() sends the whole frame as one or more compact UDP packets (frames
+    longer than MAX_PIXELS_PER_PACKET pixels are split across packets). Every packet carries the frame's sequence
+    number, so receivers can drop stale or reordered frames (see NetworkLEDReceiver), and the frame's send timestamp,
+    which receivers pass along with each frame (e.g. to measure latency). Packets are preallocated and filled in place,
+    so sending a frame doesn't allocate.
+
+    Args:
+        host (str): the host name or IP address of the remote LED controller.
+        port (int): the UDP port the remote LED controller listens on.
+        num_pixels (int): the number of pixels on the remote strip.
+
+    Attributes:
+        address (tuple): the (host, port) address frames are sent to.
+        brightness (np.ndarray): a (num_pixels,) uint8 array holding the brightness values of the current frame.
+        num_pixels (int): the number of pixels on the remote strip.
+        packets (list): preallocated (packet bytearray, pixel payload view, start index) tuples, one per packet.
+        pixels (np.ndarray): a (num_pixels, 3) uint8 array holding the RGB values of the current frame.
+        sequence (int): the sequence number of the last frame sent.
+        socket (socket.socket): the UDP socket frames are sent from.
+    """
+
+    def __init__(self, host, port=DEFAULT_PORT, num_pixels=240):
+        self.address = (host, port)
+        self.brightness = np.zeros(num_pixels, dtype=np.uint8)
+        self.num_pixels = num_pixels
+        self.packets = []
+        for start in range(0, num_pixels, MAX_PIXELS_PER_PACKET):
+            count = min(MAX_PIXELS_PER_PACKET, num_pixels - start)
+            packet = bytearray(PACKET_HEADER.size + count * BYTES_PER_PIXEL)
+            payload = np.frombuffer(packet, dtype=np.uint8, offset=PACKET_HEADER.size).reshape(count, BYTES_PER_PIXEL)
+            self.packets.append((packet, payload, start))
+        self.pixels = np.zeros((num_pixels, 3), dtype=np.uint8)
+        self.sequence = 0
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def close(self):
+        """Close the socket.
+        """
+        self.socket.close()
+
+    def show(self):
+        """Send the current frame to the remote LED controller.
+        """
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        timestamp = time.time()
+        for packet, payload, start in self.packets:
+            count = len(payload)
+            PACKET_HEADER.pack_into(packet, 0, PACKET_MAGIC, self.sequence, timestamp, start, count, self.num_pixels)
+            payload[:, :3] = self.pixels[start:start + count]
+            payload[:, 3] = self.brightness[start:start + count]
+            try:
+                self.socket.sendto(packet, self.address)
+            except OSError as err:
+                # A dropped frame is better than a stalled visualization (the next frame replaces it anyway)
+                print(make_error_text("Unable to send frame {} to {}: {}".format(self.sequence, self.address, err)))
+
+    def set_pixel(self, i, r, g, b, brightness=100):
+        """Set pixel at index i to the specified RGB value.
+
+        Args:
+            i (int): the index of the pixel to set.
+            r (int): an int in range [0, 255] describing the red value to set.
+            g (int): an int in range [0, 255] describing the green value to set.
+            b (int): an int in range [0, 255] describing the blue value to set.
+            brightness (int): a brightness value in range [0, 100].
+        """
+        if 0 <= i < self.num_pixels:
+            self.pixels[i] = (r, g, b)
+            self.brightness[i] = brightness
+
+    def fill(self, start, end, r, g, b, brightness=100):
+        """Set all pixels between indices start and end (inclusive) to the specified RGB value.
+
+        Args:
+            start (int): the start index of the pixel range to fill (inclusive).
+            end (int): the end index of the pixel range to fill (inclusive).
+            r (int): an int in range [0, 255] describing the red value to set.
+            g (int): an int in range [0, 255] describing the green value to set.
+            b (int): an int in range [0, 255] describing the blue value to set.
+            brightness (int): a brightness value in range [0, 100].
+        """
+        start, end = max(start, 0), min(end + 1, self.num_pixels)
+        if start < end:
+            self.pixels[start:end] = (r, g, b)
+            self.brightness[start:end] = brightness
+
+    def set_frame(self, frame, brightness=100):
+        """Set every pixel of the strip at once from a whole frame.
+
+        Args:
+            frame (np.ndarray or bytes): a (num_pixels, 3) RGB array, a (num_pixels, 4) RGB + brightness array, or a
+                contiguous buffer of RGB triplets.
+            brightness (int or np.ndarray): a brightness value in range [0, 100] for every pixel, or an array of
+                brightness values (one for each pixel).
+        """
+        rgb, brightness = as_frame(frame, brightness)
+        count = min(len(rgb), self.num_pixels)
+        self.pixels[:count] = rgb[:count]
+        self.brightness[:count] = brightness[:count]
+
+
+class NetworkLEDReceiver:
+    """Receives frames streamed by a NetworkLEDStrip.
+
+    Packets are reassembled into whole frames by sequence number. Packets belonging to a frame older than the newest
+    frame seen so far are dropped, and a partially received frame is abandoned as soon as a packet of a newer frame
+    arrives, so a late or reordered frame is never shown after a newer one. Duplicate packets (e.g. a packet delivered
+    twice) are dropped, so a frame is only complete once every one of its pixels has arrived. If no packet is accepted
+    for reset_after seconds (e.g. the sender was restarted and its sequence numbers started over), the next frame is
+    accepted whatever its sequence number.
+
+    Args:
+        num_pixels (int): the number of pixels on the local strip.
+        host (str): the address to listen on.
+        port (int): the UDP port to listen on.
+        reset_after (float): the amount of time in seconds without accepted packets after which sequence numbers reset.
+
+    Attributes:
+        brightness (np.ndarray): a (num_pixels,) uint8 array holding the brightness values of the frame being received.
+        dropped_packets (int): the number of stale or malformed packets dropped.
+        last_received (float): the monotonic time the last packet was accepted.
+        num_pixels (int): the number of pixels on the local strip.
+        pixels (np.ndarray): a (num_pixels, 3) uint8 array holding the RGB values of the frame being received.
+        received_pixels (int): the number of pixels of the frame being received that have arrived.
+        received_starts (set): the indices of the first pixel of every packet of the frame being received that arrived.
+        reset_after (float): the amount of time in seconds without accepted packets after which sequence numbers reset.
+        sequence (int): the sequence number of the frame being received (None before the first packet).
+        socket (socket.socket): the UDP socket frames are received on.
+    """
+
+    def __init__(self, num_pixels, host="0.0.0.0", port=DEFAULT_PORT, reset_after=1.0):
+        self.brightness = np.zeros(num_pixels, dtype=np.uint8)
+        self.dropped_packets = 0
+        self.last_received = 0.0
+        self.num_pixels = num_pixels
+        self.pixels = np.zeros((num_pixels, 3), dtype=np.uint8)
+        self.received_pixels = 0
+        self.received_starts = set()
+        self.reset_after = reset_after
+        self.sequence = None
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+
+    def close(self):
+        """Close the socket.
+        """
+        self.socket.close()
+
+    def receive(self, timeout=None):
+        """Wait for the next complete frame.
+
+        Args:
+            timeout (float): the maximum amount of time in seconds to wait for a packet (waits forever if None).
+
+        Returns:
+            a tuple (sequence, timestamp, pixels, brightness) for the frame, or None if the wait timed out. The pixel
+            arrays are reused for the next frame.
+        """
+        self.socket.settimeout(timeout)
+        packet = bytearray(PACKET_HEADER.size + MAX_PIXELS_PER_PACKET * BYTES_PER_PIXEL)
+        while True:
+            try:
+                size = self.socket.recv_into(packet)
+            except socket.timeout:
+                return None
+            frame = self._accept_packet(memoryview(packet)[:size])
+            if frame:
+                return frame
+
+    def run(self, strip):
+        """Write every received frame to a local strip until interrupted.
+
+        Args:
+            strip (strip obj): the local strip to write frames to (must support set_frame and show).
+        """
+        while True:
+            _, _, pixels, brightness = self.receive()
+            strip.set_frame(pixels, brightness)
+            strip.show()
+
+    def _accept_packet(self, packet):
+        """Copy a packet into the frame being received.
+
+        Args:
+            packet (memoryview): the received packet.
+
+        Returns:
+            a tuple (sequence, timestamp, pixels, brightness) if the packet completed a frame, otherwise None.
+        """
+        if len(packet) < PACKET_HEADER.size:
+            self.dropped_packets += 1
+            return None
+        magic, sequence, timestamp, start, count, total = PACKET_HEADER.unpack_from(packet)
+        if magic != PACKET_MAGIC or len(packet) != PACKET_HEADER.size + count * BYTES_PER_PIXEL:
+            self.dropped_packets += 1
+            return None
+
+        now = time.monotonic()
+        if self.sequence is not None and sequence != self.sequence and now - self.last_received < self.reset_after:
+            # Sequence numbers wrap around, so compare them with serial number arithmetic
+            if not 0 < (sequence - self.sequence) & 0xFFFFFFFF < 2 ** 31:
+                self.dropped_packets += 1
+                return None
+        if sequence != self.sequence:
+            self.sequence = sequence
+            self.received_pixels = 0
+            self.received_starts.clear()
+        elif start in self.received_starts:
+            # Duplicate packet (of the frame being received, or of a frame that was already completed)
+            self.dropped_packets += 1
+            return None
+        self.last_received = now
+        self.received_starts.add(start)
+
+        payload = np.frombuffer(packet, dtype=np.uint8, offset=PACKET_HEADER.size).reshape(count, BYTES_PER_PIXEL)
+        end = min(start + count, self.num_pixels)
+        if start < end:
+            self.pixels[start:end] = payload[:end - start, :3]
+            self.brightness[start:end] = payload[:end - start, 3]
+        self.received_pixels += count
+        if self.received_pixels < total:
+            return None
+        return sequence, timestamp, self.pixels, self.brightness
+
+
+if __name__ == "__main__":
+    """ Remote LED node.
+
+    Receives frames streamed by a NetworkLEDStrip (e.g. from a SpotifyVisualizer running on another host) and writes
+    them to an APA102 strip wired to this device.
+
+    Usage:
+        python3 network_led_strip.py --pixels 240
+    """
+    parser = argparse.ArgumentParser(description="Receive streamed frames and write them to a local APA102 strip.")
+    parser.add_argument("--host", default="0.0.0.0", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="UDP port to listen on")
+    parser.add_argument("--pixels", type=int, default=240, help="number of pixels on the strip")
+    args = parser.parse_args()
+
+    from apa102_strip import APA102Strip
+    from driver import apa102
+    local_strip = APA102Strip(apa102.APA102(num_led=args.pixels, global_brightness=23, mosi=10, sclk=11, order='rgb'))
+    NetworkLEDReceiver(args.pixels, args.host, args.port).run(local_strip)
@@ -0,0 +1,125 @@
+import collections
+import threading
+import time
+
+import numpy as np
+
+from utils.frame_buffer import DoubleFrameBuffer
+from utils.metrics import Metrics
+from utils.print_utils import make_error_text
+
+
+class StripOutputStage:
+    """An output stage that writes finished frames to an LED strip on its own thread.
+
+    Pushing a frame to a hardware strip (e.g. the SPI transfer for an APA102 strip) blocks for the whole transfer. This
+    class implements the strip behaviors expected by SpotifyVisualizer (set_pixel, fill, set_frame and show), but show()
+    only publishes the frame to a single-slot "latest frame wins" buffer and returns immediately. An output thread takes
+    the latest frame and writes it to the wrapped strip, so computing the next frame overlaps with writing the current
+    one. If frames are published faster than they can be written, stale frames are skipped.
+
+    Args:
+        strip (strip obj): the strip to write frames to (must support set_frame and show).
+        num_pixels (int): the number of pixels on the strip.
+        window (int): the number of recent transfers used to compute transfer time statistics.
+
+    Attributes:
+        frame_buffer (DoubleFrameBuffer): the single-slot buffer frames are published to.
+        should_stop (bool): a variable watched by the output thread (the thread exits if set to True).
+        skipped_frames (int): the number of published frames that were superseded before they could be written.
+        strip (strip obj): the strip frames are written to.
+        thread (threading.Thread): the output thread.
+        transfer_times (collections.deque): how long (in seconds) recent frames took to write to the strip.
+        written_frames (int): the number of frames written to the strip.
+    """
+
+    def __init__(self, strip, num_pixels, window=1000):
+        self.frame_buffer = DoubleFrameBuffer(num_pixels)
+        self.should_stop = False
+        self.skipped_frames = 0
+        self.strip = strip
+        self.thread = None
+        self.transfer_times = collections.deque(maxlen=window)
+        self.written_frames = 0
+
+    def start(self):
+        """Start the output thread.
+        """
+        self.should_stop = False
+        self.thread = threading.Thread(target=self._write_frames, name="[OUTPUT] strip_output_thread", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Signal the output thread to exit and wait for it.
+        """
+        self.should_stop = True
+        if self.thread:
+            self.thread.join()
+
+    def show(self):
+        """Publish the frame drawn so far to the output thread. Returns without waiting for the transfer.
+        """
+        self.frame_buffer.publish(time.perf_counter())
+
+    def set_pixel(self, i, r, g, b, brightness=100):
+        """Set pixel at index i of the frame being drawn. See DoubleFrameBuffer.set_pixel.
+        """
+        self.frame_buffer.set_pixel(i, r, g, b, brightness)
+
+    def fill(self, start, end, r, g, b, brightness=100):
+        """Set all pixels between indices start and end (inclusive) of the frame being drawn. See DoubleFrameBuffer.fill.
+        """
+        self.frame_buffer.fill(start, end, r, g, b, brightness)
+
+    def set_frame(self, frame, brightness=100):
+        """Set every pixel of the frame being drawn at once. See DoubleFrameBuffer.set_frame.
+        """
+        self.frame_buffer.set_frame(frame, brightness)
+
+    def report(self):
+        """Summarize output statistics.
+
+        Returns:
+            a dict with the mean/95th percentile/max transfer time in milliseconds and the number of written and
+            skipped frames.
+        """
+        transfer_times = sorted(self.transfer_times)
+        if not transfer_times:
+            mean = p95 = maximum = 0.0
+        else:
+            mean = 1000 * sum(transfer_times) / len(transfer_times)
+            p95 = 1000 * transfer_times[min(len(transfer_times) - 1, int(0.95 * len(transfer_times)))]
+            maximum = 1000 * transfer_times[-1]
+        return {
+            "transfer_mean_ms": mean,
+            "transfer_p95_ms": p95,
+            "transfer_max_ms": maximum,
+            "written_frames": self.written_frames,
+            "skipped_frames": self.skipped_frames,
+        }
+
+    def _write_frames(self):
+        """Write the latest published frame to the strip whenever one is available. Called asynchronously (output
+        thread).
+        """
+        rgb = np.zeros_like(self.frame_buffer.front)
+        brightness = np.zeros_like(self.frame_buffer.front_brightness)
+        sequence = self.frame_buffer.sequence
+        while not self.should_stop:
+            if not self.frame_buffer.wait_for_frame(sequence, timeout=0.5):
+                continue
+            new_sequence = self.frame_buffer.read(rgb, brightness)
+            self.skipped_frames += new_sequence - sequence - 1
+            sequence = new_sequence
+
+            # A failed write (e.g. an SPI error) only loses this frame; the output thread keeps writing later frames
+            start = time.perf_counter()
+            try:
+                self.strip.set_frame(rgb, brightness)
+                self.strip.show()
+            except Exception as e:
+                print(make_error_text("Error occurred while writing a frame to the strip: {}".format(e)))
+                continue
+            self.transfer_times.append(time.perf_counter() - start)
+            Metrics().observe("strip_transfer_seconds", self.transfer_times[-1])
+            self.written_frames += 1
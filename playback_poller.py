@@ -0,0 +1,91 @@
+import time
+
+from utils.print_utils import make_error_text
+
+
+class PlaybackPoller:
+    """Polls the user's Spotify playback state and fans each response out to subscribers.
+
+    A single thread makes one current_playback() request per tick, so playback position, track and play/pause state
+    are all observed through one request instead of one request per consumer. When the Spotify API responds with a
+    rate limit (HTTP 429), the poll interval backs off (honoring the Retry-After header if present) and then eases
+    back towards the base interval once requests succeed again.
+
+    Args:
+        sp (Spotify): the Spotify object used to poll the Spotify API.
+        interval (float): the base amount of time in seconds between polls.
+        max_interval (float): the maximum amount of time in seconds between polls when backing off.
+
+    Attributes:
+        base_interval (float): the amount of time in seconds between polls when not rate limited.
+        interval (float): the current amount of time in seconds between polls.
+        max_interval (float): the maximum amount of time in seconds between polls when backing off.
+        should_stop (bool): a variable watched by the polling loop (the loop exits if set to True).
+        sp (Spotify): the Spotify object used to poll the Spotify API.
+        subscribers (list): callbacks invoked with every playback state response.
+    """
+
+    def __init__(self, sp, interval=0.2, max_interval=5.0):
+        self.base_interval = interval
+        self.interval = interval
+        self.max_interval = max_interval
+        self.should_stop = False
+        self.sp = sp
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        """Register a callback to be invoked with every playback state response.
+
+        Args:
+            callback (function): a function taking the playback state dict returned by current_playback() (which may
+                be None if nothing is playing) and the monotonic times the request was sent and the response received.
+        """
+        self.subscribers.append(callback)
+
+    def stop(self):
+        """Signal the polling loop to exit.
+        """
+        self.should_stop = True
+
+    def run(self):
+        """Poll the playback state until stop() is called. Called asynchronously (worker thread).
+        """
+        while not self.should_stop:
+            start = time.perf_counter()
+            try:
+                sent_at = time.monotonic()
+                state = self.sp.current_playback()
+                received_at = time.monotonic()
+            except Exception as e:
+                # Rate limit errors (spotipy's SpotifyException with HTTP status 429) are matched by attribute, so that
+                # importing this module doesn't import spotipy
+                if getattr(e, "http_status", None) == 429:
+                    self._back_off(e)
+                else:
+                    print(make_error_text("Error occurred while polling playback state: {}".format(e)))
+            else:
+                self.interval = max(self.base_interval, self.interval * 0.9)
+                for callback in self.subscribers:
+                    try:
+                        callback(state, sent_at, received_at)
+                    except Exception as e:
+                        text = "Error occurred in playback state subscriber: {}".format(e)
+                        print(make_error_text(text))
+
+            diff = self.interval - (time.perf_counter() - start)
+            time.sleep(diff if diff > 0 else 0)
+
+    def _back_off(self, err):
+        """Increase the poll interval after being rate limited by the Spotify API.
+
+        Args:
+            err (SpotifyException): the rate limit error raised by the Spotify API.
+        """
+        headers = getattr(err, "headers", None) or {}
+        try:
+            retry_after = float(headers.get("Retry-After", 0))
+        except (TypeError, ValueError):
+            retry_after = 0
+        self.interval = min(self.max_interval, max(self.interval * 2, retry_after))
+        text = "Rate limited by the Spotify API...polling every {:.2f} seconds.".format(self.interval)
+        print(make_error_text(text))
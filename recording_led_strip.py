@@ -0,0 +1,92 @@
+import numpy as np
+
+from utils.frame_utils import as_frame
+
+
+class RecordingLEDStrip:
+    """A headless LED strip that records every frame pushed to it instead of displaying it.
+
+    This class is intended for benchmarking and testing visualizers without a GUI or hardware strip. It implements the
+    same strip behaviors expected by SpotifyVisualizer (set_pixel, fill, set_frame and show). Like the APA102 driver,
+    writes to pixels outside of the strip are ignored.
+
+    Args:
+        num_pixels (int): the number of pixels on the strip.
+        max_frames (int): the number of frames to preallocate storage for (more frames are added as needed).
+
+    Attributes:
+        brightness (np.ndarray): a (num_pixels,) uint8 array holding the brightness values of the current frame.
+        frames (np.ndarray): a (capacity, num_pixels, 3) uint8 array of recorded frames.
+        num_frames (int): the number of frames recorded so far.
+        num_pixels (int): the number of pixels on the strip.
+        pixels (np.ndarray): a (num_pixels, 3) uint8 array holding the RGB values of the current frame.
+    """
+
+    def __init__(self, num_pixels, max_frames=0):
+        self.brightness = np.zeros(num_pixels, dtype=np.uint8)
+        self.frames = np.zeros((max_frames, num_pixels, 3), dtype=np.uint8)
+        self.num_frames = 0
+        self.num_pixels = num_pixels
+        self.pixels = np.zeros((num_pixels, 3), dtype=np.uint8)
+
+    def recorded_frames(self):
+        """Get all frames recorded so far.
+
+        Returns:
+            a (num_frames, num_pixels, 3) uint8 array of recorded frames.
+        """
+        return self.frames[:self.num_frames]
+
+    def show(self):
+        """Record the current frame.
+        """
+        if self.num_frames == len(self.frames):
+            grown = np.zeros((max(1, 2 * len(self.frames)), self.num_pixels, 3), dtype=np.uint8)
+            grown[:self.num_frames] = self.frames
+            self.frames = grown
+        self.frames[self.num_frames] = self.pixels
+        self.num_frames += 1
+
+    def set_pixel(self, i, r, g, b, brightness=100):
+        """Set pixel at index i to the specified RGB value.
+
+        Args:
+            i (int): the index of the pixel to set.
+            r (int): an int in range [0, 255] describing the red value to set.
+            g (int): an int in range [0, 255] describing the green value to set.
+            b (int): an int in range [0, 255] describing the blue value to set.
+            brightness (int): a brightness value in range [0, 100].
+        """
+        if 0 <= i < self.num_pixels:
+            self.pixels[i] = (r, g, b)
+            self.brightness[i] = brightness
+
+    def fill(self, start, end, r, g, b, brightness=100):
+        """Set all pixels between indices start and end (inclusive) to the specified RGB value.
+
+        Args:
+            start (int): the start index of the pixel range to fill (inclusive).
+            end (int): the end index of the pixel range to fill (inclusive).
+            r (int): an int in range [0, 255] describing the red value to set.
+            g (int): an int in range [0, 255] describing the green value to set.
+            b (int): an int in range [0, 255] describing the blue value to set.
+            brightness (int): a brightness value in range [0, 100].
+        """
+        start, end = max(start, 0), min(end + 1, self.num_pixels)
+        if start < end:
+            self.pixels[start:end] = (r, g, b)
+            self.brightness[start:end] = brightness
+
+    def set_frame(self, frame, brightness=100):
+        """Set every pixel of the strip at once from a whole frame.
+
+        Args:
+            frame (np.ndarray or bytes): a (num_pixels, 3) RGB array, a (num_pixels, 4) RGB + brightness array, or a
+                contiguous buffer of RGB triplets.
+            brightness (int or np.ndarray): a brightness value in range [0, 100] for every pixel, or an array of
+                brightness values (one for each pixel).
+        """
+        rgb, brightness = as_frame(frame, brightness)
+        count = min(len(rgb), self.num_pixels)
+        self.pixels[:count] = rgb[:count]
+        self.brightness[:count] = brightness[:count]
@@ -0,0 +1,153 @@
+import numpy as np
+
+from utils.frame_utils import as_frame
+
+
+class SegmentedStrip:
+    """Splits one physical (or virtual) LED strip into several independently visualized segments.
+
+    The segmented strip owns one whole frame for the strip. Each segment (see segment()) is a strip-like view whose
+    pixels are slices of that frame, so visualizers draw straight into their part of the shared frame without copies.
+    Segments cover disjoint pixel ranges, which means they can be drawn concurrently from different threads. Once every
+    segment has been drawn, show() pushes the whole frame to the strip in one bulk call, so a frame is never shown with
+    only some of its segments updated.
+
+    Args:
+        strip (strip obj): the strip to push composed frames to (must support set_frame and show).
+        num_pixels (int): the number of pixels on the strip.
+
+    Attributes:
+        brightness (np.ndarray): a (num_pixels,) uint8 array holding the brightness values of the composed frame.
+        num_pixels (int): the number of pixels on the strip.
+        pixels (np.ndarray): a (num_pixels, 3) uint8 array holding the RGB values of the composed frame.
+        strip (strip obj): the strip composed frames are pushed to.
+    """
+
+    def __init__(self, strip, num_pixels):
+        self.brightness = np.zeros(num_pixels, dtype=np.uint8)
+        self.num_pixels = num_pixels
+        self.pixels = np.zeros((num_pixels, 3), dtype=np.uint8)
+        self.strip = strip
+
+    def segment(self, offset, num_pixels):
+        """Create a view of a contiguous range of pixels on the strip.
+
+        Args:
+            offset (int): the index of the first pixel of the segment.
+            num_pixels (int): the number of pixels in the segment.
+
+        Returns:
+            a StripSegment that draws into pixels [offset, offset + num_pixels) of the composed frame.
+        """
+        if offset < 0 or offset + num_pixels > self.num_pixels:
+            raise ValueError("Segment [{}, {}) does not fit on a strip of {} pixels."
+                             .format(offset, offset + num_pixels, self.num_pixels))
+        return StripSegment(self, offset, num_pixels)
+
+    def show(self):
+        """Push the composed frame (all segments) to the strip.
+        """
+        self.strip.set_frame(self.pixels, self.brightness)
+        self.strip.show()
+
+    @staticmethod
+    def show_all(devices):
+        """Push the composed frame of every segmented strip backing the passed devices, once per strip.
+
+        Devices that aren't segments push their own frames when they are shown, so they are skipped. A segmented strip
+        may itself be a segment of another segmented strip, in which case its frame is composed into the outer strip,
+        and the outer strip is pushed once all of its segments are composed.
+
+        Args:
+            devices (list): the devices (strips or StripSegments) that were just drawn into.
+        """
+        while devices:
+            parents = []
+            for device in devices:
+                if isinstance(device, StripSegment) and all(device.parent is not parent for parent in parents):
+                    parents.append(device.parent)
+            devices = []
+            for parent in parents:
+                parent.strip.set_frame(parent.pixels, parent.brightness)
+                if isinstance(parent.strip, StripSegment):
+                    devices.append(parent.strip)
+                else:
+                    parent.strip.show()
+
+
+class StripSegment:
+    """A strip-like view of a contiguous range of pixels on a SegmentedStrip.
+
+    This class implements the strip behaviors expected by Visualizer and Animator objects (set_pixel, fill, set_frame
+    and show), with pixel indices relative to the start of the segment. Writes to pixels outside of the segment are
+    ignored, so a segment never draws over its neighbours. Showing a segment does nothing: the owner of the segments
+    pushes the whole strip once all segments are drawn (see SegmentedStrip.show_all).
+
+    Args:
+        parent (SegmentedStrip): the segmented strip the segment belongs to.
+        offset (int): the index of the first pixel of the segment on the parent strip.
+        num_pixels (int): the number of pixels in the segment.
+
+    Attributes:
+        brightness (np.ndarray): a (num_pixels,) view of the parent's brightness values for this segment.
+        num_pixels (int): the number of pixels in the segment.
+        offset (int): the index of the first pixel of the segment on the parent strip.
+        parent (SegmentedStrip): the segmented strip the segment belongs to.
+        pixels (np.ndarray): a (num_pixels, 3) view of the parent's RGB values for this segment.
+    """
+
+    def __init__(self, parent, offset, num_pixels):
+        self.brightness = parent.brightness[offset:offset + num_pixels]
+        self.num_pixels = num_pixels
+        self.offset = offset
+        self.parent = parent
+        self.pixels = parent.pixels[offset:offset + num_pixels]
+
+    def show(self):
+        """Do nothing; the parent strip is pushed once every segment has been drawn.
+        """
+
+    def set_pixel(self, i, r, g, b, brightness=100):
+        """Set pixel at index i (relative to the start of the segment) to the specified RGB value.
+
+        Args:
+            i (int): the index of the pixel to set.
+            r (int): an int in range [0, 255] describing the red value to set.
+            g (int): an int in range [0, 255] describing the green value to set.
+            b (int): an int in range [0, 255] describing the blue value to set.
+            brightness (int): a brightness value in range [0, 100].
+        """
+        if 0 <= i < self.num_pixels:
+            self.pixels[i] = (r, g, b)
+            self.brightness[i] = brightness
+
+    def fill(self, start, end, r, g, b, brightness=100):
+        """Set all pixels between indices start and end (inclusive, relative to the start of the segment) to the
+        specified RGB value.
+
+        Args:
+            start (int): the start index of the pixel range to fill (inclusive).
+            end (int): the end index of the pixel range to fill (inclusive).
+            r (int): an int in range [0, 255] describing the red value to set.
+            g (int): an int in range [0, 255] describing the green value to set.
+            b (int): an int in range [0, 255] describing the blue value to set.
+            brightness (int): a brightness value in range [0, 100].
+        """
+        start, end = max(start, 0), min(end + 1, self.num_pixels)
+        if start < end:
+            self.pixels[start:end] = (r, g, b)
+            self.brightness[start:end] = brightness
+
+    def set_frame(self, frame, brightness=100):
+        """Set every pixel of the segment at once from a whole frame.
+
+        Args:
+            frame (np.ndarray or bytes): a (num_pixels, 3) RGB array, a (num_pixels, 4) RGB + brightness array, or a
+                contiguous buffer of RGB triplets.
+            brightness (int or np.ndarray): a brightness value in range [0, 100] for every pixel, or an array of
+                brightness values (one for each pixel).
+        """
+        rgb, brightness = as_frame(frame, brightness)
+        count = min(len(rgb), self.num_pixels)
+        self.pixels[:count] = rgb[:count]
+        self.brightness[:count] = brightness[:count]
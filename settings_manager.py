@@ -0,0 +1,286 @@
+import copy
+import json
+import math
+import os
+import threading
+import time
+from enum import Enum
+
+from utils.print_utils import make_error_text
+
+
+class SettingsEvent(Enum):
+    """The types of settings changes dispatched to subscribers (and the value passed with each).
+    """
+    COLOR = 0  # the base color changed: an (r, g, b) tuple
+    RESTART = 1  # a restart was requested: True
+    GIT_TARGET = 2  # the target software version changed: a (git branch, git commit ID) tuple
+
+
+class DynamoDBSettingsBackend:
+    """Reads the user's settings record from DynamoDB.
+
+    Only the attributes the settings manager uses are read, so responses stay small (each read still consumes read
+    capacity for the whole item).
+    """
+
+    ATTRIBUTES = ["settings", "shouldRestart"]
+
+    def fetch(self):
+        """Fetch the settings record.
+
+        Returns:
+            the settings record (in DynamoDB's attribute value format).
+        """
+        from dynamodb_client import DynamoDBClient
+        return DynamoDBClient().get_record(DynamoDBSettingsBackend.ATTRIBUTES)
+
+    def clear_restart(self):
+        """Clear the restart flag of the settings record.
+        """
+        from dynamodb_client import DynamoDBClient
+        DynamoDBClient().update_restart_flag()
+
+
+class FileSettingsBackend:
+    """Reads the user's settings record from a local JSON file (in DynamoDB's attribute value format).
+
+    Useful for running without AWS credentials and in tests. The file is only read again after it was modified.
+
+    Args:
+        path (str): the path to the JSON file holding the settings record.
+
+    Attributes:
+        modified_at (float): the modification time of the file when it was last read.
+        path (str): the path to the JSON file holding the settings record.
+    """
+
+    def __init__(self, path):
+        self.modified_at = None
+        self.path = path
+
+    def fetch(self):
+        """Fetch the settings record if the file was modified since it was last read.
+
+        Returns:
+            the settings record, or None if the file wasn't modified.
+        """
+        modified_at = os.stat(self.path).st_mtime
+        if modified_at == self.modified_at:
+            return None
+        with open(self.path) as f:
+            record = json.load(f)
+        self.modified_at = modified_at
+        return record
+
+    def clear_restart(self):
+        """Clear the restart flag of the settings record.
+        """
+        with open(self.path) as f:
+            record = json.load(f)
+        record["shouldRestart"] = {"BOOL": False}
+        with open(self.path, "w") as f:
+            json.dump(record, f)
+
+
+class SettingsManager:
+    """Keeps the user's settings up to date and dispatches typed change events to subscribers.
+
+    The last settings record is cached locally, so settings are available immediately on startup (before any network
+    request). The backend is then polled on a worker thread. A poll that returns an unchanged record backs the poll
+    interval off towards max_interval, and a change resets it to the base interval. The base interval matches the fixed
+    5 second poll this replaces, so no device ever polls more often than before, while an idle device (one whose
+    settings haven't changed for a few polls) makes a third as many requests. The cost is latency: max_interval bounds
+    how long a color change or restart request takes to reach an idle device (15 seconds by default), and changes made
+    right after another change arrive within the base interval. Only settings that actually changed are dispatched.
+
+    Args:
+        backend (obj): the settings source (DynamoDBSettingsBackend, FileSettingsBackend or any object with fetch and
+            clear_restart methods).
+        cache_path (str): the path of the local settings cache (None to disable the cache).
+        interval (float): the base amount of time in seconds between polls.
+        max_interval (float): the maximum amount of time in seconds between polls when backing off.
+        back_off (float): the factor the poll interval grows by after each poll without changes.
+        restart_settle (float): the amount of time in seconds after the restart flag is cleared during which fetched
+            restart flags are ignored (reads may still return the flag that was just cleared).
+
+    Attributes:
+        back_off (float): the factor the poll interval grows by after each poll without changes.
+        backend (obj): the settings source.
+        base_interval (float): the amount of time in seconds between polls after a change.
+        cache_path (str): the path of the local settings cache.
+        interval (float): the current amount of time in seconds between polls.
+        lock (threading.Lock): a lock for accessing/modifying record and values.
+        max_interval (float): the maximum amount of time in seconds between polls when backing off.
+        record (dict): the last settings record.
+        restart_cleared_at (float): the monotonic time the restart flag was last cleared (-inf if it never was).
+        restart_settle (float): the amount of time in seconds after the restart flag is cleared during which fetched
+            restart flags are ignored.
+        should_stop (threading.Event): set to make the polling loop exit.
+        subscribers (dict): callbacks for each SettingsEvent.
+        values (dict): the last dispatched value for each SettingsEvent.
+    """
+
+    def __init__(self, backend, cache_path=os.path.join(os.path.expanduser("~"), ".cache", "spotify_leds",
+                                                        "settings.json"),
+                 interval=5.0, max_interval=15.0, back_off=1.5, restart_settle=2.0):
+        self.back_off = back_off
+        self.backend = backend
+        self.base_interval = interval
+        self.cache_path = cache_path
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.max_interval = max_interval
+        self.record = None
+        self.restart_cleared_at = -math.inf
+        self.restart_settle = restart_settle
+        self.should_stop = threading.Event()
+        self.subscribers = {event: [] for event in SettingsEvent}
+        self.values = {}
+
+    def subscribe(self, event, callback):
+        """Register a callback to be invoked whenever a setting changes.
+
+        Args:
+            event (SettingsEvent): the type of change to subscribe to.
+            callback (function): a function taking the new value (see SettingsEvent).
+        """
+        self.subscribers[event].append(callback)
+
+    def load_cached(self):
+        """Dispatch the settings from the local cache (restart requests are never dispatched from the cache).
+
+        Returns:
+            True if cached settings were found, otherwise False.
+        """
+        if not self.cache_path:
+            return False
+        try:
+            with open(self.cache_path) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self._apply(record, from_cache=True)
+        return True
+
+    def poll(self):
+        """Fetch the settings record once and dispatch any changes.
+
+        Returns:
+            True if any setting changed, otherwise False.
+        """
+        sent_at = time.monotonic()
+        try:
+            record = self.backend.fetch()
+        except Exception as e:
+            print(make_error_text("Error occurred while fetching settings: {}".format(e)))
+            self.interval = min(self.max_interval, self.interval * 2)
+            return False
+
+        changed = record is not None and record != self.record and self._apply(record, sent_at=sent_at)
+        if changed:
+            self.interval = self.base_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.back_off)
+        return changed
+
+    def clear_restart(self):
+        """Clear the restart flag (after a restart was performed), so the restart isn't dispatched again.
+
+        A poll that was already in flight (or an eventually consistent read right after the flag was cleared) may still
+        return the restart flag that was just cleared; restart flags fetched before the clear completed, or less than
+        restart_settle seconds after, are ignored so they don't trigger a second restart.
+        """
+        self.backend.clear_restart()
+        with self.lock:
+            if self.record is not None:
+                self.record["shouldRestart"] = {"BOOL": False}
+            self.restart_cleared_at = time.monotonic()
+            self.values[SettingsEvent.RESTART] = False
+        self._save_cache()
+
+    def stop(self):
+        """Signal the polling loop to exit.
+        """
+        self.should_stop.set()
+
+    def run(self):
+        """Poll the settings until stop() is called. Called asynchronously (worker thread).
+        """
+        while not self.should_stop.is_set():
+            self.poll()
+            self.should_stop.wait(self.interval)
+
+    @staticmethod
+    def parse_settings(record):
+        """Extract the values of each settings event from a settings record.
+
+        Args:
+            record (dict): the settings record (in DynamoDB's attribute value format).
+
+        Returns:
+            a dict mapping each SettingsEvent present in the record to its value.
+        """
+        settings = record["settings"]["M"]
+        values = {
+            SettingsEvent.COLOR: (
+                int(settings["baseColorRedValue"]["N"]),
+                int(settings["baseColorGreenValue"]["N"]),
+                int(settings["baseColorBlueValue"]["N"])
+            ),
+            SettingsEvent.RESTART: bool(record.get("shouldRestart", {}).get("BOOL", False)),
+        }
+        if "gitBranch" in settings and "gitCommitID" in settings:
+            values[SettingsEvent.GIT_TARGET] = (settings["gitBranch"]["S"], settings["gitCommitID"]["S"])
+        return values
+
+    def _apply(self, record, from_cache=False, sent_at=None):
+        """Store a new settings record and dispatch the settings that changed.
+
+        Args:
+            record (dict): the new settings record.
+            from_cache (bool): if True, the record was read from the local cache (restarts aren't dispatched).
+            sent_at (float): the monotonic time the record was requested at (restarts aren't dispatched if this was
+                before the restart flag was last cleared, see clear_restart).
+
+        Returns:
+            True if any setting changed, otherwise False.
+        """
+        values = SettingsManager.parse_settings(record)
+        with self.lock:
+            stale_restart = sent_at is not None and sent_at < self.restart_cleared_at + self.restart_settle
+            if from_cache or stale_restart:
+                values[SettingsEvent.RESTART] = False
+            changes = [(event, value) for event, value in values.items() if self.values.get(event) != value]
+            self.record = copy.deepcopy(record)
+            if stale_restart and "shouldRestart" in self.record:
+                # Store the ignored flag as cleared, so a restart requested again later still counts as a change
+                self.record["shouldRestart"] = {"BOOL": False}
+            self.values.update(values)
+        if not from_cache:
+            self._save_cache()
+
+        for event, value in changes:
+            if event == SettingsEvent.RESTART and not value:
+                continue
+            for callback in self.subscribers[event]:
+                try:
+                    callback(value)
+                except Exception as e:
+                    text = "Error occurred in settings subscriber: {}".format(e)
+                    print(make_error_text(text))
+        return bool(changes)
+
+    def _save_cache(self):
+        """Write the last settings record to the local cache.
+        """
+        if not self.cache_path or self.record is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            temp_path = self.cache_path + ".tmp"
+            with self.lock, open(temp_path, "w") as f:
+                json.dump(self.record, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            print(make_error_text("Error occurred while caching settings: {}".format(e)))
@@ -1,16 +1,22 @@
-import boto3 as AWS
-from credentials import USERNAME, SPOTIPY_CLIENT_ID, SPOTIPY_CLIENT_SECRET, SPOTIPY_REDIRECT_URI, AWS_ACCESS_KEY,\
-    AWS_SECRET_KEY
-from dynamodb_client import DynamoDBClient
-import numpy as np
-from scipy.interpolate import interp1d
-import spotipy
-import spotipy.util as util
+from Analysis.AnalysisCache import AnalysisCache
+from Analysis.ChunkBuffer import ChunkBuffer
+from Analysis.LoudnessEnvelope import LoudnessEnvelope
+from Analysis.RhythmIndex import RhythmIndex
+from Analysis.SegmentInterpolator import SegmentInterpolator
+from Analysis.SegmentTable import SegmentTable
+from Analysis.SpotifyAnalysisSource import SpotifyAnalysisSource
+from Analysis.TrackFrames import TrackFrames
+from credentials import USERNAME, SPOTIPY_CLIENT_ID, SPOTIPY_CLIENT_SECRET, SPOTIPY_REDIRECT_URI
+from playback_poller import PlaybackPoller
 import sys
 import threading
 import time
-from Visualizations.LoudnessLengthEdgeFadeVisualizer import LoudnessLengthEdgeFadeVisualizer
-from Visualizations.LoudnessLengthWithPitchVisualizer import LoudnessLengthWithPitchVisualizer
+from track_prefetcher import TrackPrefetcher
+from track_preprocessor import TrackPreprocessor
+from utils.frame_scheduler import FrameScheduler
+from utils.metrics import Metrics
+from utils.playback_clock import PlaybackClock
+from utils.startup_timer import StartupTimer
 
 __author__ = "Yusuf Sezer"
 
@@ -22,9 +28,8 @@ class SpotifyVisualizer:
     This code was developed and tested on a 240-pixel (4 meter) Adafruit Dotstar LED strip, a Raspberry Pi 3 Model B
     and my personal Spotify account. After initializing an instance of this class, simply call visualize() to begin
     visualization (alternatively, simply run this module). Visualization will continue until the program is interrupted
-    or terminated. There are 4 threads: one for visualization, one for periodically syncing the playback position with
-    the Spotify API, one for loading chunks of track data, and one to periodically check if the user's current track has
-    changed.
+    or terminated. There are 3 threads: one for visualization, one for loading chunks of track data, and one that polls
+    the user's playback state to sync the playback position, detect pauses and detect track changes.
 
     Currently, loudness and pitch data are used to generate and display visualizations on the LED strip. Loudness is
     used to determine how many pixels to light (growing from the center of the strip towards the ends). At any given
@@ -46,64 +51,107 @@ class SpotifyVisualizer:
         visualizer (Visualizer): The visualizer object that determines how the lights will be animated. It
             also holds information about the device being run on.
         loading_anim_visualizer (Animation): The animation object that displays a loading animation.
+        frame_rate (float): the amount of time in seconds between each frame of the visualization (defaults to the
+            frame rate of the visualizer).
+        precompute_frames (bool): if True, loudness and pitch data are evaluated once for every frame of the track
+            instead of evaluating interpolated functions in the visualization thread.
+        analysis_cache (AnalysisCache): the on-disk cache checked before fetching audio analysis from the Spotify API
+            (defaults to an AnalysisCache in the user's cache directory).
+        analysis_source (AnalysisSource): where track analysis comes from (defaults to the Spotify audio analysis API).
+        preprocessor (TrackPreprocessor): computes whole-track frames off the render thread's process (defaults to a
+            TrackPreprocessor with one worker process).
 
     Attributes:
-            buffer_lock (threading.Lock): a lock for accessing/modifying the interpolated function buffers.
-            data_segments (list): data segments to be parsed and analyzed (fetched from Spotify API).
-            interpolated_loudness_buffer (list): producer-consumer buffer holding interpolated loudness functions.
-            interpolated_pitch_buffer (list): producer-consumer buffer holding lists of interpolated pitch functions.
+            analysis_cache (AnalysisCache): an on-disk cache of parsed segments and precomputed frames per track.
+            analysis_source (AnalysisSource): the source of track analysis (loudness, pitch and rhythm data).
+            chunk_buffer (ChunkBuffer): producer-consumer ring buffer holding loudness and pitch interpolators.
+            clock (PlaybackClock): the drift-correcting clock that models the playback position of the track.
+            frame_rate (float): the amount of time in seconds between each frame of the visualization.
+            frame_scheduler (FrameScheduler): schedules frames of the visualization and tracks late/dropped frames.
             loading_animator (Animator): a loading bar animator that replaces the visualizer when track is paused or loading.
+            loudness_envelope (LoudnessEnvelope): loudness values for every frame of the track (chunk mode).
+            next_track (dict): the playback state of the track that replaced the current track (set on track change).
             permission_scopes (str): a space-separated string of the required permission scopes over the user's account.
-            playback_pos (float): the current playback position (offset into track in seconds) of the visualization.
+            playback_pos (float): the playback position (offset into track in seconds) of the latest visualized frame.
+            precompute_frames (bool): whether whole-track frames are precomputed instead of chunked interpolation.
+            precompute_track (bool): whether whole-track frames are precomputed for the current track (False if
+                precomputing failed and the track falls back to chunked interpolation; reset for every track).
+            prefetcher (TrackPrefetcher): fetches and precomputes analysis for upcoming tracks (precompute mode).
+            preprocessor (TrackPreprocessor): computes whole-track frames in a worker process (precompute mode).
+            rhythm_index (RhythmIndex): the beats, bars, tatums and sections of the track (shared with the visualizer).
+            segment_cursor (int): the index of the first segment in segment_table that hasn't been prepared yet.
+            segment_table (SegmentTable): the track's data segments (fetched from Spotify API), padded to cover the track.
             pos_lock (threading.Lock): a lock for accessing/modifying playback_pos.
             should_terminate (bool): a variable watched by all child threads (child threads exit if set to True).
+            poller (PlaybackPoller): the poller fanning playback state out to the visualizer (one per track).
             sp_gen (Spotify): Spotify object to handle main thread's interaction with the Spotify API.
             sp_load (Spotify): Spotify object to handle data loading thread's interaction with the Spotify API.
-            sp_skip (Spotify): Spotify object to handle skip detection thread's interaction with the Spotify API.
-            sp_sync (Spotify): Spotify object to handle synchronization thread's interaction with the Spotify API.
+            sp_poll (Spotify): Spotify object to handle the playback state polling thread's interaction with the API.
             sp_vis (Spotify): Spotify object to handle visualization thread's interaction with the Spotify API.
             start_color (tuple): a 3-tuple of ints for the RGB value representing the start color of the pitch gradient.
             track (dict): contains information about the track that is being visualized.
+            track_frames (TrackFrames): loudness and pitch values for every frame of the track (precompute mode).
             track_duration (float): the duration in seconds of the track that is being visualized.
             visualizer (Visualizer): the visualization that holds the logic for the animation to be used.
     """
 
-    def __init__(self, visualizer, loading_animator):
-        self.buffer_lock = threading.Lock()
-        self.data_segments = []
-        self.interpolated_loudness_buffer = []
-        self.interpolated_pitch_buffer = []
+    def __init__(self, visualizer, loading_animator, frame_rate=None, precompute_frames=True, analysis_cache=None,
+                 analysis_source=None, preprocessor=None):
+        self.analysis_cache = analysis_cache if analysis_cache is not None else AnalysisCache()
+        self.analysis_source = analysis_source
+        self.chunk_buffer = ChunkBuffer()
+        self.clock = PlaybackClock()
+        self.frame_rate = frame_rate or visualizer.frame_rate
+        self.frame_scheduler = FrameScheduler(self.frame_rate)
         self.is_playing = True
         self.loading_animator = loading_animator
+        self.loudness_envelope = None
+        self.next_track = None
         self.permission_scopes = "user-modify-playback-state user-read-currently-playing user-read-playback-state"
         self.playback_pos = 0
         self.pos_lock = threading.Lock()
+        self.precompute_frames = precompute_frames
+        self.precompute_track = precompute_frames
+        self.prefetcher = None
+        self.preprocessor = preprocessor if preprocessor is not None else TrackPreprocessor()
+        self.rhythm_index = None
+        self.segment_cursor = 0
+        self.segment_table = None
         self.should_terminate = False
         self.song_ended = False
-        self.sp_gen = self.sp_load = self.sp_skip = self.sp_sync = self.sp_vis = None
+        self.poller = None
+        self.sp_gen = self.sp_load = self.sp_poll = self.sp_vis = None
         self.start_color = (0, 0, 255)
         self.track = None
         self.track_duration = None
+        self.track_frames = None
         self.visualizer = visualizer
 
     def authorize(self):
         """Handle the authorization workflow for the Spotify API.
         """
+        # spotipy (and the HTTP stack under it) is slow to import, so it is only imported once it is needed
+        import spotipy
+        import spotipy.util as util
         token = util.prompt_for_user_token(USERNAME,
                                            self.permission_scopes,
                                            SPOTIPY_CLIENT_ID,
                                            SPOTIPY_CLIENT_SECRET,
                                            SPOTIPY_REDIRECT_URI)
         if token:
-            # Instantiate multiple Spotify objects because sharing a Spotify object can block threads
-            self.sp_gen = spotipy.Spotify(auth=token)
-            self.sp_vis = spotipy.Spotify(auth=token)
-            self.sp_sync = spotipy.Spotify(auth=token)
-            self.sp_load = spotipy.Spotify(auth=token)
-            self.sp_skip = spotipy.Spotify(auth=token)
-            self.sp_pause = spotipy.Spotify(auth=token)
+            # Instantiate multiple Spotify objects because sharing a Spotify object can block threads (every API call
+            # is timed per endpoint)
+            self.sp_gen = Metrics().instrument(spotipy.Spotify(auth=token), "spotify_api_seconds")
+            self.sp_vis = Metrics().instrument(spotipy.Spotify(auth=token), "spotify_api_seconds")
+            self.sp_load = Metrics().instrument(spotipy.Spotify(auth=token), "spotify_api_seconds")
+            self.sp_poll = Metrics().instrument(spotipy.Spotify(auth=token), "spotify_api_seconds")
+            if self.analysis_source is None:
+                self.analysis_source = SpotifyAnalysisSource(self.sp_load)
+            self.prefetcher = TrackPrefetcher(self.sp_load, self.analysis_source, self.analysis_cache, self.frame_rate,
+                                              preprocessor=self.preprocessor)
             text = "Successfully connected to {}'s account.".format(self.sp_gen.me()["display_name"])
             print(SpotifyVisualizer._make_text_effect(text, ["green"]))
+            StartupTimer().mark("Spotify authorized")
         else:
             raise Exception("Unable to authenticate Spotify user.")
 
@@ -115,9 +163,12 @@ class SpotifyVisualizer:
         """
         text = "Waiting for an active Spotify track to start visualization."
         print(SpotifyVisualizer._make_text_effect(text, ["green", "bold"]))
+        # If a track change was already observed, start visualizing the new track right away
+        self.track, self.next_track = self.next_track, None
         while not self.track:
             self.track = self.sp_gen.current_user_playing_track()
-            time.sleep(1)
+            if not self.track:
+                time.sleep(1)
         track_name = self.track["item"]["name"]
         artists = ', '.join((artist["name"] for artist in self.track["item"]["artists"]))
         text = "Loaded track: {} by {}.".format(track_name, artists)
@@ -126,27 +177,31 @@ class SpotifyVisualizer:
         self.is_playing = self.track["is_playing"]
         # self._load_track_data()
 
-    def sync(self):
-        """Syncs visualizer with Spotify playback. Called asynchronously (worker thread).
+    def sync(self, spotify_response, sent_at, received_at):
+        """Syncs visualizer with Spotify playback. Called asynchronously (polling thread).
+
+        The playback clock compensates for the request's round trip time and slews away small errors instead of
+        jumping to the reported position.
+
+        Args:
+            spotify_response (dict): the user's playback state returned by the Spotify API.
+            sent_at (float): the monotonic time the request was sent.
+            received_at (float): the monotonic time the response was received.
         """
-        spotify_response = None
-        while not spotify_response:
-            spotify_response = self.sp_sync.current_user_playing_track()
-            time.sleep(0.5)
         track_progress = spotify_response["progress_ms"] / 1000
-        text = "Syncing track to position: {}. \r".format(track_progress)
+        error = self.clock.sync(track_progress, sent_at, received_at)
+        Metrics().observe("sync_error_seconds", abs(error))
+        text = "Syncing track to position: {} (error: {:+.3f}s, rtt: {:.3f}s). \r".format(
+            track_progress, error, received_at - sent_at
+        )
         sys.stdout.write(SpotifyVisualizer._make_text_effect(text, ["green", "bold"]))
         sys.stdout.flush()
-        self.pos_lock.acquire()
-        self.playback_pos = track_progress
-        self.pos_lock.release()
 
     def launch_visualizer(self):
         """Coordinate visualization by spawning the appropriate threads.
 
-        There are 4 threads: one for visualization, one for periodically syncing the playback position with the Spotify
-        API, one for loading chunks of track data, and one to periodically check if the user's current track has
-        changed.
+        There are 3 threads: one for visualization, one for loading chunks of track data, and one that polls the user's
+        playback state to sync the playback position, detect pauses and detect track changes.
         """
         self.authorize()
         while not self.should_terminate:
@@ -154,12 +209,12 @@ class SpotifyVisualizer:
             self.get_track()
 
             # Start threads and wait for them to exit
+            self.poller = PlaybackPoller(self.sp_poll, interval=0.33)
+            self.poller.subscribe(self._on_playback_state)
             threads = [
                 threading.Thread(target=self._visualize, name="[VISUALIZER] visualize_thread"),
                 threading.Thread(target=self._continue_loading_data, name="[VISUALIZER] data_load_thread"),
-                threading.Thread(target=self._continue_syncing, name="[VISUALIZER] sync_thread"),
-                threading.Thread(target=self._continue_checking_if_skip, name="[VISUALIZER] skipping_thread"),
-                threading.Thread(target=self._continue_checking_if_paused, name="[VISUALIZER] pause_thread")
+                threading.Thread(target=self.poller.run, name="[VISUALIZER] playback_poll_thread")
             ]
             for thread in threads:
                 thread.start()
@@ -179,77 +234,94 @@ class SpotifyVisualizer:
         """
         self.should_terminate = True
         self.song_ended = True
+        if self.prefetcher:
+            self.prefetcher.cancel()
+        if self.poller:
+            self.poller.stop()
 
-    def _continue_checking_if_paused(self, wait=0.33):
-        """Continuously checks if user's playback is paused, and updates self.is_playing accordingly.
-
-        If the user's playback is paused, we should display an animation on the strip until playback resumes.
+    def _continue_loading_data(self, wait=0.5):
+        """Continuously loads and prepares chunks of data. Called asynchronously (worker thread).
 
         Args:
-            wait (float): the amount of time in seconds to wait between each check.
+            wait (float): the amount of time in seconds to wait between each call to _load_track_data().
         """
-        while not self.song_ended:
+        # Check prefetched tracks and the analysis cache before making any API calls; cached frames can be used as is
+        track_id = self.track["item"]["id"]
+        prefetched = self.prefetcher.get(track_id) if self.prefetcher and self.precompute_track else None
+        cached = self.analysis_cache.load(track_id) if self.analysis_cache and prefetched is None else None
+        if cached is not None and any(name not in cached for name in ("loudness_max",) + RhythmIndex.KINDS):
+            # Entries cached before peak loudness and rhythm events were stored are fetched again
+            cached = None
+        should_cache = cached is None and prefetched is None
+        if prefetched is not None:
+            self.track_frames, self.rhythm_index = prefetched
+            text = "Loaded {} prefetched frames.".format(len(self.track_frames))
+            print(SpotifyVisualizer._make_text_effect(text, ["green"]))
+        elif self.precompute_track and cached is not None and "frames" in cached \
+                and float(cached["frame_rate"]) == self.frame_rate \
+                and str(cached.get("interpolation")) == TrackFrames.KIND:
+            self.track_frames = TrackFrames(cached["frames"], self.frame_rate)
+            self.rhythm_index = RhythmIndex.from_arrays(cached)
+            text = "Loaded {} precomputed frames from the analysis cache.".format(len(self.track_frames))
+            print(SpotifyVisualizer._make_text_effect(text, ["green"]))
+
+        # If necessary, get audio data for the track from the analysis source and pad data to cover the full track
+        # length
+        elif self.segment_table is None:
+            source = "cache" if cached is not None else self.analysis_source.NAME
+            with Metrics().timed("analysis_fetch_seconds", source=source):
+                if cached is not None:
+                    segment_table = SegmentTable.from_arrays(cached)
+                    self.rhythm_index = RhythmIndex.from_arrays(cached)
+                else:
+                    segment_table, self.rhythm_index = self.analysis_source.analyze(track_id)
+            self.segment_cursor = 0
+            self.segment_table = segment_table.pad(self.track_duration)
+        self.visualizer.set_rhythm(self.rhythm_index)
+
+        # In precompute mode, evaluate loudness and pitch data for every frame of the track at once
+        if self.precompute_track and self.track_frames is None and not self.song_ended:
+            arrays = self.segment_table.slice(1, -1).to_arrays()
             try:
-                self.is_playing = self.sp_pause.current_playback()["is_playing"]
-            except:
-                text = "Error occurred while checking if playback is paused...retrying in {} seconds.".format(wait)
+                self._load_track_frames()
+                arrays.update(
+                    frames=self.track_frames.frames,
+                    frame_rate=self.frame_rate,
+                    interpolation=TrackFrames.KIND
+                )
+                should_cache = True
+            except Exception as e:
+                text = f"Error occurred while precomputing frames: {e} \nFalling back to loading data chunks..."
                 print(SpotifyVisualizer._make_text_effect(text, ["red", "bold"]))
+                self.precompute_track = False
+        elif should_cache:
+            arrays = self.segment_table.slice(1, -1).to_arrays()
 
-    def _continue_checking_if_skip(self, wait=0.33):
-        """Continuously checks if the user's playing track has changed. Called asynchronously (worker thread).
-
-        If the user's currently playing track has changed (is different from track), then this function pauses the
-        user's playback and sets should_terminate to True, resulting in the termination of all worker threads.
-
-        Args:
-            wait (float): the amount of time in seconds to wait between each check.
-        """
-        track = self.track
-        while track["item"]["id"] == self.track["item"]["id"]:
-            if self.song_ended:
-                text = "Killing skip checking thread. (FORCE)"
-                print(SpotifyVisualizer._make_text_effect(text, ["red", "bold"]))
-                exit(0)
+        # Store the parsed segments and rhythm events (and precomputed frames) so repeat plays of the track skip the API
+        # call
+        if self.analysis_cache and should_cache:
             try:
-                spotify_response = self.sp_skip.current_user_playing_track()
-                assert(spotify_response is not None)
-                track = spotify_response
-            except:
-                text = "Error occurred while checking if track has changed...retrying in {} seconds.".format(wait)
+                self.analysis_cache.save(track_id, **arrays, **self.rhythm_index.to_arrays())
+            except OSError as e:
+                text = f"Error occurred while writing to the analysis cache: {e}"
                 print(SpotifyVisualizer._make_text_effect(text, ["red", "bold"]))
-            time.sleep(wait)
-        self.song_ended = True
-        text = "A skip has occurred."
-        print(SpotifyVisualizer._make_text_effect(text, ["blue", "bold"]))
 
-    def _continue_loading_data(self, wait=0.5):
-        """Continuously loads and prepares chunks of data. Called asynchronously (worker thread).
+        # Get the tracks that will play next ready before they start (on the prefetcher's own thread)
+        if self.precompute_frames and self.prefetcher and not self.song_ended:
+            self.prefetcher.start(self.track)
 
-        Args:
-            wait (float): the amount of time in seconds to wait between each call to _load_track_data().
-        """
-        # If necessary, get audio data for the track from the Spotify API and pad data to cover the full track length
-        if not self.data_segments:
-            analysis = self.sp_load.audio_analysis(self.track["item"]["id"])
-            self.data_segments.append(
-                {
-                    "start": -0.1,
-                    "loudness_start": -25.0,
-                    "pitches": 12*[0]
-                }
-            )
-            self.data_segments += analysis["segments"]
-            self.data_segments.append(
-                {
-                    "start": self.track_duration + 0.1,
-                    "loudness_start": -25.0, "pitches": 12*[0]
-                }
-            )
-
-        # Continue preparing track data until self.data_segments is exhausted
-        while len(self.data_segments) != 0 and not self.song_ended:
+        # Chunk interpolators only provide pitches; loudness comes from the envelope evaluated for every frame at once
+        if self.segment_table is not None and self.segment_cursor < len(self.segment_table):
+            self.loudness_envelope = LoudnessEnvelope.from_table(self.segment_table, self.track_duration, self.frame_rate)
+
+        # Continue preparing track data until the track ends, freeing chunks behind the playhead, waiting while the
+        # buffer is full and preparing chunks again after seeking back to chunks that were already freed
+        while self.segment_table is not None and self.track_frames is None and not self.song_ended:
             try:
-                self._load_track_data()
+                self._rewind_chunks(self.playback_pos)
+                self.chunk_buffer.evict_before(self.playback_pos)
+                if self.segment_cursor < len(self.segment_table) and not self.chunk_buffer.is_full():
+                    self._load_track_data()
             except:
                 text = "Error occurred while loading data chunk...retrying in {} seconds.".format(wait)
                 print(SpotifyVisualizer._make_text_effect(text, ["red", "bold"]))
@@ -258,117 +330,87 @@ class SpotifyVisualizer:
         print(SpotifyVisualizer._make_text_effect(text, ["red", "bold"]))
         exit(0)
 
-    def _continue_syncing(self, wait=0.05):
-        """Repeatedly syncs visualization playback position with the Spotify API.
-
-        Args:
-            wait (float): the amount of time in seconds to wait between each sync.
-        """
-        pos = self.playback_pos
-        while round(self.track_duration - pos) != 0 and not self.song_ended:
-            try:
-                self.sync()
-            except:
-                text = "Error occurred while attempting to sync...retrying in {} seconds.".format(wait)
-                print(SpotifyVisualizer._make_text_effect(text, ["red", "bold"]))
-            time.sleep(wait)
-            pos = self.playback_pos
-        text = "Killing synchronization thread."
-        print(SpotifyVisualizer._make_text_effect(text, ["red", "bold"]))
-        exit(0)
-
     def _get_buffers_for_pos(self, pos):
-        """Find the interpolated functions that have the specified position within their bounds via binary search.
+        """Find the interpolator that has the specified position within its bounds.
 
         Args:
-            pos (float): the playback position to find interpolated functions for.
+            pos (float): the playback position to find an interpolator for.
 
         Returns:
-             a tuple of interp1d objects (loudness and pitch functions) or None if search fails.
+             a SegmentInterpolator, or None if search fails.
+        """
+        return self.chunk_buffer.find(pos)
+
+    def _load_track_frames(self):
+        """Evaluate loudness and pitch data for every frame of the track and publish it to the visualization thread.
+
+        All data segments are consumed, so no chunks are left for _load_track_data() to prepare. Frames are computed by
+        the preprocessor (in a worker process), so building them doesn't hold the GIL the visualization thread needs.
         """
-        self.buffer_lock.acquire()
-
-        # Binary search for interpolated loudness and pitch functions
-        start, end, index = 0, len(self.interpolated_loudness_buffer) - 1, None
-        while start <= end:
-            mid = start + (end - start) // 2
-            lower_bound, upper_bound, _ = self.interpolated_loudness_buffer[mid]
-            if lower_bound <= pos <= upper_bound:
-                index = mid
-                break
-            if pos < lower_bound:
-                end = mid - 1
-            if pos > upper_bound:
-                start = mid + 1
-
-        to_return = None
-        if index is not None:
-            to_return = (
-                self.interpolated_loudness_buffer[index][-1],
-                self.interpolated_pitch_buffer[index][-1],
-            )
-        self.buffer_lock.release()
-        return to_return
+        with Metrics().timed("interpolation_build_seconds", mode="frames"):
+            track_frames = self.preprocessor.compute_frames(self.segment_table, self.track_duration, self.frame_rate)
+        self.segment_cursor = len(self.segment_table)
+        self.track_frames = track_frames
+
+        # Print information about the data load that was just performed
+        title = "--------------------DATA LOAD REPORT--------------------\n"
+        frames = "Precomputed frames: {} ({} KiB).\n".format(len(track_frames), track_frames.frames.nbytes // 1024)
+        closer = "--------------------------------------------------------"
+        text = title + frames + closer
+        print(SpotifyVisualizer._make_text_effect(text, ["blue"]))
 
     def _load_track_data(self, chunk_length=12):
         """Obtain track data from the Spotify API and run necessary analysis to generate data needed for visualization.
 
-        Each call to this function analyzes the next chunk_length seconds of track data and produces the appropriate
-        interpolated loudness and pitch functions. These interpolated functions are added to their
-        corresponding buffers.
+        Each call to this function analyzes the next chunk_length seconds of track data and fits a loudness and pitch
+        interpolator to it. The interpolator is added to the chunk buffer.
 
         Args:
             chunk_length (float): the number of seconds of track data to analyze.
         """
-        # Extract the next chunk_length seconds of useful loudness and pitch data
-        s_t, l, pitch_lists = [], [], []
-        i = 0
-        chunk_start = self.data_segments[0]["start"]
-        while i < len(self.data_segments):
-            s_t.append(self.data_segments[i]["start"])
-            l.append(self.data_segments[i]["loudness_start"])
-            pitch_lists.append(self.data_segments[i]["pitches"])
-
-            # If we've analyzed chunk_length seconds of data, and there is more than 2 segments remaining, break
-            if self.data_segments[i]["start"] > chunk_start + chunk_length and i < len(self.data_segments) - 1:
-                break
-            i += 1
-        chunk_end = self.data_segments[i]["start"] if i < len(self.data_segments) else self.data_segments[-1]["start"]
-
-        # Discard data segments that were just analyzed
-        self.data_segments = self.data_segments[i:]
-
-        # Perform data interpolation for loudness and pitch data
-        start_times = np.array(s_t)
-        loudnesses = np.array(l)
-        interpolated_loudness_func = interp1d(start_times, loudnesses, kind='cubic', assume_sorted=True)
-        interpolated_pitch_funcs = []
-        for i in range(12):
-            # Create a separate interpolated pitch function for each of the 12 pitch keys
-            interpolated_pitch_funcs.append(
-                interp1d(
-                    start_times,
-                    [pitch_list[i] if pitch_list[i] >= 0 else 0 for pitch_list in pitch_lists],
-                    kind="cubic",
-                    assume_sorted=True
-                )
-            )
-
-        # Add interpolated functions and their bounds to buffers for consumption by visualization thread
-        self.buffer_lock.acquire()
-        self.interpolated_loudness_buffer.append((chunk_start, chunk_end, interpolated_loudness_func))
-        self.interpolated_pitch_buffer.append((chunk_start, chunk_end, interpolated_pitch_funcs))
+        # Find the next chunk_length seconds of useful loudness and pitch data (the chunk's segments are a view into the
+        # segment table, so nothing is copied)
+        first = self.segment_cursor
+        i = self.segment_table.chunk_end(first, chunk_length)
+        chunk_segments = self.segment_table.slice(first, i + 1)
+        chunk_start = float(chunk_segments.start[0])
+        chunk_end = float(chunk_segments.start[-1])
+
+        # Move past the segments that were just analyzed (the last one also starts the next chunk)
+        self.segment_cursor = i
+
+        # Fit one interpolator to the loudness and pitch data, then publish it and its bounds for consumption by
+        # visualization thread
+        with Metrics().timed("interpolation_build_seconds", mode="chunk"):
+            interpolator = SegmentInterpolator.from_table(chunk_segments)
+        self.chunk_buffer.publish(chunk_start, chunk_end, interpolator)
 
         # Print information about the data chunk load that was just performed
         title = "--------------------DATA LOAD REPORT--------------------\n"
-        data_seg = "Data segments remaining: {}.\n".format(len(self.data_segments))
-        loudness = "Interpolated loudness buffer size: {}.\n".format(len(self.interpolated_loudness_buffer))
-        pitch = "Interpolated pitch buffer size: {}.\n".format(len(self.interpolated_pitch_buffer))
+        data_seg = "Data segments remaining: {}.\n".format(len(self.segment_table) - self.segment_cursor)
+        chunks = "Chunk buffer size: {}/{}.\n".format(len(self.chunk_buffer), self.chunk_buffer.capacity)
         closer = "--------------------------------------------------------"
-        self.buffer_lock.release()
-        text = title + data_seg + loudness + pitch + closer
+        text = title + data_seg + chunks + closer
         print(SpotifyVisualizer._make_text_effect(text, ["blue"]))
 
+    def _rewind_chunks(self, pos):
+        """Start preparing chunks from a playback position again if playback jumped back before every buffered chunk.
+
+        Chunks behind the playhead are evicted, so after seeking backward the chunks covering the new position have to
+        be rebuilt: the segment cursor moves back to the segment playing at pos and the buffer starts over from there.
+
+        Args:
+            pos (float): the current playback position (in seconds).
+        """
+        chunks = self.chunk_buffer.chunks
+        if chunks:
+            oldest_start = chunks[0][0]
+        else:
+            oldest_start = float(self.segment_table.start[min(self.segment_cursor, len(self.segment_table) - 1)])
+        if pos < oldest_start:
+            self.segment_cursor = self.segment_table.segment_at(pos)
+            self.chunk_buffer.clear()
+
     @staticmethod
     def _make_text_effect(text, text_effects):
         """"Applies text effects to text and returns it.
@@ -397,28 +439,127 @@ class SpotifyVisualizer:
         msg_with_fx += end_code * len(text_effects)
         return msg_with_fx
 
-    def _push_visual_to_strip(self, loudness_func, pitch_funcs, pos):
+    def _on_playback_state(self, spotify_response, sent_at, received_at):
+        """Handles a playback state response from the poller. Called asynchronously (polling thread).
+
+        Detects track changes (which end the visualization of the current track), updates self.is_playing so that an
+        animation is displayed while playback is paused, and syncs the playback position.
+
+        Args:
+            spotify_response (dict): the user's playback state returned by the Spotify API (None if nothing is playing).
+            sent_at (float): the monotonic time the request was sent.
+            received_at (float): the monotonic time the response was received.
+        """
+        if self.song_ended:
+            self.poller.stop()
+            return
+        if not spotify_response or not spotify_response["item"]:
+            return
+        if spotify_response["item"]["id"] != self.track["item"]["id"]:
+            self.next_track = spotify_response
+            self.song_ended = True
+            self.poller.stop()
+            text = "A skip has occurred."
+            print(SpotifyVisualizer._make_text_effect(text, ["blue", "bold"]))
+            return
+        self.is_playing = spotify_response["is_playing"]
+        self.clock.set_playing(self.is_playing)
+        if round(self.track_duration - self.playback_pos) != 0:
+            self.sync(spotify_response, sent_at, received_at)
+
+    def _push_visual_to_strip(self, interpolator, pos):
         """Displays a visual on the LED strip based on the loudness and pitch data at current playback position.
 
         Args:
-            loudness_func (interp1d): interpolated loudness function.
-            pitch_funcs (list): a list of interpolated pitch functions (one pitch function for each major musical key).
+            interpolator (SegmentInterpolator): the pitch interpolator for the current chunk (loudness is looked up in
+                the loudness envelope).
+            pos (float): the current playback position (offset into the track in seconds).
+
+        Raises:
+            ValueError: if pos is outside of the chunk covered by the interpolator.
+        """
+        start = time.perf_counter()
+        sample = interpolator.evaluate(pos)
+        self._update_rhythm(pos)
+        loudness_envelope = self.loudness_envelope
+        loudness = loudness_envelope.sample(pos) if loudness_envelope is not None else sample[0]
+        self.visualizer.visualize_sample(loudness, sample[1:], pos)
+        Metrics().observe("frame_seconds", time.perf_counter() - start)
+
+    def _push_sample_to_strip(self, pos):
+        """Displays a visual on the LED strip based on the precomputed frame for the current playback position.
+
+        Args:
             pos (float): the current playback position (offset into the track in seconds).
         """
-        self.visualizer.visualize(loudness_func, pitch_funcs, pos)
+        start = time.perf_counter()
+        sample = self.track_frames.sample(pos)
+        self._update_rhythm(pos)
+        self.visualizer.visualize_sample(sample[0], sample[1:], pos)
+        Metrics().observe("frame_seconds", time.perf_counter() - start)
+
+    def _update_rhythm(self, pos):
+        """Move the rhythm index to the current playback position before a frame is visualized.
+
+        Args:
+            pos (float): the current playback position (offset into the track in seconds).
+        """
+        rhythm_index = self.rhythm_index
+        if rhythm_index is not None:
+            rhythm_index.update(pos)
+
+    def _print_frame_report(self):
+        """Print frame timing statistics for the visualization of the current track.
+        """
+        report = self.frame_scheduler.report()
+        title = "--------------------FRAME REPORT--------------------\n"
+        fps = "Achieved FPS: {:.1f} (target: {:.1f}).\n".format(report["fps"], report["target_fps"])
+        jitter = "Jitter p50/p95/p99: {:.2f}/{:.2f}/{:.2f} ms.\n".format(
+            report["jitter_p50_ms"], report["jitter_p95_ms"], report["jitter_p99_ms"]
+        )
+        frames = "Rendered frames: {}, dropped frames: {}.\n".format(report["rendered_frames"], report["dropped_frames"])
+        output = ""
+        for device in self.visualizer.get_visualization_devices():
+            if hasattr(device, "report"):
+                output_report = device.report()
+                output += "Strip transfer mean/p95/max: {:.2f}/{:.2f}/{:.2f} ms, skipped frames: {}.\n".format(
+                    output_report["transfer_mean_ms"], output_report["transfer_p95_ms"],
+                    output_report["transfer_max_ms"], output_report["skipped_frames"]
+                )
+        closer = "----------------------------------------------------"
+        text = title + fps + jitter + frames + output + closer
+        print(SpotifyVisualizer._make_text_effect(text, ["blue"]))
+
+    def _report_first_frame(self):
+        """Print startup timing once the first frame of the first track has been visualized.
+        """
+        if StartupTimer().mark("first visualized frame"):
+            title = "--------------------STARTUP REPORT--------------------\n"
+            closer = "\n------------------------------------------------------"
+            text = title + StartupTimer().report() + closer
+            print(SpotifyVisualizer._make_text_effect(text, ["blue"]))
 
     def _reset(self):
         """Reset certain attributes to prepare to visualize a new track.
         """
-        self.data_segments = []
-        self.interpolated_loudness_buffer = []
-        self.interpolated_pitch_buffer = []
+        self.chunk_buffer = ChunkBuffer()
         self.is_playing = True
+        self.loudness_envelope = None
+        self.clock.set_playing(True)
+        self.clock.set_position(0)
         self.playback_pos = 0
+        self.precompute_track = self.precompute_frames
+        if self.prefetcher:
+            self.prefetcher.cancel()
+        self.rhythm_index = None
+        self.segment_cursor = 0
+        self.segment_table = None
         self.song_ended = False
         self.track = None
         self.track_duration = None
+        self.track_frames = None
         self.track_id = None
+        self.visualizer.set_rhythm(None)
         self.visualizer.reset()
 
     def _reset_track(self):
@@ -430,59 +571,66 @@ class SpotifyVisualizer:
             self.sp_gen.pause_playback()
         self.sp_gen.seek_track(0)
 
-    def _visualize(self, sample_rate=0.03):
+    def _visualize(self):
         """Starts playback on Spotify user's account (if paused) and visualizes the current track.
 
-        Args:
-            sample_rate (float): how long to wait (in seconds) between each sample.
+        Frames are scheduled against absolute deadlines spaced frame_rate seconds apart; frames that would be rendered
+        late are dropped.
         """
         pos = self.playback_pos
-        loudness_func,pitch_funcs = None, None
+        interpolator = None
 
         try:
             if not self.sp_vis.current_playback()["is_playing"]:
                 self.sp_vis.start_playback()
                 self.is_playing = True
+                self.clock.set_playing(True)
         except:
             pass
 
         # Visualize until end of track
+        StartupTimer().mark("visualization started")
+        self.frame_scheduler.reset()
         while pos <= self.track_duration:
-            start = time.perf_counter()
+            self.frame_scheduler.wait_for_next_frame()
             if self.song_ended:
+                self._print_frame_report()
                 text = "Killing visualization thread."
                 print(SpotifyVisualizer._make_text_effect(text, ["red", "bold"]))
                 exit(0)
 
+            # Read the playback position from the clock (independent of how late this frame runs)
+            self.pos_lock.acquire()
+            self.playback_pos = self.clock.position()
+            self.pos_lock.release()
+
             try:
-                if self.is_playing and loudness_func and pitch_funcs:
+                if self.is_playing and self.track_frames is not None:
+                    pos = self.playback_pos
+                    self._push_sample_to_strip(pos)
+                    self._report_first_frame()
+                elif self.precompute_track:
+                    self.loading_animator.animate() # play one frame of animation
+                elif self.is_playing and interpolator:
                     pos = self.playback_pos
-                    self._push_visual_to_strip(loudness_func, pitch_funcs, pos)
-                elif not loudness_func or not pitch_funcs:
-                    funcs = self._get_buffers_for_pos(pos)
-                    loudness_func, pitch_funcs = funcs if funcs else (None, None)
+                    self._push_visual_to_strip(interpolator, pos)
+                    self._report_first_frame()
+                elif not interpolator:
+                    interpolator = self._get_buffers_for_pos(pos)
                     self.loading_animator.animate() # play one frame of animation
                 else:
                     self.loading_animator.animate() # play one frame of animation
-            # If pitch or loudness value out of range, find the interpolated functions for the current position
+            # If the position is out of range of the current chunk, find the interpolator for the current position
             except ValueError as err:
-                text = "Caught ValueError: {}\nSearching for interpolated funcs for current position...".format(err)
+                text = "Caught ValueError: {}\nSearching for interpolator for current position...".format(err)
                 print(SpotifyVisualizer._make_text_effect(text, ["red", "bold"]))
-                funcs = self._get_buffers_for_pos(pos)
-                if funcs:
-                    loudness_func, pitch_funcs = funcs
+                next_interpolator = self._get_buffers_for_pos(pos)
+                if next_interpolator:
+                    interpolator = next_interpolator
                 else:
                     self.loading_animator.animate()
             # Unexpected error...retry
             except Exception as e:
                 text = f"Unexpected error in visualization thread: {e} \nRetrying..."
                 print(SpotifyVisualizer._make_text_effect(text, ["red", "bold"]))
-
-            self.pos_lock.acquire()
-            self.playback_pos += sample_rate
-            self.pos_lock.release()
-            end = time.perf_counter()
-
-            # Account for time used to create visualization
-            diff = sample_rate - (end - start)
-            time.sleep(diff if diff > 0 else 0)
+        self._print_frame_report()
@@ -0,0 +1,102 @@
+import socket
+import time
+import unittest
+
+import numpy as np
+
+from network_led_strip import MAX_PIXELS_PER_PACKET, NetworkLEDReceiver, NetworkLEDStrip
+
+
+class NetworkLEDStripTest(unittest.TestCase):
+    """Streams frames from a NetworkLEDStrip to a NetworkLEDReceiver over the loopback interface.
+    """
+
+    # Long enough to be split across two packets
+    NUM_PIXELS = MAX_PIXELS_PER_PACKET + 100
+
+    def setUp(self):
+        self.receiver = NetworkLEDReceiver(self.NUM_PIXELS, host="127.0.0.1", port=0)
+        self.strip = NetworkLEDStrip("127.0.0.1", self.receiver.socket.getsockname()[1], self.NUM_PIXELS)
+        # Sends raw packets, to replay packets the strip already sent
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def tearDown(self):
+        self.receiver.close()
+        self.strip.close()
+        self.sender.close()
+
+    def show(self, value):
+        """Send a frame with every pixel set to value and return copies of its packets.
+        """
+        self.strip.fill(0, self.NUM_PIXELS - 1, value, value, value, value % 101)
+        self.strip.show()
+        return [bytes(packet) for packet, _, _ in self.strip.packets]
+
+    def replay(self, packet):
+        self.sender.sendto(packet, self.receiver.socket.getsockname())
+
+    def assert_frame(self, frame, sequence, value):
+        self.assertIsNotNone(frame)
+        self.assertEqual(frame[0], sequence)
+        self.assertTrue(np.all(frame[2] == value))
+        self.assertTrue(np.all(frame[3] == value % 101))
+
+    def test_frames_are_reassembled_from_packets(self):
+        self.assertEqual(len(self.strip.packets), 2)
+        for value in (10, 20, 30):
+            self.show(value)
+            self.assert_frame(self.receiver.receive(timeout=1.0), self.strip.sequence, value)
+
+    def test_duplicate_packet_does_not_complete_frame(self):
+        first, second = self.show(40)
+        self.receiver = self._swap_receiver()
+        self.replay(first)
+        self.replay(first)
+        self.assertIsNone(self.receiver.receive(timeout=0.2))
+        self.assertEqual(self.receiver.dropped_packets, 1)
+        self.replay(second)
+        self.assert_frame(self.receiver.receive(timeout=1.0), self.strip.sequence, 40)
+
+    def test_late_packets_of_older_frames_are_dropped(self):
+        old_packets = self.show(50)
+        self.assert_frame(self.receiver.receive(timeout=1.0), self.strip.sequence, 50)
+        self.show(60)
+        self.assert_frame(self.receiver.receive(timeout=1.0), self.strip.sequence, 60)
+        for packet in old_packets:
+            self.replay(packet)
+        self.assertIsNone(self.receiver.receive(timeout=0.2))
+        self.assertEqual(self.receiver.dropped_packets, 2)
+
+    def test_sequence_numbers_wrap_around(self):
+        self.strip.sequence = 0xFFFFFFFE
+        for expected_sequence, value in ((0xFFFFFFFF, 70), (0, 80), (1, 90)):
+            self.show(value)
+            self.assert_frame(self.receiver.receive(timeout=1.0), expected_sequence, value)
+        self.assertEqual(self.receiver.dropped_packets, 0)
+
+    def test_sequence_resets_after_sender_goes_quiet(self):
+        self.strip.sequence = 1000
+        self.show(100)
+        self.assert_frame(self.receiver.receive(timeout=1.0), 1001, 100)
+
+        # A restarted sender starts over from sequence 1, which looks stale while the old sender was recently active
+        self.strip.sequence = 0
+        self.show(110)
+        self.assertIsNone(self.receiver.receive(timeout=0.2))
+
+        # Once nothing was accepted for reset_after seconds, any sequence number is accepted
+        self.receiver.last_received = time.monotonic() - self.receiver.reset_after
+        self.show(120)
+        self.assert_frame(self.receiver.receive(timeout=1.0), 2, 120)
+
+    def _swap_receiver(self):
+        """Replace the receiver with one on the same port that hasn't seen any packets (the packets the strip sent
+        to the old receiver are discarded).
+        """
+        port = self.receiver.socket.getsockname()[1]
+        self.receiver.close()
+        return NetworkLEDReceiver(self.NUM_PIXELS, host="127.0.0.1", port=port)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+import collections
+import threading
+
+from Analysis.TrackFrames import TrackFrames
+from track_preprocessor import TrackPreprocessor
+from utils.metrics import Metrics
+from utils.print_utils import make_error_text
+
+
+class TrackPrefetcher:
+    """Fetches and preprocesses audio analysis for the tracks that will play next, before they start playing.
+
+    Upcoming tracks are read from the user's queue or, if the queue isn't available, from the playlist or album being
+    played. For each upcoming track, the analysis is fetched from the analysis source, precomputed into frames (and a
+    rhythm index), kept in memory and written to the analysis cache, so that visualization can start the moment a track
+    change is detected.
+
+    Prefetching runs on a background thread (see start), one run at a time; starting a new run cancels the previous one.
+
+    Args:
+        sp (Spotify): the Spotify object used to read the queue.
+        analysis_source (AnalysisSource): the source track analysis is fetched from.
+        analysis_cache (AnalysisCache): the on-disk cache to write prefetched tracks to (may be None).
+        frame_rate (float): the amount of time in seconds between each precomputed frame.
+        lookahead (int): the number of upcoming tracks to prefetch.
+        capacity (int): the maximum number of prefetched tracks kept in memory.
+        preprocessor (TrackPreprocessor): computes frames (in a worker process); None to compute them in this process.
+
+    Attributes:
+        analysis_cache (AnalysisCache): the on-disk cache prefetched tracks are written to.
+        analysis_source (AnalysisSource): the source track analysis is fetched from.
+        cancelled (threading.Event): set to cancel the latest prefetch run.
+        capacity (int): the maximum number of prefetched tracks kept in memory.
+        frame_rate (float): the amount of time in seconds between each precomputed frame.
+        lock (threading.Lock): a lock for accessing/modifying tracks, thread and cancelled.
+        lookahead (int): the number of upcoming tracks to prefetch.
+        preprocessor (TrackPreprocessor): computes frames for prefetched tracks.
+        sp (Spotify): the Spotify object used to read the queue.
+        thread (threading.Thread): the thread of the latest prefetch run (None if prefetching never started).
+        tracks (collections.OrderedDict): prefetched (TrackFrames, RhythmIndex) tuples keyed by track ID (oldest first).
+    """
+
+    def __init__(self, sp, analysis_source, analysis_cache, frame_rate, lookahead=2, capacity=4, preprocessor=None):
+        self.analysis_cache = analysis_cache
+        self.analysis_source = analysis_source
+        self.cancelled = threading.Event()
+        self.capacity = capacity
+        self.frame_rate = frame_rate
+        self.lock = threading.Lock()
+        self.lookahead = lookahead
+        self.preprocessor = preprocessor if preprocessor is not None else TrackPreprocessor(use_processes=False)
+        self.sp = sp
+        self.thread = None
+        self.tracks = collections.OrderedDict()
+
+    def start(self, playback_state):
+        """Prefetch the tracks that will play after the current track on a background (daemon) thread. Returns
+        immediately.
+
+        A prefetch run that is still going is cancelled, and the new run only starts once it has exited, so that at most
+        one run fetches tracks at a time.
+
+        Args:
+            playback_state (dict): the user's playback state returned by the Spotify API.
+        """
+        with self.lock:
+            self.cancelled.set()
+            self.cancelled = threading.Event()
+            self.thread = threading.Thread(
+                target=self._run, args=(playback_state, self.cancelled, self.thread),
+                name="[PREFETCHER] prefetch_thread", daemon=True
+            )
+            self.thread.start()
+
+    def cancel(self):
+        """Cancel the latest prefetch run (e.g. when the track changes). Returns immediately; the run stops before
+        fetching its next track.
+        """
+        with self.lock:
+            self.cancelled.set()
+
+    def get(self, track_id):
+        """Take the prefetched frames and rhythm index for a track out of memory.
+
+        Args:
+            track_id (str): the Spotify ID of the track.
+
+        Returns:
+            a (TrackFrames, RhythmIndex) tuple, or None if the track wasn't prefetched.
+        """
+        with self.lock:
+            return self.tracks.pop(track_id, None)
+
+    def prefetch(self, playback_state, cancelled=None):
+        """Prefetch the tracks that will play after the current track.
+
+        Args:
+            playback_state (dict): the user's playback state returned by the Spotify API.
+            cancelled (threading.Event): if given, prefetching stops as soon as it is set.
+        """
+        for item in self.upcoming_tracks(playback_state):
+            if cancelled and cancelled.is_set():
+                return
+            track_id = item["id"]
+            with self.lock:
+                if track_id in self.tracks:
+                    continue
+            if self.analysis_cache and self.analysis_cache.contains(track_id):
+                continue
+
+            duration = item["duration_ms"] / 1000
+            segment_table, rhythm_index = self.analysis_source.analyze(track_id)
+            with Metrics().timed("interpolation_build_seconds", mode="prefetch"):
+                track_frames = self.preprocessor.compute_frames(segment_table.pad(duration), duration, self.frame_rate)
+            if cancelled and cancelled.is_set():
+                return
+            with self.lock:
+                self.tracks[track_id] = (track_frames, rhythm_index)
+                while len(self.tracks) > self.capacity:
+                    self.tracks.popitem(last=False)
+            if self.analysis_cache:
+                self.analysis_cache.save(
+                    track_id,
+                    frames=track_frames.frames,
+                    frame_rate=self.frame_rate,
+                    interpolation=TrackFrames.KIND,
+                    **segment_table.to_arrays(),
+                    **rhythm_index.to_arrays()
+                )
+
+    def upcoming_tracks(self, playback_state):
+        """Find the tracks that will play after the current track.
+
+        Args:
+            playback_state (dict): the user's playback state returned by the Spotify API.
+
+        Returns:
+            a list of up to lookahead track objects.
+        """
+        if hasattr(self.sp, "queue"):
+            try:
+                queue = self.sp.queue()["queue"]
+                return [item for item in queue if item and item.get("type", "track") == "track"][:self.lookahead]
+            except Exception:
+                pass
+
+        # Without a queue, fall back to the tracks following the current track in the playlist/album being played
+        context = playback_state.get("context")
+        if not context or context["type"] not in ("playlist", "album"):
+            return []
+        if context["type"] == "playlist":
+            page = self.sp.playlist_items(context["uri"])
+        else:
+            page = self.sp.album_tracks(context["uri"])
+
+        # Read the playlist/album page by page, only until the tracks following the current track have been found
+        current_id = playback_state["item"]["id"]
+        found_current = False
+        upcoming = []
+        while page:
+            for entry in page["items"]:
+                item = entry["track"] if context["type"] == "playlist" else entry
+                if not item:
+                    continue
+                if found_current:
+                    upcoming.append(item)
+                    if len(upcoming) == self.lookahead:
+                        return upcoming
+                elif item["id"] == current_id:
+                    found_current = True
+            page = self.sp.next(page) if page["next"] else None
+        return upcoming
+
+    def _run(self, playback_state, cancelled, previous):
+        """Run prefetch() once the previous run has exited. Called asynchronously (prefetch thread).
+
+        Args:
+            playback_state (dict): the user's playback state returned by the Spotify API.
+            cancelled (threading.Event): set to cancel this run.
+            previous (threading.Thread): the thread of the previous run (None if there wasn't one).
+        """
+        if previous:
+            previous.join()
+        if cancelled.is_set():
+            return
+        try:
+            self.prefetch(playback_state, cancelled)
+        except Exception as e:
+            print(make_error_text("Error occurred while prefetching upcoming tracks: {}".format(e)))
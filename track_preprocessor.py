@@ -0,0 +1,128 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from Analysis.SegmentTable import SegmentTable
+from Analysis.TrackFrames import TrackFrames
+from utils.print_utils import make_error_text
+
+
+class TrackPreprocessor:
+    """Precomputes track frames in a worker process, so the render thread never waits on the GIL while tracks load.
+
+    Fitting interpolants and evaluating them on the frame grid is pure CPU work. In the visualizer's process it would
+    compete with the render thread for the GIL and make frames stutter while a track loads. Instead, the segment columns
+    are sent to a worker process (they are small), and the worker writes the frames straight into a shared memory block
+    allocated by this process, so the frames (the bulk of the data) come back without being pickled. Workers are
+    started with the "spawn" method, because forking a process that runs several threads is unsafe.
+
+    If the worker pool breaks (e.g. a worker is killed), frames are computed in this process and the pool is restarted
+    on the next call.
+
+    Args:
+        max_workers (int): the number of worker processes.
+        use_processes (bool): if False, frames are computed in this process (e.g. on platforms without shared memory).
+
+    Attributes:
+        executor (ProcessPoolExecutor): the worker pool (None until it is started).
+        lock (threading.Lock): a lock for starting/replacing the worker pool.
+        max_workers (int): the number of worker processes.
+        use_processes (bool): whether frames are computed in worker processes.
+    """
+
+    def __init__(self, max_workers=1, use_processes=True):
+        self.executor = None
+        self.lock = threading.Lock()
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+
+    def start(self):
+        """Start the worker pool ahead of time, so that spawning workers (and importing NumPy in them) doesn't delay
+        the first track. Returns immediately.
+        """
+        if self.use_processes:
+            self._get_executor().submit(_warm_up)
+
+    def compute_frames(self, table, duration, frame_rate):
+        """Interpolate the columns of a segment table and sample them at every frame of the track.
+
+        Args:
+            table (SegmentTable): the track's segments, covering the whole track (see SegmentTable.pad).
+            duration (float): the duration of the track in seconds.
+            frame_rate (float): the amount of time in seconds between consecutive frames.
+
+        Returns:
+            a TrackFrames object holding loudness and pitch values for every frame of the track (see
+            TrackFrames.from_table).
+        """
+        if not self.use_processes:
+            return TrackFrames.from_table(table, duration, frame_rate)
+
+        num_frames = int(duration / frame_rate) + 1
+        block = shared_memory.SharedMemory(create=True, size=num_frames * 13 * np.dtype(np.float32).itemsize)
+        try:
+            self._get_executor().submit(
+                _compute_frames, table.to_arrays(), duration, frame_rate, block.name
+            ).result()
+            frames = np.ndarray((num_frames, 13), dtype=np.float32, buffer=block.buf).copy()
+        except BrokenProcessPool as e:
+            text = "Error occurred in the preprocessing worker: {}\nComputing frames in this process...".format(e)
+            print(make_error_text(text))
+            with self.lock:
+                executor, self.executor = self.executor, None
+            # Release the broken pool's management thread and any workers still alive before a new pool is started
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+            return TrackFrames.from_table(table, duration, frame_rate)
+        finally:
+            block.close()
+            block.unlink()
+        return TrackFrames(frames, frame_rate)
+
+    def shutdown(self):
+        """Stop the worker pool.
+        """
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_executor(self):
+        """Get the worker pool, starting it if necessary.
+
+        Returns:
+            the ProcessPoolExecutor.
+        """
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self.executor
+
+
+def _warm_up():
+    """Do nothing (run in a worker process to start it).
+    """
+
+
+def _compute_frames(arrays, duration, frame_rate, block_name):
+    """Compute the frames of a track and write them into a shared memory block. Run in a worker process.
+
+    Args:
+        arrays (dict): the columns of the track's padded segment table (see SegmentTable.to_arrays).
+        duration (float): the duration of the track in seconds.
+        frame_rate (float): the amount of time in seconds between consecutive frames.
+        block_name (str): the name of the shared memory block to write the (num_frames, 13) float32 frames into.
+    """
+    frames = TrackFrames.from_table(SegmentTable.from_arrays(arrays), duration, frame_rate).frames
+    # The block is owned (and unlinked) by the process that created it; workers only attach to it
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        np.ndarray(frames.shape, dtype=np.float32, buffer=block.buf)[:] = frames
+    finally:
+        block.close()
@@ -0,0 +1,127 @@
+import threading
+
+import numpy as np
+
+from utils.frame_utils import as_frame
+
+
+class DoubleFrameBuffer:
+    """A double-buffered frame store for handing frames from a render thread to a display/output thread.
+
+    The producer (render thread) draws into a back buffer with the usual strip calls (set_pixel, fill, set_frame) and
+    publishes the finished frame atomically with publish(). Consumers only ever see complete frames: they copy the
+    latest published frame out under the lock, and can check the frame sequence number to skip repaints or wait for a
+    newer frame. If several frames are published before a consumer reads, only the latest one is seen. Any strip
+    backend can use this to decouple rendering from displaying or transmitting frames.
+
+    Args:
+        num_pixels (int): the number of pixels in a frame.
+
+    Attributes:
+        back (np.ndarray): the (num_pixels, 3) uint8 RGB buffer the producer draws into.
+        back_brightness (np.ndarray): the (num_pixels,) uint8 brightness buffer the producer draws into.
+        condition (threading.Condition): signaled whenever a frame is published.
+        front (np.ndarray): the (num_pixels, 3) uint8 RGB values of the latest published frame.
+        front_brightness (np.ndarray): the (num_pixels,) uint8 brightness values of the latest published frame.
+        num_pixels (int): the number of pixels in a frame.
+        published_at (float): the perf_counter time the latest frame was published.
+        sequence (int): the number of frames published so far (identifies the latest frame).
+    """
+
+    def __init__(self, num_pixels):
+        self.back = np.zeros((num_pixels, 3), dtype=np.uint8)
+        self.back_brightness = np.zeros(num_pixels, dtype=np.uint8)
+        self.condition = threading.Condition()
+        self.front = np.zeros((num_pixels, 3), dtype=np.uint8)
+        self.front_brightness = np.zeros(num_pixels, dtype=np.uint8)
+        self.num_pixels = num_pixels
+        self.published_at = None
+        self.sequence = 0
+
+    def set_pixel(self, i, r, g, b, brightness=100):
+        """Set pixel at index i of the back buffer to the specified RGB value. Pixels outside the frame are ignored.
+
+        Args:
+            i (int): the index of the pixel to set.
+            r (int): an int in range [0, 255] describing the red value to set.
+            g (int): an int in range [0, 255] describing the green value to set.
+            b (int): an int in range [0, 255] describing the blue value to set.
+            brightness (int): a brightness value in range [0, 100].
+        """
+        if 0 <= i < self.num_pixels:
+            self.back[i] = (r, g, b)
+            self.back_brightness[i] = brightness
+
+    def fill(self, start, end, r, g, b, brightness=100):
+        """Set all pixels of the back buffer between indices start and end (inclusive) to the specified RGB value.
+
+        Args:
+            start (int): the start index of the pixel range to fill (inclusive).
+            end (int): the end index of the pixel range to fill (inclusive).
+            r (int): an int in range [0, 255] describing the red value to set.
+            g (int): an int in range [0, 255] describing the green value to set.
+            b (int): an int in range [0, 255] describing the blue value to set.
+            brightness (int): a brightness value in range [0, 100].
+        """
+        start, end = max(start, 0), min(end + 1, self.num_pixels)
+        if start < end:
+            self.back[start:end] = (r, g, b)
+            self.back_brightness[start:end] = brightness
+
+    def set_frame(self, frame, brightness=100):
+        """Set every pixel of the back buffer at once from a whole frame.
+
+        Args:
+            frame (np.ndarray or bytes): a (num_pixels, 3) RGB array, a (num_pixels, 4) RGB + brightness array, or a
+                contiguous buffer of RGB triplets.
+            brightness (int or np.ndarray): a brightness value in range [0, 100] for every pixel, or an array of
+                brightness values (one for each pixel).
+        """
+        rgb, brightness = as_frame(frame, brightness)
+        count = min(len(rgb), self.num_pixels)
+        self.back[:count] = rgb[:count]
+        self.back_brightness[:count] = brightness[:count]
+
+    def publish(self, published_at=None):
+        """Atomically publish the back buffer as the latest complete frame and wake up waiting consumers.
+
+        The back buffer keeps its contents, so the producer can keep drawing on top of the previous frame.
+
+        Args:
+            published_at (float): the perf_counter time to record for the frame (defaults to None).
+        """
+        with self.condition:
+            np.copyto(self.front, self.back)
+            np.copyto(self.front_brightness, self.back_brightness)
+            self.published_at = published_at
+            self.sequence += 1
+            self.condition.notify_all()
+
+    def read(self, rgb_out, brightness_out=None):
+        """Copy the latest published frame into caller-owned arrays.
+
+        Args:
+            rgb_out (np.ndarray): a (num_pixels, 3) uint8 array to copy the RGB values into.
+            brightness_out (np.ndarray): a (num_pixels,) uint8 array to copy the brightness values into (optional).
+
+        Returns:
+            the sequence number of the frame that was copied.
+        """
+        with self.condition:
+            np.copyto(rgb_out, self.front)
+            if brightness_out is not None:
+                np.copyto(brightness_out, self.front_brightness)
+            return self.sequence
+
+    def wait_for_frame(self, last_sequence, timeout=None):
+        """Wait until a frame newer than last_sequence has been published.
+
+        Args:
+            last_sequence (int): the sequence number of the last frame the consumer has seen.
+            timeout (float): the maximum amount of time in seconds to wait (waits forever if None).
+
+        Returns:
+            True if a newer frame is available, False if the wait timed out.
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: self.sequence != last_sequence, timeout)
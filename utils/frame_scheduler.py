@@ -0,0 +1,95 @@
+import collections
+import time
+
+
+class FrameScheduler:
+    """Schedules frames against absolute perf_counter deadlines and keeps track of late and dropped frames.
+
+    Frame k is due at start + k * frame_rate. Waiting for the next frame sleeps until its deadline, so time spent
+    rendering a frame doesn't push back the frames after it. If a frame overruns by more than a whole frame period, the
+    stale deadlines are skipped (and counted as dropped) rather than rendered late.
+
+    Args:
+        frame_rate (float): the amount of time in seconds between each frame.
+        window (int): the number of recent frames used to compute the achieved FPS and jitter percentiles.
+
+    Attributes:
+        deadline (float): the perf_counter time the current frame is due.
+        dropped_frames (int): the number of frames skipped because they would have been rendered late.
+        frame_rate (float): the amount of time in seconds between each frame.
+        frame_times (collections.deque): perf_counter times at which recent frames started.
+        jitters (collections.deque): how late (in seconds) recent frames started relative to their deadlines.
+        rendered_frames (int): the number of frames started.
+    """
+
+    def __init__(self, frame_rate=0.03, window=1000):
+        self.deadline = None
+        self.dropped_frames = 0
+        self.frame_rate = frame_rate
+        self.frame_times = collections.deque(maxlen=window)
+        self.jitters = collections.deque(maxlen=window)
+        self.rendered_frames = 0
+
+    def wait_for_next_frame(self):
+        """Sleep until the next frame is due, skipping any deadlines that have already been missed.
+
+        Returns:
+            the number of frames dropped before this frame.
+        """
+        now = time.perf_counter()
+        if self.deadline is None:
+            self.deadline = now
+        else:
+            self.deadline += self.frame_rate
+
+        # Skip stale frames: if the deadline was missed by a whole frame period or more, jump to the latest deadline
+        dropped = 0
+        if now - self.deadline >= self.frame_rate:
+            dropped = int((now - self.deadline) // self.frame_rate)
+            self.deadline += dropped * self.frame_rate
+            self.dropped_frames += dropped
+
+        diff = self.deadline - now
+        if diff > 0:
+            time.sleep(diff)
+        started = time.perf_counter()
+        self.jitters.append(started - self.deadline)
+        self.frame_times.append(started)
+        self.rendered_frames += 1
+        return dropped
+
+    def reset(self):
+        """Restart the schedule (the next frame is due immediately) and clear all statistics.
+        """
+        self.deadline = None
+        self.dropped_frames = 0
+        self.frame_times.clear()
+        self.jitters.clear()
+        self.rendered_frames = 0
+
+    def report(self):
+        """Summarize frame timing statistics.
+
+        Returns:
+            a dict with the achieved FPS (over the recent window), the target FPS, 50th/95th/99th percentile jitter in
+            milliseconds, and the number of rendered and dropped frames.
+        """
+        fps = 0.0
+        if len(self.frame_times) > 1:
+            fps = (len(self.frame_times) - 1) / (self.frame_times[-1] - self.frame_times[0])
+        jitters = sorted(self.jitters)
+
+        def percentile(p):
+            if not jitters:
+                return 0.0
+            return 1000 * jitters[min(len(jitters) - 1, int(p / 100 * len(jitters)))]
+
+        return {
+            "fps": fps,
+            "target_fps": 1 / self.frame_rate,
+            "jitter_p50_ms": percentile(50),
+            "jitter_p95_ms": percentile(95),
+            "jitter_p99_ms": percentile(99),
+            "rendered_frames": self.rendered_frames,
+            "dropped_frames": self.dropped_frames,
+        }
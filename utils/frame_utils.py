@@ -0,0 +1,28 @@
+import numpy as np
+
+
+def as_frame(frame, brightness=100):
+    """Normalize a whole frame of pixel data passed to a strip's set_frame method.
+
+    A frame can be passed as a (num_pixels, 3) array of RGB values, a (num_pixels, 4) array of RGB and brightness
+    values, or a contiguous bytes-like buffer of RGB triplets.
+
+    Args:
+        frame (np.ndarray or bytes): the frame of pixel data to normalize.
+        brightness (int or np.ndarray): a brightness value in range [0, 100] for every pixel, or an array of
+            brightness values (one for each pixel). Ignored if the frame carries its own brightness column.
+
+    Returns:
+        a tuple (rgb, brightness) where rgb is a (num_pixels, 3) uint8 array and brightness is a (num_pixels,) uint8
+        array.
+    """
+    if isinstance(frame, (bytes, bytearray, memoryview)):
+        frame = np.frombuffer(frame, dtype=np.uint8).reshape(-1, 3)
+    frame = np.asarray(frame)
+    if frame.ndim != 2 or frame.shape[1] not in (3, 4):
+        raise ValueError("Frames must have shape (num_pixels, 3) or (num_pixels, 4), got {}.".format(frame.shape))
+    rgb = frame[:, :3].astype(np.uint8, copy=False)
+    if frame.shape[1] == 4:
+        brightness = frame[:, 3]
+    brightness = np.broadcast_to(np.asarray(brightness, dtype=np.uint8), (frame.shape[0],))
+    return rgb, brightness
@@ -0,0 +1,287 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds (from 100 microseconds for per-frame work to 10 seconds for API calls)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """A fixed-bucket histogram of observed values (e.g. durations in seconds).
+
+    Observing a value is a binary search over the bucket bounds and a few increments under an uncontended lock, so
+    histograms can be updated from the render loop without measurable overhead.
+
+    Args:
+        buckets (tuple): the sorted upper bounds of the buckets (an implicit +Inf bucket is added).
+
+    Attributes:
+        buckets (tuple): the sorted upper bounds of the buckets.
+        count (int): the number of observed values.
+        counts (list): the number of observed values in each bucket (the last bucket is +Inf).
+        lock (threading.Lock): a lock for updating the histogram.
+        max (float): the largest observed value (None if nothing was observed).
+        sum (float): the sum of all observed values.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.count = 0
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.lock = threading.Lock()
+        self.max = None
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Record a value.
+
+        Args:
+            value (float): the value to record.
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if self.max is None or value > self.max:
+                self.max = value
+
+    def quantile(self, q):
+        """Estimate a quantile of the observed values (the upper bound of the bucket the quantile falls in).
+
+        Args:
+            q (float): the quantile to estimate, in range [0.0, 1.0].
+
+        Returns:
+            the estimated quantile, or None if nothing was observed.
+        """
+        with self.lock:
+            counts, count, maximum = list(self.counts), self.count, self.max
+        if not count:
+            return None
+        rank, seen = q * count, 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(bound, maximum)
+        return maximum
+
+
+class _Metrics:
+    """A registry of labeled timing histograms for the visualization pipeline, with Prometheus and JSON exports.
+
+    Histograms are created on first use and identified by a metric name and a set of labels (e.g. the API endpoint).
+    Metrics can be scraped in the Prometheus text format from a local HTTP endpoint (start_http_server) or written to a
+    JSON file periodically (start_json_dump).
+
+    Attributes:
+        histograms (dict): histograms keyed by (metric name, sorted label items).
+        lock (threading.Lock): a lock for adding histograms.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def histogram(self, name, **labels):
+        """Get the histogram for a metric name and labels, creating it on first use.
+
+        Args:
+            name (str): the metric name (e.g. "frame_seconds").
+            **labels: label names and values distinguishing histograms of the same metric (e.g. endpoint="me").
+
+        Returns:
+            the Histogram.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+        return histogram
+
+    def observe(self, name, value, **labels):
+        """Record a value in the histogram for a metric name and labels.
+
+        Args:
+            name (str): the metric name.
+            value (float): the value to record.
+            **labels: label names and values of the histogram.
+        """
+        self.histogram(name, **labels).observe(value)
+
+    def timed(self, name, **labels):
+        """Create a context manager that records how long its block takes in a histogram.
+
+        Args:
+            name (str): the metric name.
+            **labels: label names and values of the histogram.
+
+        Returns:
+            a context manager.
+        """
+        return _Timer(self.histogram(name, **labels))
+
+    def instrument(self, obj, name):
+        """Wrap an object so that every method call on it is timed (labeled with the method name as the endpoint).
+
+        Args:
+            obj (object): the object to wrap (e.g. a Spotify client).
+            name (str): the metric name for the calls.
+
+        Returns:
+            a proxy of obj that forwards all attribute access to it.
+        """
+        return _InstrumentedProxy(obj, name, self)
+
+    def to_dict(self):
+        """Summarize every histogram.
+
+        Returns:
+            a dict mapping metric names to lists of summaries (labels, count, sum, max and p50/p95/p99 estimates).
+        """
+        summaries = {}
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            summaries.setdefault(name, []).append({
+                "labels": dict(labels),
+                "count": histogram.count,
+                "sum": histogram.sum,
+                "max": histogram.max,
+                "p50": histogram.quantile(0.5),
+                "p95": histogram.quantile(0.95),
+                "p99": histogram.quantile(0.99),
+            })
+        return summaries
+
+    def to_prometheus(self):
+        """Render every histogram in the Prometheus text exposition format.
+
+        Returns:
+            the metrics as a string.
+        """
+        lines = []
+        previous_name = None
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            if name != previous_name:
+                lines.append("# TYPE {} histogram".format(name))
+                previous_name = name
+            with histogram.lock:
+                counts, count, total = list(histogram.counts), histogram.count, histogram.sum
+            label_text = "".join('{}="{}",'.format(key, value) for key, value in labels)
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                bound_text = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append('{}_bucket{{{}le="{}"}} {}'.format(name, label_text, bound_text, cumulative))
+            label_text = "{{{}}}".format(label_text.rstrip(",")) if labels else ""
+            lines.append("{}_sum{} {}".format(name, label_text, total))
+            lines.append("{}_count{} {}".format(name, label_text, count))
+        return "\n".join(lines) + "\n"
+
+    def start_http_server(self, port=9105, host="127.0.0.1"):
+        """Serve the metrics in the Prometheus text format at http://host:port/metrics on a daemon thread.
+
+        Args:
+            port (int): the port to listen on.
+            host (str): the address to listen on.
+
+        Returns:
+            the HTTP server.
+        """
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics_http_thread", daemon=True).start()
+        return server
+
+    def start_json_dump(self, path, interval=10.0):
+        """Write a JSON summary of the metrics to a file every interval seconds on a daemon thread.
+
+        Args:
+            path (str): the path of the JSON file (replaced atomically on each write).
+            interval (float): the amount of time in seconds between writes.
+        """
+        def dump():
+            while True:
+                time.sleep(interval)
+                temp_path = path + ".tmp"
+                try:
+                    with open(temp_path, "w") as f:
+                        json.dump(self.to_dict(), f, indent=2)
+                    os.replace(temp_path, path)
+                except OSError as e:
+                    print("Error occurred while writing metrics: {}".format(e))
+
+        threading.Thread(target=dump, name="metrics_dump_thread", daemon=True).start()
+
+
+class _Timer:
+    """A context manager recording how long its block takes in a histogram.
+    """
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class _InstrumentedProxy:
+    """Forwards attribute access to an object, timing every method call (see _Metrics.instrument).
+    """
+
+    def __init__(self, obj, name, metrics):
+        self._obj = obj
+        self._name = name
+        self._metrics = metrics
+
+    def __getattr__(self, attribute):
+        value = getattr(self._obj, attribute)
+        if not callable(value):
+            return value
+        histogram = self._metrics.histogram(self._name, endpoint=attribute)
+
+        @functools.wraps(value)
+        def timed_call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return value(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return timed_call
+
+
+_metrics = _Metrics()
+def Metrics():
+    """A method to effectively make Metrics a singleton class.
+
+    We want Metrics to be a singleton because every stage of the pipeline (in several threads and modules) records into
+    the same set of histograms, which are exported from one place.
+    """
+    return _metrics
@@ -0,0 +1,114 @@
+import threading
+import time
+
+
+class PlaybackClock:
+    """A playback clock that models the track position as an offset from the monotonic clock.
+
+    Between syncs, the position advances with the monotonic clock, so it doesn't depend on how late each frame of the
+    visualization actually ran. Each sync compensates for network latency by assuming the reported progress was sampled
+    halfway through the request's round trip. Small errors are corrected by slewing the clock (running it slightly fast
+    or slow until the error is consumed) instead of jumping, like a phase-locked loop; only large errors (seeks, skips
+    or the first sync) cause the position to jump.
+
+    Note that the "timestamp" field of Spotify's playback state marks the last change of the playback state rather than
+    when progress_ms was sampled, so the round trip time is used to estimate latency instead.
+
+    Args:
+        max_slew (float): the maximum rate (seconds of correction per second) at which errors are slewed away.
+        jump_threshold (float): errors in seconds larger than this cause the position to jump instead of slewing.
+
+    Attributes:
+        anchor_pos (float): the playback position at anchor_time (in seconds).
+        anchor_time (float): the monotonic time the current position model was anchored at.
+        is_playing (bool): whether the position is advancing.
+        jump_threshold (float): errors in seconds larger than this cause the position to jump instead of slewing.
+        last_error (float): the error (in seconds) measured by the latest sync.
+        last_rtt (float): the round trip time (in seconds) of the latest sync request.
+        lock (threading.Lock): a lock for accessing/modifying the position model.
+        max_slew (float): the maximum rate (seconds of correction per second) at which errors are slewed away.
+        slew (float): the error (in seconds) being slewed away since anchor_time.
+    """
+
+    def __init__(self, max_slew=0.05, jump_threshold=0.5):
+        self.anchor_pos = 0.0
+        self.anchor_time = time.monotonic()
+        self.is_playing = True
+        self.jump_threshold = jump_threshold
+        self.last_error = 0.0
+        self.last_rtt = None
+        self.lock = threading.Lock()
+        self.max_slew = max_slew
+        self.slew = 0.0
+
+    def position(self, now=None):
+        """Get the current playback position.
+
+        Args:
+            now (float): the monotonic time to get the position for (defaults to the current time).
+
+        Returns:
+            the playback position (offset into the track in seconds).
+        """
+        with self.lock:
+            return self._position_at(time.monotonic() if now is None else now)
+
+    def set_position(self, pos, now=None):
+        """Jump to a playback position, discarding any correction in progress.
+
+        Args:
+            pos (float): the new playback position (offset into the track in seconds).
+            now (float): the monotonic time the position was observed at (defaults to the current time).
+        """
+        with self.lock:
+            self._anchor(pos, time.monotonic() if now is None else now)
+
+    def set_playing(self, is_playing):
+        """Pause or resume the clock.
+
+        Args:
+            is_playing (bool): whether the position should advance.
+        """
+        with self.lock:
+            if is_playing == self.is_playing:
+                return
+            now = time.monotonic()
+            self._anchor(self._position_at(now), now)
+            self.is_playing = is_playing
+
+    def sync(self, progress, sent_at, received_at):
+        """Correct the clock with a playback position reported by the Spotify API.
+
+        Args:
+            progress (float): the playback position (in seconds) reported by the Spotify API.
+            sent_at (float): the monotonic time the request was sent.
+            received_at (float): the monotonic time the response was received.
+
+        Returns:
+            the error (in seconds) between the reported position and the clock's position (positive if the clock is
+            behind).
+        """
+        with self.lock:
+            rtt = received_at - sent_at
+            estimated_pos = progress + (rtt / 2 if self.is_playing else 0)
+            error = estimated_pos - self._position_at(received_at)
+            self.last_error = error
+            self.last_rtt = rtt
+            if not self.is_playing or abs(error) > self.jump_threshold:
+                self._anchor(estimated_pos, received_at)
+            else:
+                self._anchor(self._position_at(received_at), received_at)
+                self.slew = error
+            return error
+
+    def _anchor(self, pos, now):
+        self.anchor_pos = pos
+        self.anchor_time = now
+        self.slew = 0.0
+
+    def _position_at(self, now):
+        if not self.is_playing:
+            return self.anchor_pos
+        elapsed = max(0.0, now - self.anchor_time)
+        correction = min(abs(self.slew), elapsed * self.max_slew)
+        return self.anchor_pos + elapsed + (correction if self.slew >= 0 else -correction)
@@ -1,6 +1,19 @@
 from difflib import SequenceMatcher
 import time
 
+
+def make_error_text(text):
+    """Format text to be printed as an error (bold red).
+
+    Args:
+        text (str): the text to format.
+
+    Returns:
+        the text wrapped in ANSI escape codes.
+    """
+    return "\033[91m\033[1m{}\033[0m\033[0m".format(text)
+
+
 class Logger:
 
     def __init__(self, file_name=None, suppress=False):
@@ -0,0 +1,72 @@
+import collections
+import threading
+import time
+
+
+class _StartupTimer:
+    """Records how long startup milestones (lights on, settings loaded, first visualized frame, ...) take to reach.
+
+    Times are measured from when this module is first imported, so the entry point should import it before anything
+    else. Each milestone is only recorded the first time it is reached, so later restarts of the visualizer don't
+    overwrite cold start measurements.
+
+    Attributes:
+        lock (threading.Lock): a lock for accessing/modifying milestones.
+        milestones (collections.OrderedDict): the perf_counter time each milestone was reached, keyed by name.
+        started_at (float): the perf_counter time startup began.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.milestones = collections.OrderedDict()
+        self.started_at = time.perf_counter()
+
+    def elapsed(self, name):
+        """Get how long it took to reach a milestone.
+
+        Args:
+            name (str): the name of the milestone.
+
+        Returns:
+            the time in seconds from the start of startup to the milestone, or None if it wasn't reached yet.
+        """
+        reached_at = self.milestones.get(name)
+        return None if reached_at is None else reached_at - self.started_at
+
+    def has(self, name):
+        return name in self.milestones
+
+    def mark(self, name):
+        """Record that a milestone was reached (only the first time it is reached counts).
+
+        Args:
+            name (str): the name of the milestone.
+
+        Returns:
+            True if this call recorded the milestone, False if it was already reached before.
+        """
+        with self.lock:
+            if name in self.milestones:
+                return False
+            self.milestones[name] = time.perf_counter()
+            return True
+
+    def report(self):
+        """Summarize the milestones reached so far.
+
+        Returns:
+            a multi-line string with the time to reach each milestone, in the order they were reached.
+        """
+        return "\n".join(
+            "{}: {:.2f}s".format(name, reached_at - self.started_at) for name, reached_at in self.milestones.items()
+        )
+
+
+_startup_timer = _StartupTimer()
+def StartupTimer():
+    """A method to effectively make StartupTimer a singleton class.
+
+    We want StartupTimer to be a singleton because startup milestones are reached in different modules and threads,
+    but all of them are measured from the same process start.
+    """
+    return _startup_timer
@@ -1,33 +1,38 @@
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QWidget, QApplication
-from PyQt5.QtGui import QPainter, QColor
+from PyQt5.QtGui import QImage, QPainter
+import numpy as np
 import sys
 
+from utils.frame_buffer import DoubleFrameBuffer
+
 
 class _VirtualLEDStrip:
     """A class for launching/controlling a virtual LED strip visualizer
 
-    This class is intended for use with spotify_visualizer.py in developer mode.
+    This class is intended for use with spotify_visualizer.py in developer mode. The visualizer thread draws into the
+    back buffer of a double-buffered frame store and publishes complete frames on show(); the GUI thread only ever
+    paints the latest published frame.
     """
 
-    def __init__(self):
+    def __init__(self, num_pixels=241):
+        self.frame_buffer = DoubleFrameBuffer(num_pixels)
         self.visualization_widget = None
 
     def start_visualization(self):
         """Start the visualization app.
         """
         app = QApplication(sys.argv)
-        self.visualization_widget = VisualizationWidget()
+        self.visualization_widget = VisualizationWidget(self.frame_buffer)
         sys.exit(app.exec_())
 
     def show(self):
-        """Show (update) the visualization widget.
+        """Publish the frame drawn so far so that the visualization widget displays it.
         """
-        if not self.visualization_widget:
-            return
-        self.visualization_widget.show()
+        self.frame_buffer.publish()
 
     def set_pixel(self, i, r, g, b, _=0):
-        """Set pixel at index i to the specified RGB value. Wraps the set_pixel method of the visualization widget.
+        """Set pixel at index i to the specified RGB value.
 
         Optional parameter is included to conform to the LED strip behaviors expected by SpotifyVisualizer. Its
         value is ignored.
@@ -39,13 +44,10 @@ class _VirtualLEDStrip:
             b (int): an int in range [0, 255] describing the blue value to set.
             _ (int): a brightness value in range [0, 100]; this value is ignored.
         """
-        if not self.visualization_widget:
-            return
-        self.visualization_widget.set_pixel(i, r, g, b)
+        self.frame_buffer.set_pixel(i, r, g, b)
 
     def fill(self, start, end, r, g, b, _=0):
-        """Set all pixels between indices start and end (inclusive) to the specified RGB value. Wraps the fill method
-        of the visualization widget
+        """Set all pixels between indices start and end (inclusive) to the specified RGB value.
 
         Optional parameter is included to conform to the LED strip behaviors expected by SpotifyVisualizer. Its
         value is ignored.
@@ -58,9 +60,20 @@ class _VirtualLEDStrip:
             b (int): an int in range [0, 255] describing the blue value to set.
             _ (int): a brightness value in range [0, 100]; this value is ignored.
         """
-        if not self.visualization_widget:
-            return
-        self.visualization_widget.fill(start, end, r, g, b)
+        self.frame_buffer.fill(start, end, r, g, b)
+
+    def set_frame(self, frame, brightness=100):
+        """Set every pixel of the strip at once from a whole frame.
+
+        Brightness is accepted to conform to the LED strip behaviors expected by SpotifyVisualizer. Its value is
+        ignored.
+
+        Args:
+            frame (np.ndarray or bytes): a (num_pixels, 3) RGB array, a (num_pixels, 4) RGB + brightness array, or a
+                contiguous buffer of RGB triplets.
+            brightness (int or np.ndarray): a brightness value in range [0, 100]; this value is ignored.
+        """
+        self.frame_buffer.set_frame(frame)
 
 
 _virtual_led_strip = _VirtualLEDStrip()
@@ -76,14 +89,26 @@ def VirtualLEDStrip():
 class VisualizationWidget(QWidget):
     """A QWidget to handle initializing a UI and drawing.
 
-    This class is intended for use with VirtualLEDStrip and spotify_visualizer.py in developer mode.
+    This class is intended for use with VirtualLEDStrip and spotify_visualizer.py in developer mode. Pixels are stored in
+    a preallocated (num_pixels, 3) uint8 array and painted as a single 1 x num_pixels image scaled up to the window.
+    The widget polls the frame buffer at the display refresh rate and repaints only when a new frame was published, so
+    bursts of frames are coalesced into one repaint.
+
+    Args:
+        frame_buffer (DoubleFrameBuffer): the frame store that the visualizer thread publishes frames to.
+        refresh_rate (float): the number of times per second to check for new frames.
     """
 
-    def __init__(self):
-        self.num_pixels = 241
-        self.pixels = [QColor(0, 0, 0) for _ in range(self.num_pixels)]
+    def __init__(self, frame_buffer, refresh_rate=60):
+        self.frame_buffer = frame_buffer
+        self.num_pixels = frame_buffer.num_pixels
+        self.pixels = np.zeros((self.num_pixels, 3), dtype=np.uint8)
+        self.sequence = 0
         super().__init__()
         self.init_ui()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(int(1000 / refresh_rate))
 
     def init_ui(self):
         """Initialize and show the window representing the virtual LED strip.
@@ -104,43 +129,19 @@ class VisualizationWidget(QWidget):
         qp.end()
 
     def draw_points(self, qp):
-        """Paints the current state of the virtual LED strip.
+        """Paints the current state of the virtual LED strip with one scaled blit of a 1 x num_pixels image.
 
         Args:
             qp (QPainter): the QPainter object to facilitate painting of the virtual LED strip.
         """
-        for x in range(self.num_pixels):
-            qp.setPen(self.pixels[x])
-            for i in range(5):
-                for j in range(20):
-                    qp.drawPoint(5 * x + i, j)
+        data = self.pixels.tobytes()  # QImage doesn't copy its buffer, so keep it alive until the blit is done
+        image = QImage(data, self.num_pixels, 1, 3 * self.num_pixels, QImage.Format_RGB888)
+        qp.drawImage(self.rect(), image)
 
-    def show(self):
-        """Update the virtual LED strip.
+    def refresh(self):
+        """Copy the latest published frame and repaint, if a new frame was published since the last refresh.
         """
+        if self.frame_buffer.sequence == self.sequence:
+            return
+        self.sequence = self.frame_buffer.read(self.pixels)
         self.update()
-
-    def set_pixel(self, i, r, g, b):
-        """Set pixel at index i to the specified RGB value.
-
-        Args:
-            i (int): the index of the pixel to set.
-            r (int): an int in range [0, 255] describing the red value to set.
-            g (int): an int in range [0, 255] describing the green value to set.
-            b (int): an int in range [0, 255] describing the blue value to set.
-            _ (int): a brightness value in range [0, 100]; this value is ignored.
-        """
-        self.pixels[i] = QColor(r, g, b)
-
-    def fill(self, start, end, r, g, b):
-        """Set all pixels between indices start and end (inclusive) to the specified RGB value.
-
-        Args:
-            start (int): the start index of the pixel range to fill (inclusive).
-            end (int): the end index of the pixel range to fill (inclusive).
-            r (int): an int in range [0, 255] describing the red value to set.
-            g (int): an int in range [0, 255] describing the green value to set.
-            b (int): an int in range [0, 255] describing the blue value to set.
-        """
-        for i in range(end-start+1):
-            self.set_pixel(start+i, r, g, b)